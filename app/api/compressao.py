@@ -0,0 +1,122 @@
+"""Middleware de compressão negociada (zstd, brotli ou gzip) com tamanho mínimo.
+
+gzip sempre está disponível (stdlib); brotli e zstd são usados quando os
+pacotes opcionais ``brotli`` / ``zstandard`` estão instalados. Respostas em
+streaming (ex.: SSE) e abaixo do limite passam sem compressão.
+"""
+
+import gzip
+from collections.abc import Callable
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Acima disso a compressão roda numa thread para não travar o event loop
+LIMITE_THREAD = 256 * 1024
+
+TIPOS_COMPRIMIVEIS = ("application/json", "application/octet-stream", "text/html", "text/plain")
+
+
+def _codecs_disponiveis(nivel_gzip: int) -> dict[str, Callable[[bytes], bytes]]:
+    """Codecs em ordem de preferência (mais eficiente primeiro)."""
+    codecs: dict[str, Callable[[bytes], bytes]] = {}
+    try:
+        import zstandard
+
+        codecs["zstd"] = zstandard.ZstdCompressor(level=3).compress
+    except ImportError:
+        pass
+    try:
+        import brotli
+
+        codecs["br"] = lambda corpo: brotli.compress(corpo, quality=5)
+    except ImportError:
+        pass
+    codecs["gzip"] = lambda corpo: gzip.compress(corpo, compresslevel=nivel_gzip, mtime=0)
+    return codecs
+
+
+def negociar(accept_encoding: str, disponiveis: list[str]) -> str | None:
+    """Escolhe o codec preferido do servidor aceito pelo cliente (respeita ``q=0``)."""
+    aceitos: dict[str, float] = {}
+    for parte in accept_encoding.split(","):
+        nome, _, parametros = parte.strip().partition(";")
+        q = 1.0
+        if parametros.strip().startswith("q="):
+            try:
+                q = float(parametros.strip()[2:])
+            except ValueError:
+                q = 0.0
+        aceitos[nome.strip().lower()] = q
+
+    for codec in disponiveis:
+        if aceitos.get(codec, aceitos.get("*", 0.0)) > 0:
+            return codec
+    return None
+
+
+class CompressaoMiddleware:
+    """Comprime respostas completas acima de ``minimo_bytes`` com o melhor codec aceito."""
+
+    def __init__(self, app: ASGIApp, minimo_bytes: int = 1024, nivel_gzip: int = 6) -> None:
+        self.app = app
+        self.minimo_bytes = minimo_bytes
+        self.nivel_gzip = nivel_gzip
+        self._codecs: dict[str, Callable[[bytes], bytes]] | None = None
+
+    @property
+    def codecs(self) -> dict[str, Callable[[bytes], bytes]]:
+        """Codecs importados na primeira requisição (não no boot)."""
+        if self._codecs is None:
+            self._codecs = _codecs_disponiveis(self.nivel_gzip)
+        return self._codecs
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        codec = negociar(Headers(scope=scope).get("accept-encoding", ""), list(self.codecs))
+        if codec is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio: Message | None = None
+        repassar = False
+
+        async def enviar(message: Message) -> None:
+            nonlocal inicio, repassar
+            if message["type"] == "http.response.start":
+                inicio = message
+                return
+            if message["type"] != "http.response.body" or repassar:
+                await send(message)
+                return
+
+            corpo = message.get("body", b"")
+            headers = MutableHeaders(raw=inicio["headers"])
+            tipo = headers.get("content-type", "").partition(";")[0].strip()
+            if (
+                message.get("more_body", False)  # streaming: não bufferiza
+                or "content-encoding" in headers
+                or tipo not in TIPOS_COMPRIMIVEIS
+                or len(corpo) < self.minimo_bytes
+            ):
+                repassar = True
+                await send(inicio)
+                await send(message)
+                return
+
+            comprimir = self.codecs[codec]
+            if len(corpo) >= LIMITE_THREAD:
+                corpo = await anyio.to_thread.run_sync(comprimir, corpo)
+            else:
+                corpo = comprimir(corpo)
+            headers["content-encoding"] = codec
+            headers["content-length"] = str(len(corpo))
+            headers.add_vary_header("Accept-Encoding")
+            await send(inicio)
+            await send({"type": "http.response.body", "body": corpo})
+
+        await self.app(scope, receive, enviar)
@@ -0,0 +1,60 @@
+"""Respostas HTTP de alto desempenho: JSON via orjson e formatos compactos."""
+
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+from datetime import date
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+
+# Dia 0 do formato binário: 1970-01-01 (fácil de converter em JS/numpy)
+EPOCA = date(1970, 1, 1).toordinal()
+
+# magic, quantidade de pontos, primeiro dia (dias desde 1970-01-01) – 16 bytes
+CABECALHO_BINARIO = struct.Struct("<4sIi4x")
+MAGIC_BINARIO = b"MIB1"
+
+
+class RespostaJSON(Response):
+    """Resposta JSON serializada diretamente com orjson.
+
+    Usada nos endpoints quentes: o conteúdo é montado a partir dos arrays já
+    calculados e não passa pela validação/serialização do ``response_model``
+    (que continua valendo para a documentação OpenAPI).
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def deltas_dias(ordinais: Sequence[int]) -> array:
+    """Diferença em dias entre pontos consecutivos (o primeiro delta é 0)."""
+    deltas = array("i", [0]) if len(ordinais) else array("i")
+    deltas.extend(b - a for a, b in zip(ordinais, ordinais[1:]))
+    return deltas
+
+
+class RespostaBinaria(Response):
+    """Série em buffer colunar little-endian (``formato=binario``).
+
+    Layout: cabeçalho de 16 bytes (``b"MIB1"``, ``uint32`` n, ``int32`` primeiro
+    dia desde 1970-01-01, 4 bytes de padding), ``float64[n]`` valores e
+    ``int32[n]`` deltas em dias. Os valores vêm primeiro para ficarem
+    alinhados em 8 bytes (``Float64Array`` direto sobre o buffer).
+    """
+
+    media_type = "application/octet-stream"
+
+    def __init__(self, ordinais: Sequence[int], valores: array, headers: dict[str, str] | None = None) -> None:
+        primeiro = ordinais[0] - EPOCA if len(ordinais) else 0
+        valores, deltas = array("d", valores), deltas_dias(ordinais)
+        if sys.byteorder == "big":
+            valores.byteswap()
+            deltas.byteswap()
+        corpo = CABECALHO_BINARIO.pack(MAGIC_BINARIO, len(valores), primeiro) + valores.tobytes() + deltas.tobytes()
+        super().__init__(content=corpo, headers=headers)
@@ -1,30 +1,51 @@
 """Rotas da API para séries econômicas."""
 
+import asyncio
 import math
-from datetime import date, datetime
+from array import array
+from datetime import date
+from typing import TYPE_CHECKING
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 
+from app.api.respostas import RespostaBinaria, RespostaJSON, deltas_dias
 from app.core.config import settings
 from app.core.logging import logger
 from app.db.models import Observacao, Serie
 from app.db.session import get_db
 from app.schemas.series import (
+    Amostragem,
     CatalogoSerieOut,
+    FormatoSerie,
     InsightsResponse,
-    ObservacaoOut,
+    SerieDerivadaOut,
     SerieDetalhe,
+    SerieDetalheColunar,
+    SerieDetalheDelta,
     SerieResumo,
+    SnapshotSerie,
+    StoreStatus,
     SyncRequest,
     SyncResponse,
 )
-from app.services.bcb_client import buscar_serie, listar_catalogo_series, nome_serie
-from app.services.insights import calcular_insights
+from app.services.bcb_client import buscar_serie, listar_catalogo_series
+from app.services.insights import Metrica, calcular_insights_intervalo
+
+if TYPE_CHECKING:
+    from app.services.store import SerieEmMemoria
+
+# Store, escritor, derivadas, eventos e demais serviços são importados dentro
+# das rotas: só entram no processo na primeira requisição que os usa.
 
 router = APIRouter(prefix="/series", tags=["Séries"])
 
+# Formatos compactos aceitam páginas grandes (leitura da série inteira)
+LIMITE_PAGINA_LINHAS = 500
+LIMITE_PAGINA_COMPACTA = 100_000
+
 
 @router.get("/catalogo", response_model=list[CatalogoSerieOut])
 def obter_catalogo_series():
@@ -32,6 +53,22 @@ def obter_catalogo_series():
     return listar_catalogo_series()
 
 
+def _carregar_serie(db: Session, codigo: int) -> "SerieEmMemoria":
+    """Série do store ou, para códigos virtuais, calculada pelo motor de derivadas."""
+    from app.services.derivadas import FonteAusente, eh_virtual, motor_derivadas
+    from app.services.store import store
+
+    try:
+        serie = motor_derivadas.obter(db, codigo) if eh_virtual(codigo) else store.obter_ou_carregar(db, codigo)
+    except FonteAusente as exc:
+        raise HTTPException(
+            status_code=404, detail=f"Série de origem {exc.codigo} não encontrada. Faça o sync primeiro."
+        )
+    if serie is None:
+        raise HTTPException(status_code=404, detail="Série não encontrada. Faça o sync primeiro.")
+    return serie
+
+
 # ── POST /series/{codigo}/sync ───────────────────────────────────────────────
 
 
@@ -42,7 +79,17 @@ async def sincronizar_serie(
     db: Session = Depends(get_db),
 ):
     """Baixa dados do BCB e salva/atualiza no banco local."""
+    from app.services.derivadas import eh_virtual
+    from app.services.eventos import barramento
+    from app.services.ingestao import escritor
+    from app.services.store import store
+
     body = body or SyncRequest()
+    if eh_virtual(codigo):
+        raise HTTPException(
+            status_code=400, detail="Série derivada: sincronize as séries de origem (ver GET /series/derivadas)."
+        )
+    barramento.publicar("sync_iniciado", codigo=codigo)
 
     # 1. Buscar dados do BCB
     try:
@@ -53,48 +100,52 @@ async def sincronizar_serie(
         )
     except Exception as exc:
         logger.error("Erro ao buscar série %d do BCB: %s", codigo, exc)
+        barramento.publicar("sync_falhou", codigo=codigo, erro=f"Erro ao consultar BCB: {exc}")
         raise HTTPException(status_code=502, detail=f"Erro ao consultar BCB: {exc}")
 
     if not dados:
+        barramento.publicar("sync_falhou", codigo=codigo, erro="Nenhum dado retornado pelo BCB.")
         raise HTTPException(status_code=404, detail="Nenhum dado retornado pelo BCB para essa série.")
+    barramento.publicar("sync_dados_recebidos", codigo=codigo, registros=len(dados))
 
-    # 2. Garantir que a série existe no banco
-    serie = db.query(Serie).filter(Serie.codigo == codigo).first()
-    if not serie:
-        serie = Serie(codigo=codigo, nome=nome_serie(codigo))
-        db.add(serie)
-        db.flush()
-
-    # 3. Upsert das observações
-    novos = 0
-    atualizados = 0
-    for item in dados:
-        obs = (
-            db.query(Observacao)
-            .filter(Observacao.serie_id == serie.id, Observacao.data == item["data"])
-            .first()
+    # 2. Upsert via escritor único (agrupa syncs concorrentes numa transação)
+    try:
+        resultado = await asyncio.wrap_future(
+            escritor.enviar(db.get_bind(), codigo, dados, body.data_inicial, body.data_final)
         )
-        if obs:
-            if obs.valor != item["valor"]:
-                obs.valor = item["valor"]
-                atualizados += 1
-        else:
-            db.add(Observacao(serie_id=serie.id, data=item["data"], valor=item["valor"]))
-            novos += 1
-
-    serie.ultima_sync = datetime.utcnow()
-    db.commit()
-
-    total = db.query(func.count(Observacao.id)).filter(Observacao.serie_id == serie.id).scalar()
-
-    logger.info("Sync série %d: %d novos, %d atualizados, %d total", codigo, novos, atualizados, total)
+    except Exception as exc:
+        logger.error("Erro ao gravar série %d: %s", codigo, exc)
+        barramento.publicar("sync_falhou", codigo=codigo, erro=f"Erro ao gravar: {exc}")
+        raise
+    store.aplicar_sync(codigo, resultado.alterados, resultado.ultima_sync)
+    barramento.anotar_sync_local(codigo, resultado.ultima_sync)
+
+    nome, novos, atualizados, total = resultado.nome, resultado.novos, resultado.atualizados, resultado.total
+    ignorados, reescritos = resultado.blocos_ignorados, resultado.blocos_reescritos
+    logger.info(
+        "Sync série %d: %d novos, %d atualizados, %d total (blocos: %d ignorados, %d reescritos)",
+        codigo, novos, atualizados, total, ignorados, reescritos,
+    )
+    barramento.publicar(
+        "sync_gravado",
+        codigo=codigo,
+        novos=novos,
+        atualizados=atualizados,
+        blocos_ignorados=ignorados,
+        blocos_reescritos=reescritos,
+    )
+    if novos:
+        barramento.publicar("novos_dados", codigo=codigo, nome=nome, novos=novos)
+    barramento.publicar("sync_concluido", codigo=codigo, total=total)
 
     return SyncResponse(
         codigo=codigo,
-        nome=serie.nome,
+        nome=nome,
         registros_novos=novos,
         registros_atualizados=atualizados,
         total_registros=total,
+        blocos_ignorados=ignorados,
+        blocos_reescritos=reescritos,
         mensagem=f"Sincronização concluída: {novos} novos, {atualizados} atualizados.",
     )
 
@@ -105,62 +156,184 @@ async def sincronizar_serie(
 @router.get("", response_model=list[SerieResumo])
 def listar_series(db: Session = Depends(get_db)):
     """Lista todas as séries já sincronizadas."""
-    series = db.query(Serie).order_by(Serie.codigo).all()
-    resultado = []
-    for s in series:
-        total = db.query(func.count(Observacao.id)).filter(Observacao.serie_id == s.id).scalar()
-        resultado.append(
-            SerieResumo(
-                codigo=s.codigo,
-                nome=s.nome,
-                descricao=s.descricao,
-                ultima_sync=s.ultima_sync,
-                total_observacoes=total,
-            )
+    totais = (
+        db.query(Observacao.serie_id, func.count().label("total"))
+        .group_by(Observacao.serie_id)
+        .subquery()
+    )
+    linhas = (
+        db.query(Serie, func.coalesce(totais.c.total, 0))
+        .outerjoin(totais, totais.c.serie_id == Serie.id)
+        .order_by(Serie.codigo)
+        .all()
+    )
+    return [
+        SerieResumo(
+            codigo=s.codigo,
+            nome=s.nome,
+            descricao=s.descricao,
+            ultima_sync=s.ultima_sync,
+            total_observacoes=total,
         )
-    return resultado
+        for s, total in linhas
+    ]
+
+
+# ── GET /series/eventos ──────────────────────────────────────────────────────
+
+
+@router.get("/eventos", response_class=StreamingResponse)
+async def stream_eventos(
+    codigo: int | None = Query(None, description="Filtra eventos de uma série"),
+    last_event_id: str | None = Header(None, description="Retoma após o último evento recebido"),
+):
+    """Stream SSE com o progresso dos syncs e avisos de novos dados.
+
+    Inclui os syncs feitos por outros workers (``sync_concluido`` com
+    ``externo: true``) e termina no shutdown da aplicação.
+    """
+    from app.services.eventos import barramento
+
+    async def gerar():
+        yield b"retry: 3000\n\n"
+        async for evento in barramento.assinar(ultimo_id=barramento.cursor_de(last_event_id)):
+            if evento is None:
+                yield b": keepalive\n\n"
+            elif codigo is None or evento.dados.get("codigo") == codigo:
+                yield evento.formatar_sse()
+
+    return StreamingResponse(
+        gerar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ── GET /series/store ────────────────────────────────────────────────────────
+
+
+@router.get("/store", response_model=StoreStatus)
+def status_store():
+    """Uso de memória e taxa de acerto do store em memória das séries."""
+    from app.services.store import store
+
+    return store.status()
+
+
+# ── GET /series/derivadas ────────────────────────────────────────────────────
+
+
+@router.get("/derivadas", response_model=list[SerieDerivadaOut])
+def listar_derivadas():
+    """Séries virtuais (códigos a partir de 900000) calculadas sobre as sincronizadas."""
+    from app.services.derivadas import motor_derivadas
+
+    return [
+        SerieDerivadaOut(codigo=d.codigo, nome=d.nome, fontes=list(d.fontes))
+        for d in motor_derivadas.definicoes.values()
+    ]
+
+
+# ── GET /series/snapshot ─────────────────────────────────────────────────────
+
+
+@router.get("/snapshot", response_model=list[SnapshotSerie])
+def snapshot_series(
+    k: int = Query(2, ge=1, le=30, description="Qtd de últimas observações por série"),
+    db: Session = Depends(get_db),
+):
+    """Último valor, anterior e variação de todas as séries, numa única query."""
+    from app.services.snapshot import consultar_snapshot
+
+    return RespostaJSON(consultar_snapshot(db, k))
 
 
 # ── GET /series/{codigo} ─────────────────────────────────────────────────────
 
 
-@router.get("/{codigo}", response_model=SerieDetalhe)
+@router.get(
+    "/{codigo}",
+    response_model=SerieDetalhe | SerieDetalheColunar | SerieDetalheDelta,
+    responses={200: {"content": {"application/octet-stream": {}}}},
+)
 def obter_serie(
     codigo: int,
     pagina: int = Query(1, ge=1, description="Página (começa em 1)"),
-    tamanho: int = Query(None, ge=1, le=500, description="Itens por página"),
+    tamanho: int = Query(
+        None, ge=1, le=LIMITE_PAGINA_COMPACTA, description="Itens por página (até 500 em linhas)"
+    ),
     data_inicial: date | None = Query(None, description="Filtro data inicial"),
     data_final: date | None = Query(None, description="Filtro data final"),
+    formato: FormatoSerie = Query(FormatoSerie.LINHAS, description="linhas, colunar, delta ou binario"),
+    max_pontos: int | None = Query(
+        None, ge=3, le=LIMITE_PAGINA_COMPACTA, description="Reduz o período a até N pontos (sem paginação)"
+    ),
+    amostragem: Amostragem = Query(Amostragem.LTTB, description="Redução de max_pontos: lttb ou minmax"),
     db: Session = Depends(get_db),
 ):
-    """Retorna dados paginados de uma série (com filtro opcional de datas)."""
-    serie = db.query(Serie).filter(Serie.codigo == codigo).first()
-    if not serie:
-        raise HTTPException(status_code=404, detail="Série não encontrada. Faça o sync primeiro.")
-
+    """Retorna dados paginados de uma série (com filtro opcional de datas).
+
+    Com ``max_pontos``, devolve o período inteiro reduzido para gráficos:
+    observações reais escolhidas por LTTB ou min/max por balde, que mantêm
+    picos que uma média por calendário apagaria.
+    """
+    serie = _carregar_serie(db, codigo)
+
+    limite = max_pontos or tamanho
+    if formato is FormatoSerie.LINHAS and limite and limite > LIMITE_PAGINA_LINHAS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Máximo de {LIMITE_PAGINA_LINHAS} itens em linhas; use formato colunar, delta ou binario.",
+        )
     tam = tamanho or settings.PAGE_SIZE
 
-    query = db.query(Observacao).filter(Observacao.serie_id == serie.id)
-    if data_inicial:
-        query = query.filter(Observacao.data >= data_inicial)
-    if data_final:
-        query = query.filter(Observacao.data <= data_final)
-    query = query.order_by(Observacao.data)
-
-    total = query.count()
-    total_paginas = max(1, math.ceil(total / tam))
-    offset = (pagina - 1) * tam
-
-    obs = query.offset(offset).limit(tam).all()
-
-    return SerieDetalhe(
-        codigo=serie.codigo,
-        nome=serie.nome,
-        pagina=pagina,
-        total_paginas=total_paginas,
-        total_observacoes=total,
-        observacoes=[ObservacaoOut.model_validate(o) for o in obs],
-    )
+    inicio, fim = serie.intervalo(data_inicial, data_final)
+    total = fim - inicio
+    if max_pontos:
+        from app.services.amostragem import lttb, minmax
+
+        pagina = total_paginas = 1
+        if amostragem is Amostragem.MINMAX:
+            posicoes = minmax(serie.indice, inicio, fim, max_pontos)
+        else:
+            posicoes = lttb(serie.ordinais, serie.valores, inicio, fim, max_pontos)
+        ordinais = array("i", map(serie.ordinais.__getitem__, posicoes))
+        valores = array("d", map(serie.valores.__getitem__, posicoes))
+    else:
+        total_paginas = max(1, math.ceil(total / tam))
+        offset = inicio + (pagina - 1) * tam
+        ordinais = serie.ordinais[offset:min(offset + tam, fim)]
+        valores = serie.valores[offset:min(offset + tam, fim)]
+
+    if formato is FormatoSerie.BINARIO:
+        return RespostaBinaria(
+            ordinais,
+            valores,
+            headers={
+                "X-Codigo": str(serie.codigo),
+                "X-Pagina": str(pagina),
+                "X-Total-Paginas": str(total_paginas),
+                "X-Total-Observacoes": str(total),
+            },
+        )
+
+    conteudo = {
+        "codigo": serie.codigo,
+        "nome": serie.nome,
+        "pagina": pagina,
+        "total_paginas": total_paginas,
+        "total_observacoes": total,
+    }
+    if formato is FormatoSerie.COLUNAR:
+        conteudo["datas"] = [date.fromordinal(o) for o in ordinais]
+        conteudo["valores"] = valores.tolist()
+    elif formato is FormatoSerie.DELTA:
+        conteudo["data_inicial"] = date.fromordinal(ordinais[0]) if ordinais else None
+        conteudo["deltas"] = deltas_dias(ordinais).tolist()
+        conteudo["valores"] = valores.tolist()
+    else:
+        conteudo["observacoes"] = [{"data": date.fromordinal(o), "valor": v} for o, v in zip(ordinais, valores)]
+    return RespostaJSON(conteudo)
 
 
 # ── GET /series/{codigo}/insights ────────────────────────────────────────────
@@ -172,39 +345,34 @@ def obter_insights(
     data_inicial: date | None = Query(None, description="Filtro data inicial"),
     data_final: date | None = Query(None, description="Filtro data final"),
     ultimas_n: int = Query(10, ge=1, le=100, description="Qtd de últimas observações"),
+    metricas: list[Metrica] = Query([], description="Métricas opcionais a calcular"),
+    janela_volatilidade: int = Query(21, ge=2, le=756, description="Janela da volatilidade móvel"),
+    meia_vida: float = Query(10.0, gt=0, le=1000, description="Meia-vida da EWMA (em observações)"),
+    janela_tendencia: int = Query(63, ge=3, le=2520, description="Janela da regressão móvel (em observações)"),
     db: Session = Depends(get_db),
 ):
     """Retorna métricas e insights calculados sobre a série."""
-    serie = db.query(Serie).filter(Serie.codigo == codigo).first()
-    if not serie:
-        raise HTTPException(status_code=404, detail="Série não encontrada. Faça o sync primeiro.")
+    serie = _carregar_serie(db, codigo)
 
-    query = db.query(Observacao).filter(Observacao.serie_id == serie.id)
-    if data_inicial:
-        query = query.filter(Observacao.data >= data_inicial)
-    if data_final:
-        query = query.filter(Observacao.data <= data_final)
-    obs = query.order_by(Observacao.data).all()
-
-    if not obs:
+    inicio, fim = serie.intervalo(data_inicial, data_final)
+    if inicio == fim:
         raise HTTPException(status_code=404, detail="Nenhuma observação encontrada para o período.")
 
-    resultado = calcular_insights(obs, ultimas_n=ultimas_n)
-
-    return InsightsResponse(
-        codigo=serie.codigo,
-        nome=serie.nome,
-        total_observacoes=resultado.total_observacoes,
-        data_inicio=resultado.data_inicio,
-        data_fim=resultado.data_fim,
-        valor_minimo=resultado.valor_minimo,
-        valor_maximo=resultado.valor_maximo,
-        data_minimo=resultado.data_minimo,
-        data_maximo=resultado.data_maximo,
-        variacao_absoluta=resultado.variacao_absoluta,
-        variacao_percentual=resultado.variacao_percentual,
-        media=resultado.media,
-        media_movel_7=resultado.media_movel_7,
-        media_movel_30=resultado.media_movel_30,
-        ultimas_observacoes=resultado.ultimas_observacoes,
+    resultado = calcular_insights_intervalo(
+        serie.ordinais,
+        serie.valores,
+        serie.indice,
+        inicio,
+        fim,
+        ultimas_n=ultimas_n,
+        metricas=metricas,
+        janela_volatilidade=janela_volatilidade,
+        meia_vida=meia_vida,
     )
+    if Metrica.TENDENCIA in metricas:
+        from app.services.tendencias import calcular_tendencia
+
+        # Regressão da série inteira em cache por versão; aqui só o recorte do período
+        resultado.tendencia = calcular_tendencia(serie, inicio, fim, janela_tendencia)
+
+    return RespostaJSON({"codigo": serie.codigo, "nome": serie.nome, **vars(resultado)})
@@ -0,0 +1,322 @@
+"""Linha de comando para carga e exportação em massa de séries (sem o BCB).
+
+Uso::
+
+    python -m app.cli importar dumps/ bcdata.sgs.433.json --processos 4
+    python -m app.cli exportar saida/ --codigos 432 433 --formato csv
+
+Os arquivos seguem o formato do BCB/SGS: JSON ``[{"data": "dd/mm/aaaa",
+"valor": "..."}]`` ou CSV ``data;valor`` (vírgula decimal). O código da série
+vem dos dígitos no fim do nome do arquivo (``432.json``,
+``bcdata.sgs.432.csv``). O parse roda em vários processos; a gravação usa
+``executemany`` em lotes no SQLite e ``COPY`` no Postgres, numa transação.
+"""
+
+import argparse
+import csv
+import io
+import os
+import re
+import time
+from array import array
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import partial
+from itertools import repeat
+from pathlib import Path
+
+import orjson
+from sqlalchemy import delete, insert, select, text, update
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.models import DataOrdinal, DigestBloco, Observacao, Serie, TipoData
+from app.db.schema import preparar_banco
+from app.db.session import engine as engine_padrao
+from app.db.upsert import upsert
+from app.services.bcb_client import nome_serie
+from app.services.derivadas import eh_virtual
+from app.services.ingestao import lock_entre_processos
+from app.services.store import store
+
+EXTENSOES = (".json", ".csv")
+_CODIGO_NO_NOME = re.compile(r"(\d+)$")
+
+
+@dataclass
+class ResumoCarga:
+    """Volume e duração de uma importação/exportação."""
+
+    series: int
+    linhas: int
+    segundos: float
+
+    @property
+    def linhas_por_segundo(self) -> float:
+        return self.linhas / self.segundos if self.segundos else 0.0
+
+    def formatar(self, acao: str) -> str:
+        return (
+            f"{acao}: {self.linhas:,} linhas de {self.series} séries em {self.segundos:.2f} s "
+            f"({self.linhas_por_segundo:,.0f} linhas/s)"
+        )
+
+
+# ── Parse (roda nos processos do pool) ───────────────────────────────────────
+
+
+def codigo_do_arquivo(caminho: Path) -> int:
+    """Código SGS a partir do nome do arquivo (``432.json``, ``bcdata.sgs.432.csv``).
+
+    Códigos de séries derivadas (``eh_virtual``) são recusados.
+    """
+    encontrado = _CODIGO_NO_NOME.search(caminho.stem)
+    if encontrado is None:
+        raise ValueError(f"Nome de arquivo sem código de série: {caminho.name}")
+    codigo = int(encontrado.group(1))
+    if eh_virtual(codigo):
+        # Séries derivadas são calculadas, nunca gravadas em ``observacoes``
+        raise ValueError(f"Código {codigo} é de série derivada e não pode ser importado: {caminho.name}")
+    return codigo
+
+
+def _ordinal(data: str) -> int:
+    """``dd/mm/aaaa`` → ordinal (fatiamento: bem mais rápido que ``strptime``)."""
+    return date(int(data[6:10]), int(data[3:5]), int(data[:2])).toordinal()
+
+
+def _registros_csv(caminho: Path) -> Iterator[tuple[str, str]]:
+    with open(caminho, newline="", encoding="utf-8-sig") as f:
+        cabecalho = f.readline()
+        separador = ";" if ";" in cabecalho else ","
+        for linha in csv.reader(f, delimiter=separador):
+            if len(linha) >= 2:
+                # CSV do BCB usa ";" com vírgula decimal
+                yield linha[0], linha[1].replace(",", ".") if separador == ";" else linha[1]
+
+
+def ler_arquivo(caminho: Path) -> tuple[int, array, array]:
+    """Lê um dump e devolve ``(codigo, ordinais, valores)``.
+
+    Como em ``buscar_serie``, registros sem valor numérico são descartados.
+    """
+    codigo = codigo_do_arquivo(caminho)
+    if caminho.suffix.lower() == ".csv":
+        registros: Iterable[tuple[str, str]] = _registros_csv(caminho)
+    else:
+        registros = ((item["data"], item["valor"]) for item in orjson.loads(caminho.read_bytes()))
+
+    ordinais, valores = array("i"), array("d")
+    for data, bruto in registros:
+        try:
+            valor = float(bruto)
+        except (ValueError, TypeError):
+            continue
+        ordinais.append(_ordinal(data))
+        valores.append(valor)
+    return codigo, ordinais, valores
+
+
+def _ler_para_carga(caminho: Path, datas_ordinais: bool) -> tuple[int, list | array, array]:
+    """``ler_arquivo`` com as datas já no formato gravado (ISO ou ordinal), ainda no processo filho."""
+    codigo, ordinais, valores = ler_arquivo(caminho)
+    if datas_ordinais:
+        return codigo, ordinais, valores
+    return codigo, [date.fromordinal(o).isoformat() for o in ordinais], valores
+
+
+def listar_arquivos(caminhos: Iterable[Path]) -> list[Path]:
+    """Expande diretórios nos dumps ``.json``/``.csv`` que contêm."""
+    arquivos: list[Path] = []
+    for caminho in caminhos:
+        if caminho.is_dir():
+            arquivos.extend(sorted(p for p in caminho.iterdir() if p.suffix.lower() in EXTENSOES))
+        else:
+            arquivos.append(caminho)
+    return arquivos
+
+
+# ── Importação ───────────────────────────────────────────────────────────────
+
+
+def importar(
+    caminhos: Iterable[Path],
+    engine: Engine = engine_padrao,
+    processos: int | None = None,
+    lote: int = 50_000,
+) -> ResumoCarga:
+    """Carrega dumps no banco (upsert por ``(serie_id, data)``) numa só transação.
+
+    Ao final, as séries importadas têm ``ultima_sync`` atualizada, digests de
+    sync invalidados (o próximo sync recontará a série) e arquivos do store
+    descartados.
+    """
+    arquivos = listar_arquivos(caminhos)
+    codigos = {codigo_do_arquivo(arquivo) for arquivo in arquivos}  # valida nomes antes de começar
+    preparar_banco(engine, settings.DB_INICIALIZACAO)
+
+    processos = max(1, min(processos or os.cpu_count() or 1, len(arquivos)))
+    postgres = engine.dialect.name == "postgresql"
+
+    inicio = time.perf_counter()
+    linhas = 0
+    with (
+        ProcessPoolExecutor(processos) as pool,
+        lock_entre_processos(engine),
+        engine.begin() as conn,
+    ):
+        ids = _garantir_series(conn, codigos)
+        if postgres:
+            _criar_tabela_carga(conn)
+        gravar = _gravar_copy if postgres else _gravar_executemany
+        ler = partial(_ler_para_carga, datas_ordinais=TipoData is DataOrdinal)
+        for codigo, datas, valores in pool.map(ler, arquivos):
+            linhas += gravar(conn, ids[codigo], datas, valores, lote)
+            logger.info("Série %d: %d linhas", codigo, len(valores))
+        if postgres:
+            _aplicar_carga_postgres(conn)
+
+        conn.execute(delete(DigestBloco).where(DigestBloco.serie_id.in_(ids.values())))
+        conn.execute(update(Serie).where(Serie.id.in_(ids.values())).values(ultima_sync=datetime.utcnow()))
+
+    for codigo in codigos:
+        store.invalidar(codigo)
+    return ResumoCarga(series=len(codigos), linhas=linhas, segundos=time.perf_counter() - inicio)
+
+
+def _garantir_series(conn: Connection, codigos: set[int]) -> dict[int, int]:
+    """Cria as séries que faltam; retorna ``{codigo: serie_id}``."""
+    consulta = select(Serie.codigo, Serie.id).where(Serie.codigo.in_(codigos))
+    ids = dict(conn.execute(consulta).all())
+    faltando = codigos - ids.keys()
+    if faltando:
+        conn.execute(insert(Serie), [{"codigo": c, "nome": nome_serie(c)} for c in sorted(faltando)])
+        ids = dict(conn.execute(consulta).all())
+    return ids
+
+
+def _gravar_executemany(conn: Connection, serie_id: int, datas: list, valores: array, lote: int) -> int:
+    """Upsert em lotes via ``executemany`` do driver (sem processamento por linha do ORM)."""
+    compilado = upsert(Observacao.__table__, ["serie_id", "data"], ["valor"], conn.dialect.name).compile(
+        dialect=conn.dialect, column_keys=["serie_id", "data", "valor"]
+    )
+    sql = str(compilado)
+    for inicio in range(0, len(valores), lote):
+        fim = inicio + lote
+        colunas = {"serie_id": repeat(serie_id), "data": datas[inicio:fim], "valor": valores[inicio:fim]}
+        conn.exec_driver_sql(sql, list(zip(*(colunas[nome] for nome in compilado.positiontup))))
+    return len(valores)
+
+
+_TABELA_CARGA = "carga_observacoes"
+
+
+def _criar_tabela_carga(conn: Connection) -> None:
+    tipo_data = Observacao.__table__.c.data.type.compile(dialect=conn.dialect)
+    conn.execute(text(
+        f"CREATE TEMP TABLE {_TABELA_CARGA} "
+        f"(serie_id integer, data {tipo_data}, valor double precision) ON COMMIT DROP"
+    ))
+
+
+def _gravar_copy(conn: Connection, serie_id: int, datas: list, valores: array, lote: int) -> int:
+    """``COPY`` para a tabela temporária; o upsert final roda em ``_aplicar_carga_postgres``."""
+    cursor = conn.connection.driver_connection.cursor()
+    comando = f"COPY {_TABELA_CARGA} (serie_id, data, valor) FROM STDIN"
+    try:
+        for inicio in range(0, len(valores), lote):
+            buffer = io.StringIO()
+            for data, valor in zip(datas[inicio:inicio + lote], valores[inicio:inicio + lote]):
+                buffer.write(f"{serie_id}\t{data}\t{valor!r}\n")
+            if hasattr(cursor, "copy_expert"):  # psycopg2
+                buffer.seek(0)
+                cursor.copy_expert(comando, buffer)
+            else:  # psycopg 3
+                with cursor.copy(comando) as copia:
+                    copia.write(buffer.getvalue())
+    finally:
+        cursor.close()
+    return len(valores)
+
+
+def _aplicar_carga_postgres(conn: Connection) -> None:
+    """Move a carga para ``observacoes`` num único ``INSERT ... ON CONFLICT``."""
+    conn.execute(text(
+        f"INSERT INTO {Observacao.__tablename__} (serie_id, data, valor) "
+        f"SELECT DISTINCT ON (serie_id, data) serie_id, data, valor FROM {_TABELA_CARGA} "
+        "ORDER BY serie_id, data "
+        "ON CONFLICT (serie_id, data) DO UPDATE SET valor = EXCLUDED.valor"
+    ))
+
+
+# ── Exportação ───────────────────────────────────────────────────────────────
+
+
+def exportar(
+    diretorio: Path,
+    codigos: Iterable[int] | None = None,
+    formato: str = "json",
+    engine: Engine = engine_padrao,
+) -> ResumoCarga:
+    """Grava cada série em ``<diretorio>/<codigo>.<formato>`` no formato do BCB."""
+    diretorio.mkdir(parents=True, exist_ok=True)
+    inicio = time.perf_counter()
+    linhas = 0
+    with engine.connect() as conn:
+        consulta = select(Serie.id, Serie.codigo).order_by(Serie.codigo)
+        if codigos:
+            consulta = consulta.where(Serie.codigo.in_(list(codigos)))
+        series = conn.execute(consulta).all()
+        for serie_id, codigo in series:
+            pontos = conn.execute(
+                select(Observacao.data, Observacao.valor)
+                .where(Observacao.serie_id == serie_id)
+                .order_by(Observacao.data)
+            ).all()
+            _escrever(diretorio / f"{codigo}.{formato}", pontos, formato)
+            linhas += len(pontos)
+    return ResumoCarga(series=len(series), linhas=linhas, segundos=time.perf_counter() - inicio)
+
+
+def _escrever(arquivo: Path, pontos: list, formato: str) -> None:
+    datas = [f"{d.day:02d}/{d.month:02d}/{d.year}" for d, _ in pontos]
+    # repr: menor texto que volta exatamente ao mesmo float
+    valores = [repr(valor) for _, valor in pontos]
+    if formato == "csv":
+        corpo = "data;valor\n" + "".join(f"{d};{v.replace('.', ',')}\n" for d, v in zip(datas, valores))
+        arquivo.write_text(corpo, encoding="utf-8")
+    else:
+        arquivo.write_bytes(orjson.dumps([{"data": d, "valor": v} for d, v in zip(datas, valores)]))
+
+
+# ── Entrada ──────────────────────────────────────────────────────────────────
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__.splitlines()[0])
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    imp = comandos.add_parser("importar", help="carrega dumps JSON/CSV do BCB no banco")
+    imp.add_argument("caminhos", nargs="+", type=Path, help="arquivos ou diretórios")
+    imp.add_argument("--processos", type=int, default=os.cpu_count(), help="processos de parse")
+    imp.add_argument("--lote", type=int, default=50_000, help="linhas por executemany/COPY")
+
+    exp = comandos.add_parser("exportar", help="grava as séries do banco em arquivos")
+    exp.add_argument("diretorio", type=Path)
+    exp.add_argument("--codigos", type=int, nargs="*", help="padrão: todas as séries")
+    exp.add_argument("--formato", choices=("json", "csv"), default="json")
+
+    args = parser.parse_args(argv)
+    if args.comando == "importar":
+        resumo = importar(args.caminhos, processos=args.processos, lote=args.lote)
+        print(resumo.formatar("Importadas"))
+    else:
+        resumo = exportar(args.diretorio, args.codigos, args.formato)
+        print(resumo.formatar("Exportadas"))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 """Configurações centrais da aplicação (via variáveis de ambiente)."""
 
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -12,6 +14,17 @@ class Settings(BaseSettings):
 
     # Banco de dados
     DATABASE_URL: str = "sqlite:///./macro_insights.db"
+    # Layout das observações: PK (serie_id, data) sem id surrogate (WITHOUT ROWID no SQLite)
+    DB_LAYOUT_COMPACTO: bool = False
+    # Datas das observações gravadas como inteiros (ordinal do dia)
+    DB_DATAS_ORDINAIS: bool = False
+    # Boot: "verificar" (1 query; create_all só se o schema mudou), "criar" ou "nenhuma"
+    DB_INICIALIZACAO: Literal["verificar", "criar", "nenhuma"] = "verificar"
+
+    # Ingestão (escritor único)
+    INGESTAO_MAX_LINHAS_LOTE: int = 50_000  # linhas por transação agrupada
+    INGESTAO_ESPERA_MS: int = 5             # espera para agrupar syncs concorrentes
+    SQLITE_BUSY_TIMEOUT_MS: int = 30_000
 
     # BCB
     BCB_BASE_URL: str = "https://api.bcb.gov.br/dados/serie/bcdata.sgs"
@@ -20,6 +33,23 @@ class Settings(BaseSettings):
     # Paginação padrão
     PAGE_SIZE: int = 50
 
+    # Store em memória das séries
+    STORE_LIMITE_MB: int = 256
+    STORE_DIRETORIO: str | None = None  # persistência via mmap (desligada se vazio)
+    # Aquecimento das séries fixas: numa thread após o boot, no boot, ou sob demanda
+    STORE_AQUECIMENTO: Literal["boot", "segundo_plano", "desligado"] = "segundo_plano"
+    # Intervalo entre conferências da série em memória contra o banco (syncs de outros workers)
+    STORE_VALIDADE_S: float = 1.0
+    # Caches de séries derivadas e de regressões de tendência (LRU próprio, fora do teto do store)
+    DERIVADAS_LIMITE_MB: int = 32
+    TENDENCIAS_LIMITE_MB: int = 32
+
+    # Stream SSE: intervalo entre conferências de syncs feitos por outros workers
+    EVENTOS_REPASSE_S: float = 2.0
+
+    # Compressão de respostas (gzip sempre; br/zstd se instalados)
+    COMPRESSAO_MIN_BYTES: int = 1024
+
     # CORS
     CORS_ORIGINS: list[str] = ["*"]
 
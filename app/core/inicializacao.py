@@ -0,0 +1,31 @@
+"""Medição do tempo de inicialização por etapa (imports, schema, store...)."""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+
+@dataclass
+class TemposInicializacao:
+    """Tempos em ms de cada etapa do boot, na ordem em que rodaram."""
+
+    etapas: dict[str, float] = field(default_factory=dict)
+
+    @contextmanager
+    def medir(self, etapa: str) -> Iterator[None]:
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.etapas[etapa] = round((time.perf_counter() - inicio) * 1000, 2)
+
+    @property
+    def total_ms(self) -> float:
+        return round(sum(self.etapas.values()), 2)
+
+    def resumo(self) -> dict[str, float]:
+        return {**self.etapas, "total": self.total_ms}
+
+    def formatar(self) -> str:
+        return ", ".join(f"{etapa}={ms:.1f}ms" for etapa, ms in self.etapas.items())
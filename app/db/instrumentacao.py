@@ -0,0 +1,90 @@
+"""Instrumentação de queries SQL via eventos do SQLAlchemy.
+
+Conta statements e tempo total de banco por requisição (exposto como headers
+em modo DEBUG) e oferece um contador global usado pelos testes para travar
+orçamentos de queries por endpoint.
+"""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@dataclass
+class ContadorQueries:
+    """Acumula quantidade de statements e tempo total gasto no banco."""
+
+    total: int = 0
+    tempo_ms: float = 0.0
+    statements: list[str] = field(default_factory=list)
+
+    def registrar(self, statement: str, duracao_s: float) -> None:
+        self.total += 1
+        self.tempo_ms += duracao_s * 1000
+        self.statements.append(statement)
+
+
+# Contador da requisição corrente (propagado para o threadpool via contextvars)
+_contador_requisicao: ContextVar[ContadorQueries | None] = ContextVar(
+    "contador_requisicao", default=None
+)
+
+# Contadores globais ativos (usados pelos testes, independem de contexto)
+_contadores_globais: list[ContadorQueries] = []
+
+
+def _antes_execucao(conn, cursor, statement, parameters, context, executemany) -> None:
+    # No contexto do statement, não na conexão: se ele falhar, ``after_cursor_execute``
+    # não dispara e o início descartado morre junto com o contexto
+    if context is not None:
+        context._inicio_query = time.perf_counter()
+
+
+def _depois_execucao(conn, cursor, statement, parameters, context, executemany) -> None:
+    inicio = getattr(context, "_inicio_query", None)
+    duracao = time.perf_counter() - inicio if inicio is not None else 0.0
+
+    contador = _contador_requisicao.get()
+    if contador is not None:
+        contador.registrar(statement, duracao)
+    for contador_global in _contadores_globais:
+        contador_global.registrar(statement, duracao)
+
+
+def instrumentar_engine(engine: Engine) -> None:
+    """Registra os listeners de contagem no engine (idempotente)."""
+    if event.contains(engine, "before_cursor_execute", _antes_execucao):
+        return
+    event.listen(engine, "before_cursor_execute", _antes_execucao)
+    event.listen(engine, "after_cursor_execute", _depois_execucao)
+
+
+@contextmanager
+def medir_requisicao() -> Iterator[ContadorQueries]:
+    """Mede as queries emitidas no contexto atual (uma requisição HTTP)."""
+    contador = ContadorQueries()
+    token = _contador_requisicao.set(contador)
+    try:
+        yield contador
+    finally:
+        _contador_requisicao.reset(token)
+
+
+@contextmanager
+def contar_queries() -> Iterator[ContadorQueries]:
+    """Conta todas as queries de engines instrumentados enquanto ativo.
+
+    Não depende de contexto, então enxerga também queries emitidas em outras
+    threads (ex.: o event loop do ``TestClient``).
+    """
+    contador = ContadorQueries()
+    _contadores_globais.append(contador)
+    try:
+        yield contador
+    finally:
+        _contadores_globais.remove(contador)
@@ -0,0 +1,115 @@
+"""Migração da tabela de observações para o layout configurado.
+
+Converte bancos existentes entre o layout padrão (``id`` surrogate + índice em
+``serie_id`` + ``uq_serie_data``) e o compacto (PK ``(serie_id, data)``,
+``WITHOUT ROWID`` no SQLite / ``CLUSTER`` no Postgres), e entre datas ``DATE``
+e inteiros ordinais, conforme ``DB_LAYOUT_COMPACTO`` e ``DB_DATAS_ORDINAIS``.
+
+Uso::
+
+    DB_LAYOUT_COMPACTO=true DB_DATAS_ORDINAIS=true python -m app.db.migracoes
+"""
+
+from sqlalchemy import Column, Date, Float, Integer, MetaData, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.base import Base
+from app.db.models import DataOrdinal, Observacao, TipoData
+from app.db.schema import gravar_assinatura
+from app.db.session import engine as engine_padrao
+
+TABELA = Observacao.__tablename__
+TABELA_ANTIGA = f"{TABELA}_antiga"
+
+
+def layout_atual(engine: Engine) -> tuple[bool, bool] | None:
+    """Retorna ``(compacto, datas_ordinais)`` da tabela existente, ou ``None``."""
+    inspetor = inspect(engine)
+    if not inspetor.has_table(TABELA):
+        return None
+    colunas = {c["name"]: c["type"] for c in inspetor.get_columns(TABELA)}
+    return "id" not in colunas, isinstance(colunas["data"], Integer)
+
+
+def layout_configurado() -> tuple[bool, bool]:
+    """``(compacto, datas_ordinais)`` pedido pelas settings."""
+    return settings.DB_LAYOUT_COMPACTO, TipoData is DataOrdinal
+
+
+def migrar_observacoes(engine: Engine = engine_padrao, lote: int = 50_000) -> int:
+    """Reescreve ``observacoes`` no layout configurado. Retorna linhas copiadas.
+
+    Ao final grava a assinatura do schema, liberando o boot da aplicação.
+    """
+    atual = layout_atual(engine)
+    if atual is None or atual == layout_configurado():
+        logger.info("Tabela %s já está no layout configurado.", TABELA)
+        if atual is not None:
+            with engine.begin() as conn:
+                _concluir(conn)
+        return 0
+
+    _, ordinais_antigos = atual
+    antiga = Table(
+        TABELA_ANTIGA,
+        MetaData(),
+        Column("serie_id", Integer),
+        Column("data", DataOrdinal if ordinais_antigos else Date),
+        Column("valor", Float),
+    )
+
+    copiadas = 0
+    with engine.begin() as conn:
+        _renomear_antiga(conn)
+        Observacao.__table__.create(conn)
+
+        resultado = conn.execute(
+            select(antiga.c.serie_id, antiga.c.data, antiga.c.valor)
+            .order_by(antiga.c.serie_id, antiga.c.data)
+            .execution_options(yield_per=lote)
+        )
+        for parte in resultado.partitions(lote):
+            conn.execute(Observacao.__table__.insert(), [row._asdict() for row in parte])
+            copiadas += len(parte)
+
+        conn.execute(text(f"DROP TABLE {TABELA_ANTIGA}"))
+        if conn.dialect.name == "postgresql" and settings.DB_LAYOUT_COMPACTO:
+            # Postgres não mantém a ordem física: reordena uma vez pela PK
+            conn.execute(text(f"CLUSTER {TABELA} USING {TABELA}_pkey"))
+        _concluir(conn)
+
+    if engine.dialect.name == "sqlite":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+
+    logger.info("Migração de %s concluída: %d linhas copiadas.", TABELA, copiadas)
+    return copiadas
+
+
+def _concluir(conn: Connection) -> None:
+    """Cria tabelas que faltem e grava a assinatura do schema (o boot passa a aceitar o banco)."""
+    Base.metadata.create_all(bind=conn)
+    gravar_assinatura(conn)
+
+
+def _renomear_antiga(conn: Connection) -> None:
+    """Tira a tabela antiga do caminho, liberando nomes de índices/constraints."""
+    inspetor = inspect(conn)
+    indices = [i["name"] for i in inspetor.get_indexes(TABELA)]
+    unicas = [u["name"] for u in inspetor.get_unique_constraints(TABELA) if u["name"]]
+    pk = inspetor.get_pk_constraint(TABELA).get("name")
+
+    conn.execute(text(f"ALTER TABLE {TABELA} RENAME TO {TABELA_ANTIGA}"))
+    for nome in indices:
+        conn.execute(text(f"DROP INDEX {nome}"))
+    if conn.dialect.name == "postgresql":
+        for nome in unicas:
+            conn.execute(text(f"ALTER TABLE {TABELA_ANTIGA} DROP CONSTRAINT {nome}"))
+        if pk:
+            conn.execute(text(f"ALTER INDEX {pk} RENAME TO {TABELA_ANTIGA}_pkey"))
+
+
+if __name__ == "__main__":
+    migrar_observacoes()
@@ -4,10 +4,29 @@ from datetime import date, datetime
 
 from sqlalchemy import Date, DateTime, Float, Integer, String, Text, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.types import TypeDecorator
 
+from app.core.config import settings
 from app.db.base import Base
 
 
+class DataOrdinal(TypeDecorator):
+    """``date`` gravada como inteiro (dias desde 0001-01-01, ``date.toordinal``)."""
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return value.toordinal() if isinstance(value, date) else value
+
+    def process_result_value(self, value, dialect):
+        return date.fromordinal(value) if value is not None else None
+
+
+# Tipo da coluna de data das observações (ver ``DB_DATAS_ORDINAIS``)
+TipoData = DataOrdinal if settings.DB_DATAS_ORDINAIS else Date
+
+
 class Serie(Base):
     """Metadados de uma série econômica do BCB/SGS."""
 
@@ -32,16 +51,50 @@ class Observacao(Base):
     """Um ponto de dado (data + valor) dentro de uma série."""
 
     __tablename__ = "observacoes"
-    __table_args__ = (
-        UniqueConstraint("serie_id", "data", name="uq_serie_data"),
-    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    serie_id: Mapped[int] = mapped_column(Integer, ForeignKey("series.id"), nullable=False, index=True)
-    data: Mapped[date] = mapped_column(Date, nullable=False)
+    if settings.DB_LAYOUT_COMPACTO:
+        # (serie_id, data) é a própria chave clusterizada: uma única B-tree por linha
+        __table_args__ = ({"sqlite_with_rowid": False},)
+
+        serie_id: Mapped[int] = mapped_column(Integer, ForeignKey("series.id"), primary_key=True)
+        data: Mapped[date] = mapped_column(TipoData, primary_key=True)
+    else:
+        __table_args__ = (
+            UniqueConstraint("serie_id", "data", name="uq_serie_data"),
+        )
+
+        id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+        serie_id: Mapped[int] = mapped_column(Integer, ForeignKey("series.id"), nullable=False, index=True)
+        data: Mapped[date] = mapped_column(TipoData, nullable=False)
+
     valor: Mapped[float] = mapped_column(Float, nullable=False)
 
     serie: Mapped["Serie"] = relationship(back_populates="observacoes")
 
     def __repr__(self) -> str:
         return f"<Observacao data={self.data} valor={self.valor}>"
+
+
+class DigestBloco(Base):
+    """Resumo de um bloco anual de observações de uma série (ver ``app.services.ingestao``).
+
+    ``linhas`` é a contagem no banco para o ano; ``digest`` é o hash do último
+    payload do BCB que cobriu o ano inteiro (``None`` se o bloco só foi
+    sincronizado parcialmente).
+    """
+
+    __tablename__ = "sync_digests"
+
+    serie_id: Mapped[int] = mapped_column(Integer, ForeignKey("series.id"), primary_key=True)
+    ano: Mapped[int] = mapped_column(Integer, primary_key=True)
+    linhas: Mapped[int] = mapped_column(Integer, nullable=False)
+    digest: Mapped[str | None] = mapped_column(String(32), nullable=True)
+
+
+class VersaoSchema(Base):
+    """Assinatura do schema aplicado ao banco (ver ``app.db.schema``)."""
+
+    __tablename__ = "schema_versao"
+
+    assinatura: Mapped[str] = mapped_column(String(64), primary_key=True)
+    gravada_em: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
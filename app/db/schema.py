@@ -0,0 +1,99 @@
+"""Verificação do schema no boot com uma única query.
+
+Em vez de rodar ``create_all`` a cada início de processo (uma inspeção por
+tabela), o boot compara a assinatura dos modelos (hash de tabelas, colunas,
+tipos e índices) com a gravada em ``schema_versao``. ``create_all`` só roda
+quando o banco é novo ou os modelos mudaram. ``create_all`` não altera
+tabelas existentes: se ``observacoes`` está num layout diferente do
+configurado (``DB_LAYOUT_COMPACTO``/``DB_DATAS_ORDINAIS``), o boot é recusado
+até ``python -m app.db.migracoes`` rodar (a migração grava a assinatura).
+"""
+
+import hashlib
+from typing import Literal
+
+from sqlalchemy import delete, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from app.core.logging import logger
+from app.db.base import Base
+from app.db.models import VersaoSchema
+
+ModoInicializacao = Literal["verificar", "criar", "nenhuma"]
+
+
+class SchemaDesatualizado(RuntimeError):
+    """A tabela de observações existente não está no layout configurado."""
+
+
+def assinatura_schema() -> str:
+    """Hash estável do schema declarado nos modelos (muda com layout/colunas)."""
+    partes: list[str] = []
+    for tabela in Base.metadata.sorted_tables:
+        if tabela.name == VersaoSchema.__tablename__:
+            continue
+        partes.append(tabela.name)
+        for coluna in tabela.columns:
+            partes.append(
+                f"{coluna.name}:{type(coluna.type).__name__}:{coluna.primary_key}:{coluna.nullable}"
+            )
+        partes.extend(sorted(f"ix:{i.name}" for i in tabela.indexes))
+        partes.extend(sorted(f"c:{c.name}" for c in tabela.constraints if c.name))
+        partes.extend(f"{k}={v}" for k, v in sorted(tabela.dialect_kwargs.items()))
+    return hashlib.sha256("|".join(partes).encode()).hexdigest()
+
+
+def garantir_schema(engine: Engine) -> str:
+    """Cria/atualiza o schema só se necessário.
+
+    Retorna ``"verificado"`` (assinatura confere; uma query), ``"criado"``
+    (banco sem assinatura) ou ``"atualizado"`` (modelos mudaram).
+    """
+    esperada = assinatura_schema()
+    try:
+        with engine.connect() as conn:
+            # Core puro: não dispara a configuração dos mappers do ORM no boot
+            gravada = conn.execute(select(VersaoSchema.__table__.c.assinatura)).scalar()
+    except (OperationalError, ProgrammingError):
+        gravada = None  # banco novo ou anterior à tabela de versão
+    if gravada == esperada:
+        return "verificado"
+
+    # Só aqui (assinatura divergente): migracoes importa este módulo
+    from app.db.migracoes import layout_atual, layout_configurado
+
+    atual = layout_atual(engine)
+    if atual is not None and atual != layout_configurado():
+        raise SchemaDesatualizado(
+            f"Tabela observacoes no layout (compacto, datas_ordinais)={atual}, mas a configuração pede "
+            f"{layout_configurado()}: rode `python -m app.db.migracoes` antes de subir a aplicação."
+        )
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        gravar_assinatura(conn, esperada)
+    if gravada is None:
+        return "criado"
+    logger.warning(
+        "Schema dos modelos mudou: tabelas novas foram criadas; mudanças de layout em "
+        "tabelas existentes exigem `python -m app.db.migracoes`."
+    )
+    return "atualizado"
+
+
+def gravar_assinatura(conn: Connection, assinatura: str | None = None) -> None:
+    """Registra a assinatura dos modelos (padrão: a atual) como a do banco."""
+    VersaoSchema.__table__.create(conn, checkfirst=True)
+    conn.execute(delete(VersaoSchema))
+    conn.execute(VersaoSchema.__table__.insert().values(assinatura=assinatura or assinatura_schema()))
+
+
+def preparar_banco(engine: Engine, modo: ModoInicializacao = "verificar") -> str:
+    """Aplica ``DB_INICIALIZACAO``: ``verificar``, ``criar`` (sempre ``create_all``) ou ``nenhuma``."""
+    if modo == "nenhuma":
+        return "ignorado"
+    if modo == "criar":
+        Base.metadata.create_all(bind=engine)
+        return "criado"
+    return garantir_schema(engine)
@@ -2,17 +2,29 @@
 
 from collections.abc import Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
 from app.db.base import Base
+from app.db.instrumentacao import instrumentar_engine
 
 engine = create_engine(
     settings.DATABASE_URL,
     connect_args={"check_same_thread": False},  # necessário para SQLite
     echo=settings.DEBUG,
 )
+instrumentar_engine(engine)
+
+if engine.dialect.name == "sqlite":
+
+    @event.listens_for(engine, "connect")
+    def _configurar_sqlite(conexao, _registro) -> None:
+        """WAL: leituras seguem em paralelo enquanto o escritor único grava."""
+        cursor = conexao.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
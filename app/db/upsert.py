@@ -0,0 +1,16 @@
+"""``INSERT ... ON CONFLICT DO UPDATE`` em lote para SQLite e Postgres."""
+
+from sqlalchemy.sql.dml import Insert
+
+
+def upsert(modelo, chaves: list[str], atualizar: list[str], dialeto: str) -> Insert:
+    """Statement de upsert de ``modelo`` para executar com uma lista de linhas (executemany)."""
+    if dialeto == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(modelo)
+    return stmt.on_conflict_do_update(
+        index_elements=chaves,
+        set_={coluna: stmt.excluded[coluna] for coluna in atualizar},
+    )
@@ -1,25 +1,55 @@
 """Macro Insights API – ponto de entrada da aplicação FastAPI."""
 
+import sys
+import time
+
+_INICIO_IMPORTACAO = time.perf_counter()  # antes dos imports pesados (fastapi, sqlalchemy)
+
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 
+from app.api.compressao import CompressaoMiddleware
 from app.api.routes_series import router as series_router
 from app.core.config import settings
+from app.core.inicializacao import TemposInicializacao
 from app.core.logging import logger
-from app.db.session import init_db
+from app.db.instrumentacao import medir_requisicao
+from app.db.schema import preparar_banco
+from app.db.session import SessionLocal, engine
+
+_IMPORTACAO_MS = round((time.perf_counter() - _INICIO_IMPORTACAO) * 1000, 2)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Inicializa recursos ao subir a aplicação."""
-    logger.info("Inicializando banco de dados...")
-    init_db()
-    logger.info("Banco de dados pronto.")
+    tempos = TemposInicializacao({"importacao": _IMPORTACAO_MS})
+    with tempos.medir("schema"):
+        estado = preparar_banco(engine, settings.DB_INICIALIZACAO)
+    with tempos.medir("store"):
+        if settings.STORE_AQUECIMENTO != "desligado":
+            from app.services.store import store
+
+            if settings.STORE_AQUECIMENTO == "boot":
+                with SessionLocal() as db:
+                    store.aquecer(db)
+            else:
+                store.aquecer_em_segundo_plano(SessionLocal)
+    app.state.inicializacao = tempos
+    logger.info("Inicialização em %.1f ms (%s); schema %s.", tempos.total_ms, tempos.formatar(), estado)
     yield
+    # Streams SSE abertos seguram o shutdown: encerra-os primeiro
+    eventos = sys.modules.get("app.services.eventos")
+    if eventos is not None:
+        eventos.barramento.encerrar()
+    # O escritor só existe se algum sync importou a ingestão
+    ingestao = sys.modules.get("app.services.ingestao")
+    if ingestao is not None:
+        ingestao.escritor.parar()
     logger.info("Encerrando aplicação.")
 
 
@@ -42,6 +72,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(CompressaoMiddleware, minimo_bytes=settings.COMPRESSAO_MIN_BYTES)
+
+if settings.DEBUG:
+
+    @app.middleware("http")
+    async def medir_queries(request: Request, call_next):
+        """Expõe quantidade de queries e tempo de banco da requisição em headers."""
+        with medir_requisicao() as contador:
+            response = await call_next(request)
+        response.headers["X-DB-Queries"] = str(contador.total)
+        response.headers["X-DB-Tempo-Ms"] = f"{contador.tempo_ms:.2f}"
+        return response
+
+
 app.include_router(series_router)
 
 STATIC_INDEX = Path(__file__).parent / "static" / "index.html"
@@ -54,10 +98,14 @@ def web_app():
 
 
 @app.get("/", tags=["Health"])
-def root():
-    """Health-check simples."""
-    return {
+def root(request: Request):
+    """Health-check simples (em DEBUG, inclui os tempos de inicialização)."""
+    resposta = {
         "app": settings.APP_NAME,
         "versao": settings.APP_VERSION,
         "status": "ok",
     }
+    tempos = getattr(request.app.state, "inicializacao", None)
+    if settings.DEBUG and tempos is not None:
+        resposta["inicializacao_ms"] = tempos.resumo()
+    return resposta
@@ -1,6 +1,8 @@
 """Schemas Pydantic para request/response das séries."""
 
 from datetime import date, datetime
+from enum import Enum
+from typing import Literal
 
 from pydantic import BaseModel, Field
 
@@ -13,6 +15,20 @@ class SyncRequest(BaseModel):
     data_final: date | None = Field(None, description="Data final no formato YYYY-MM-DD")
 
 
+class FormatoSerie(str, Enum):
+    """Formato de saída das observações em ``GET /series/{codigo}``."""
+    LINHAS = "linhas"
+    COLUNAR = "colunar"
+    DELTA = "delta"        # data inicial + deltas em dias + valores
+    BINARIO = "binario"    # buffer little-endian (ver ``RespostaBinaria``)
+
+
+class Amostragem(str, Enum):
+    """Algoritmo de redução de ``max_pontos`` em ``GET /series/{codigo}``."""
+    LTTB = "lttb"          # Largest-Triangle-Three-Buckets
+    MINMAX = "minmax"      # mínimo e máximo de cada balde
+
+
 # ── Response ─────────────────────────────────────────────────────────────────
 
 class ObservacaoOut(BaseModel):
@@ -23,6 +39,18 @@ class ObservacaoOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class PontoSerie(BaseModel):
+    """Ponto compacto (data + valor) de uma série calculada."""
+    data: date
+    valor: float
+
+
+class RetornoAnual(BaseModel):
+    """Retorno de uma série num ano-calendário."""
+    ano: int
+    retorno_percentual: float | None
+
+
 class SerieResumo(BaseModel):
     """Resumo de uma série cadastrada."""
     codigo: int
@@ -44,6 +72,17 @@ class SerieDetalhe(BaseModel):
     observacoes: list[ObservacaoOut]
 
 
+class SerieDetalheColunar(BaseModel):
+    """Série paginada em formato colunar (``formato=colunar``)."""
+    codigo: int
+    nome: str
+    pagina: int
+    total_paginas: int
+    total_observacoes: int
+    datas: list[date]
+    valores: list[float]
+
+
 class SyncResponse(BaseModel):
     """Resposta da sincronização."""
     codigo: int
@@ -51,6 +90,8 @@ class SyncResponse(BaseModel):
     registros_novos: int
     registros_atualizados: int
     total_registros: int
+    blocos_ignorados: int = Field(0, description="Anos sem mudança desde o último sync (digest igual)")
+    blocos_reescritos: int = Field(0, description="Anos comparados e regravados no banco")
     mensagem: str
 
 
@@ -60,6 +101,50 @@ class CatalogoSerieOut(BaseModel):
     nome: str
 
 
+class SerieDerivadaOut(BaseModel):
+    """Série virtual calculada a partir de outras (``GET /series/derivadas``)."""
+    codigo: int
+    nome: str
+    fontes: list[int]
+
+
+class SnapshotSerie(BaseModel):
+    """Últimos valores de uma série (``GET /series/snapshot``)."""
+    codigo: int
+    nome: str
+    ultima_sync: datetime | None = None
+    ultimo_valor: float
+    valor_anterior: float | None = None
+    variacao_absoluta: float | None = None
+    variacao_percentual: float | None = None
+    ultimas_observacoes: list[PontoSerie]
+
+
+class PontoTendencia(BaseModel):
+    """Reta ajustada na janela que termina em ``data``."""
+    data: date
+    inclinacao: float  # unidades da série por ano
+    r2: float
+
+
+class PontoVirada(BaseModel):
+    """Troca de direção da tendência (alta ↔ baixa)."""
+    data: date
+    de: Literal["alta", "baixa"]
+    para: Literal["alta", "baixa"]
+
+
+class Tendencia(BaseModel):
+    """Regressão linear móvel (``metricas=tendencia``)."""
+    janela: int
+    direcao: Literal["alta", "baixa", "estavel"]
+    desde: date
+    inclinacao: float
+    r2: float
+    pontos_virada: list[PontoVirada]
+    serie: list[PontoTendencia]
+
+
 class InsightsResponse(BaseModel):
     """Métricas calculadas sobre a série."""
     codigo: int
@@ -77,7 +162,41 @@ class InsightsResponse(BaseModel):
     variacao_percentual: float | None
 
     media: float | None
-    media_movel_7: list[dict] | None
-    media_movel_30: list[dict] | None
-
-    ultimas_observacoes: list[dict]
+    media_movel_7: list[PontoSerie] | None
+    media_movel_30: list[PontoSerie] | None
+
+    ultimas_observacoes: list[PontoSerie]
+
+    # Métricas opcionais (parâmetro ``metricas``); volatilidades em % por período
+    desvio_padrao: float | None = None
+    volatilidade: float | None = None
+    volatilidade_movel: list[PontoSerie] | None = None
+    ewma: list[PontoSerie] | None = None
+    quantis: dict[str, float] | None = None
+    drawdown_maximo: float | None = None
+    data_pico_drawdown: date | None = None
+    data_vale_drawdown: date | None = None
+    retornos_anuais: list[RetornoAnual] | None = None
+    tendencia: Tendencia | None = None
+
+
+class SerieDetalheDelta(BaseModel):
+    """Série paginada com datas delta-codificadas (``formato=delta``)."""
+    codigo: int
+    nome: str
+    pagina: int
+    total_paginas: int
+    total_observacoes: int
+    data_inicial: date | None
+    deltas: list[int]
+    valores: list[float]
+
+
+class StoreStatus(BaseModel):
+    """Uso do store em memória das séries."""
+    series_fixas: int
+    series_lru: int
+    bytes_usados: int
+    limite_bytes: int
+    hits: int
+    misses: int
@@ -0,0 +1,66 @@
+"""Redução de séries para gráficos preservando o formato.
+
+Reamostrar por calendário (média mensal etc.) apaga picos como os choques
+do dólar. Aqui os pontos devolvidos são sempre observações reais:
+
+- **LTTB** (*Largest-Triangle-Three-Buckets*): em cada balde fica o ponto
+  que forma o maior triângulo com o ponto escolhido antes e a média do
+  balde seguinte. Uma passada O(n).
+- **min/max**: o mínimo e o máximo de cada balde, em ordem de data. Sai do
+  índice da série (árvores de segmentos), em O(baldes · log n) sem varrer
+  o período.
+
+As funções devolvem as posições escolhidas dentro de ``[inicio, fim)``.
+"""
+
+from array import array
+from collections.abc import Sequence
+
+from app.services.indice import IndiceIntervalos
+
+
+def lttb(ordinais: Sequence[int], valores: Sequence[float], inicio: int, fim: int, alvo: int) -> array:
+    """Até ``alvo`` posições (primeira e última sempre incluídas)."""
+    n = fim - inicio
+    if alvo >= n or alvo < 3:
+        return array("i", range(inicio, fim))
+
+    escolhidas = array("i", [inicio])
+    largura = (n - 2) / (alvo - 2)
+    a = inicio
+    for balde in range(alvo - 2):
+        ini = inicio + 1 + int(balde * largura)
+        fim_balde = inicio + 1 + int((balde + 1) * largura)
+        # Ponto "c": média do balde seguinte (o último ponto, para o último balde)
+        prox_fim = min(inicio + 1 + int((balde + 2) * largura), fim - 1) if balde < alvo - 3 else fim
+        prox_ini = fim_balde if balde < alvo - 3 else fim - 1
+        m = prox_fim - prox_ini
+        cx = sum(ordinais[prox_ini:prox_fim]) / m
+        cy = sum(valores[prox_ini:prox_fim]) / m
+
+        ax, ay = ordinais[a], valores[a]
+        dx, dy = ax - cx, cy - ay
+        melhor, maior_area = ini, -1.0
+        for j in range(ini, fim_balde):
+            area = abs(dx * (valores[j] - ay) - (ax - ordinais[j]) * dy)  # 2× a área
+            if area > maior_area:
+                melhor, maior_area = j, area
+        escolhidas.append(melhor)
+        a = melhor
+    escolhidas.append(fim - 1)
+    return escolhidas
+
+
+def minmax(indice: IndiceIntervalos, inicio: int, fim: int, alvo: int) -> array:
+    """Mínimo e máximo de ``alvo // 2`` baldes (até ``alvo`` posições)."""
+    n = fim - inicio
+    if alvo >= n:
+        return array("i", range(inicio, fim))
+
+    baldes = max(1, alvo // 2)
+    escolhidas = array("i")
+    for balde in range(baldes):
+        ini, fim_balde = inicio + balde * n // baldes, inicio + (balde + 1) * n // baldes
+        i, j = indice.argmin(ini, fim_balde), indice.argmax(ini, fim_balde)
+        escolhidas.extend(sorted({i, j}))
+    return escolhidas
@@ -2,8 +2,6 @@
 
 from datetime import date, datetime
 
-import httpx
-
 from app.core.config import settings
 from app.core.logging import logger
 
@@ -61,6 +59,8 @@ async def buscar_serie(
 
     logger.info("BCB request: GET %s params=%s", url, params)
 
+    import httpx  # import tardio: só o sync precisa do cliente HTTP (~60 ms a menos no boot)
+
     async with httpx.AsyncClient(timeout=settings.BCB_TIMEOUT) as client:
         resp = await client.get(url, params=params)
         resp.raise_for_status()
@@ -0,0 +1,245 @@
+"""Séries derivadas: transformações sobre séries armazenadas, com códigos virtuais.
+
+Cada definição combina séries de origem (do store ou outras derivadas) numa
+nova série: acumulado composto em janela móvel (IPCA em 12 meses),
+anualização (CDI diário → % a.a.), variação em 12 meses, diferença defasada
+e diferença entre séries alinhadas por data (*asof*). As transformações
+são passadas únicas O(n) sobre os arrays da série. O resultado é um
+:class:`SerieEmMemoria`, servido pelos mesmos endpoints das séries do BCB.
+
+O resultado fica em cache até uma série de origem mudar. A chave é o
+objeto de origem e sua ``versao``, que sobe a cada sync aplicado ao store.
+"""
+
+import math
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import date
+from itertools import count
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.store import SerieEmMemoria, StoreSeries, store
+
+# Códigos SGS reais ficam bem abaixo disso
+CODIGO_VIRTUAL_MINIMO = 900_000
+
+Pontos = tuple[array, array]  # (ordinais, valores)
+
+
+def eh_virtual(codigo: int) -> bool:
+    return codigo >= CODIGO_VIRTUAL_MINIMO
+
+
+class FonteAusente(LookupError):
+    """Uma série de origem da derivada ainda não foi sincronizada."""
+
+    def __init__(self, codigo: int) -> None:
+        super().__init__(codigo)
+        self.codigo = codigo
+
+
+# ── Transformações ───────────────────────────────────────────────────────────
+
+
+def acumulado_composto(ordinais: array, valores: array, janela: int) -> Pontos:
+    """Variação % composta das últimas ``janela`` observações: ``(Π(1 + v/100) - 1) * 100``.
+
+    Usa somas prefixadas de ``log1p``; janelas com fator ``<= 0`` (queda de
+    100% ou mais) caem no produto direto.
+    """
+    logs, ruins = [0.0], [0]
+    for valor in valores:
+        fator = 1 + valor / 100
+        logs.append(logs[-1] + (math.log(fator) if fator > 0 else 0.0))
+        ruins.append(ruins[-1] + (fator <= 0))
+
+    saida = array("d")
+    for fim in range(janela, len(valores) + 1):
+        inicio = fim - janela
+        if ruins[fim] - ruins[inicio]:
+            produto = math.prod(1 + v / 100 for v in valores[inicio:fim])
+            saida.append((produto - 1) * 100)
+        else:
+            saida.append(math.expm1(logs[fim] - logs[inicio]) * 100)
+    return ordinais[janela - 1:], saida
+
+
+def anualizar(ordinais: array, valores: array, periodos: int) -> Pontos:
+    """Taxa % por período → % ao ano, capitalizando ``periodos`` vezes (252 dias úteis)."""
+    return ordinais[:], array("d", (((1 + v / 100) ** periodos - 1) * 100 for v in valores))
+
+
+def _um_ano_antes(ordinal: int) -> int:
+    dia = date.fromordinal(ordinal)
+    try:
+        return dia.replace(year=dia.year - 1).toordinal()
+    except ValueError:  # 29/02
+        return dia.replace(year=dia.year - 1, day=28).toordinal()
+
+
+def variacao_anual(ordinais: array, valores: array) -> Pontos:
+    """Variação % sobre o último valor de até um ano antes (varredura com dois ponteiros)."""
+    saida_ordinais, saida = array("i"), array("d")
+    j = -1
+    for ordinal, valor in zip(ordinais, valores):
+        alvo = _um_ano_antes(ordinal)
+        while j + 1 < len(ordinais) and ordinais[j + 1] <= alvo:
+            j += 1
+        if j >= 0 and valores[j]:
+            saida_ordinais.append(ordinal)
+            saida.append((valor / valores[j] - 1) * 100)
+    return saida_ordinais, saida
+
+
+def diferenca_defasada(ordinais: array, valores: array, defasagem: int) -> Pontos:
+    """``v[i] - v[i - defasagem]`` (em observações)."""
+    saida = array("d", (valores[i] - valores[i - defasagem] for i in range(defasagem, len(valores))))
+    return ordinais[defasagem:], saida
+
+
+def diferenca_entre(esquerda: Pontos, direita: Pontos) -> Pontos:
+    """``esquerda - direita`` nas datas da esquerda, com o último valor da direita até cada data."""
+    ord_e, val_e = esquerda
+    ord_d, val_d = direita
+    saida_ordinais, saida = array("i"), array("d")
+    j = -1
+    for ordinal, valor in zip(ord_e, val_e):
+        while j + 1 < len(ord_d) and ord_d[j + 1] <= ordinal:
+            j += 1
+        if j >= 0:
+            saida_ordinais.append(ordinal)
+            saida.append(valor - val_d[j])
+    return saida_ordinais, saida
+
+
+# ── Definições ───────────────────────────────────────────────────────────────
+
+
+def _uma_fonte(transformacao: Callable[..., Pontos], **parametros) -> Callable[[list[SerieEmMemoria]], Pontos]:
+    return lambda fontes: transformacao(fontes[0].ordinais, fontes[0].valores, **parametros)
+
+
+def _spread(fontes: list[SerieEmMemoria]) -> Pontos:
+    a, b = fontes
+    return diferenca_entre((a.ordinais, a.valores), (b.ordinais, b.valores))
+
+
+@dataclass(frozen=True)
+class DefinicaoDerivada:
+    """Série virtual calculada a partir de ``fontes`` (códigos reais ou virtuais)."""
+
+    codigo: int
+    nome: str
+    fontes: tuple[int, ...]
+    calcular: Callable[[list[SerieEmMemoria]], Pontos] = field(repr=False)
+
+
+DEFINICOES: list[DefinicaoDerivada] = [
+    DefinicaoDerivada(900433, "IPCA – acumulado em 12 meses (%)", (433,), _uma_fonte(acumulado_composto, janela=12)),
+    DefinicaoDerivada(904389, "CDI – anualizado (% a.a.)", (4389,), _uma_fonte(anualizar, periodos=252)),
+    DefinicaoDerivada(900001, "Dólar comercial – variação em 12 meses (%)", (1,), _uma_fonte(variacao_anual)),
+    DefinicaoDerivada(904380, "PIB mensal – variação em 12 meses (%)", (4380,), _uma_fonte(variacao_anual)),
+    DefinicaoDerivada(
+        910433, "IPCA 12 meses – variação mensal (p.p.)", (900433,), _uma_fonte(diferenca_defasada, defasagem=1)
+    ),
+    DefinicaoDerivada(920432, "Juro real ex-post: SELIC − IPCA 12 meses (p.p.)", (432, 900433), _spread),
+]
+
+
+# ── Motor com cache ──────────────────────────────────────────────────────────
+
+
+@dataclass
+class _Calculada:
+    fontes: tuple[SerieEmMemoria, ...]
+    versoes: tuple[int, ...]
+    serie: SerieEmMemoria
+
+    def valida(self, fontes: list[SerieEmMemoria]) -> bool:
+        return all(
+            atual is antiga and atual.versao == versao
+            for atual, antiga, versao in zip(fontes, self.fontes, self.versoes)
+        )
+
+
+class MotorDerivadas:
+    """Resolve códigos virtuais, calculando sob demanda e reaproveitando o cache.
+
+    O cache é um LRU limitado a ``limite_bytes`` (fora do teto do store).
+    """
+
+    def __init__(
+        self, definicoes: list[DefinicaoDerivada], store: StoreSeries, limite_bytes: int = 32 * 1024 * 1024
+    ) -> None:
+        self.definicoes = {d.codigo: d for d in definicoes}
+        self.store = store
+        self.limite_bytes = limite_bytes
+        self._cache: OrderedDict[int, _Calculada] = OrderedDict()
+        self._lock = threading.Lock()
+        self._versoes = count(1)
+        self.calculos = 0
+
+    def obter(self, db: Session | None, codigo: int) -> SerieEmMemoria | None:
+        """Série derivada atualizada (``None`` se o código não é uma derivada).
+
+        Levanta :class:`FonteAusente` se alguma origem ainda não foi sincronizada.
+        """
+        definicao = self.definicoes.get(codigo)
+        if definicao is None:
+            return None
+        fontes = [self._fonte(db, c) for c in definicao.fontes]
+        with self._lock:
+            calculada = self._cache.get(codigo)
+            if calculada is not None and calculada.valida(fontes):
+                self._cache.move_to_end(codigo)
+                return calculada.serie
+
+        ordinais, valores = definicao.calcular(fontes)
+        serie = SerieEmMemoria(
+            codigo=codigo,
+            nome=definicao.nome,
+            ordinais=array("i", ordinais),
+            valores=array("d", valores),
+            versao=next(self._versoes),  # muda a cada recálculo: invalida derivadas desta
+        )
+        with self._lock:
+            self._cache[codigo] = _Calculada(tuple(fontes), tuple(f.versao for f in fontes), serie)
+            self._cache.move_to_end(codigo)
+            self._respeitar_limite()
+            self.calculos += 1
+        return serie
+
+    @property
+    def bytes_usados(self) -> int:
+        with self._lock:
+            return sum(c.serie.bytes_usados for c in self._cache.values())
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def _respeitar_limite(self) -> None:
+        total = sum(c.serie.bytes_usados for c in self._cache.values())
+        # A recém-calculada fica mesmo acima do limite (é a que vai ser devolvida)
+        while total > self.limite_bytes and len(self._cache) > 1:
+            _, removida = self._cache.popitem(last=False)
+            total -= removida.serie.bytes_usados
+
+    def _fonte(self, db: Session | None, codigo: int) -> SerieEmMemoria:
+        if codigo in self.definicoes:
+            serie = self.obter(db, codigo)
+        elif db is not None:
+            serie = self.store.obter_ou_carregar(db, codigo)
+        else:
+            serie = self.store.obter(codigo)
+        if serie is None:
+            raise FonteAusente(codigo)
+        return serie
+
+
+motor_derivadas = MotorDerivadas(DEFINICOES, store, limite_bytes=settings.DERIVADAS_LIMITE_MB * 1024 * 1024)
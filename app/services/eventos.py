@@ -0,0 +1,219 @@
+"""Barramento de eventos in-process para o stream SSE.
+
+Os eventos ficam num buffer circular com ids sequenciais; todos os
+assinantes esperam na mesma ``asyncio.Condition`` e leem do buffer a partir
+do próprio cursor. Publicar é O(1) (sem fila por cliente) e um assinante
+reconectando com ``Last-Event-ID`` recebe o que perdeu, enquanto o evento
+ainda estiver no buffer.
+
+O barramento é por processo. Com vários workers, cada um repassa aos seus
+assinantes os syncs feitos pelos outros: enquanto houver assinantes, uma
+tarefa confere ``Serie.ultima_sync`` a cada ``intervalo_repasse`` segundos e
+publica ``sync_concluido`` com ``externo: true`` para as séries que mudaram
+sem passar por este worker. Os ids do SSE levam o prefixo da instância; um
+``Last-Event-ID`` de outro worker (ou de antes de um restart) não é
+interpretado como posição local, e o stream segue do presente.
+"""
+
+import asyncio
+import uuid
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+
+import orjson
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.models import Serie
+from app.db.session import SessionLocal
+
+
+@dataclass
+class Evento:
+    """Um evento publicado (``tipo`` vira o ``event:`` do SSE)."""
+
+    id: int
+    tipo: str
+    dados: dict = field(default_factory=dict)
+    instancia: str = ""
+
+    def formatar_sse(self) -> bytes:
+        id_sse = f"{self.instancia}-{self.id}" if self.instancia else str(self.id)
+        return b"id: %s\nevent: %s\ndata: %s\n\n" % (id_sse.encode(), self.tipo.encode(), orjson.dumps(self.dados))
+
+
+class BarramentoEventos:
+    """Fan-out de eventos para muitos assinantes sobre um único buffer."""
+
+    def __init__(
+        self,
+        capacidade: int = 1000,
+        instancia: str = "",
+        consultar_syncs: Callable[[], dict[int, datetime | None]] | None = None,
+        intervalo_repasse: float = 2.0,
+    ) -> None:
+        self._eventos: deque[Evento] = deque(maxlen=capacidade)
+        self._ultimo_id = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._condicao: asyncio.Condition | None = None
+        self._encerrado = False
+        self.instancia = instancia
+        # Repasse de syncs de outros workers (``None``: barramento de processo único)
+        self._consultar_syncs = consultar_syncs
+        self.intervalo_repasse = intervalo_repasse
+        self._syncs_locais: dict[int, datetime | None] = {}
+        self._assinantes = 0
+        self._repasse: asyncio.Task | None = None
+
+    @property
+    def ultimo_id(self) -> int:
+        return self._ultimo_id
+
+    def publicar(self, tipo: str, **dados) -> None:
+        """Publica um evento; seguro para chamar de qualquer thread."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            self._registrar(tipo, dados)  # ninguém assinando ainda
+            return
+        try:
+            atual = asyncio.get_running_loop()
+        except RuntimeError:
+            atual = None
+        if atual is loop:
+            self._registrar(tipo, dados)
+        else:
+            loop.call_soon_threadsafe(self._registrar, tipo, dados)
+
+    def anotar_sync_local(self, codigo: int, ultima_sync: datetime | None) -> None:
+        """Registra um sync feito aqui, para o repasse não o anunciar de novo como externo."""
+        self._syncs_locais[codigo] = ultima_sync
+
+    def cursor_de(self, last_event_id: str | None) -> int | None:
+        """Converte o ``Last-Event-ID`` recebido em cursor (``None``: seguir do presente)."""
+        if not last_event_id:
+            return None
+        instancia, _, numero = last_event_id.rpartition("-")
+        if instancia != self.instancia or not numero.isdigit():
+            return None
+        return int(numero)
+
+    def encerrar(self) -> None:
+        """Termina os streams abertos (chamado no shutdown da aplicação)."""
+        self._encerrado = True
+        loop = self._loop
+        if self._condicao is None or loop is None or loop.is_closed():
+            return
+        try:
+            atual = asyncio.get_running_loop()
+        except RuntimeError:
+            atual = None
+        if atual is loop:
+            self._encerrar_no_loop()
+        else:
+            loop.call_soon_threadsafe(self._encerrar_no_loop)
+
+    def eventos_desde(self, cursor: int) -> list[Evento]:
+        """Eventos com id maior que ``cursor`` ainda presentes no buffer."""
+        if not self._eventos or cursor >= self._ultimo_id:
+            return []
+        inicio = max(0, cursor + 1 - self._eventos[0].id)
+        return list(islice(self._eventos, inicio, None))
+
+    async def assinar(
+        self,
+        ultimo_id: int | None = None,
+        keepalive: float = 15.0,
+    ) -> AsyncIterator[Evento | None]:
+        """Itera sobre eventos novos; emite ``None`` a cada ``keepalive`` segundos ociosos.
+
+        Termina quando o barramento é encerrado.
+        """
+        condicao = self._condicao_do_loop()
+        # Id acima do atual veio de antes de um restart ou de outro worker (ids
+        # recomeçam em 1): segue do presente em vez de esperar o contador alcançá-lo
+        cursor = self._ultimo_id if ultimo_id is None or ultimo_id > self._ultimo_id else ultimo_id
+        self._assinantes += 1
+        self._iniciar_repasse()
+        try:
+            while not self._encerrado:
+                pendentes = self.eventos_desde(cursor)
+                if not pendentes:
+                    try:
+                        async with condicao:
+                            await asyncio.wait_for(
+                                condicao.wait_for(lambda: self._ultimo_id > cursor or self._encerrado), keepalive
+                            )
+                    except asyncio.TimeoutError:
+                        yield None
+                    continue
+                for evento in pendentes:
+                    yield evento
+                cursor = pendentes[-1].id
+        finally:
+            self._assinantes -= 1
+
+    def _condicao_do_loop(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Novo loop (a aplicação subiu de novo no mesmo processo): reabre o barramento
+            self._loop = loop
+            self._condicao = asyncio.Condition()
+            self._encerrado = False
+            self._repasse = None
+        return self._condicao
+
+    def _registrar(self, tipo: str, dados: dict) -> None:
+        self._ultimo_id += 1
+        self._eventos.append(Evento(id=self._ultimo_id, tipo=tipo, dados=dados, instancia=self.instancia))
+        self._acordar()
+
+    def _acordar(self) -> None:
+        if self._condicao is not None and self._loop is not None and not self._loop.is_closed():
+            # Aqui já estamos no loop dos assinantes: acorda todos de uma vez
+            self._loop.create_task(self._notificar(self._condicao))
+
+    def _encerrar_no_loop(self) -> None:
+        self._acordar()
+        if self._repasse is not None:
+            self._repasse.cancel()
+
+    def _iniciar_repasse(self) -> None:
+        if self._consultar_syncs is not None and (self._repasse is None or self._repasse.done()):
+            self._repasse = asyncio.get_running_loop().create_task(self._repassar_syncs())
+
+    async def _repassar_syncs(self) -> None:
+        """Publica os syncs feitos por outros workers enquanto houver assinantes."""
+        vistos: dict[int, datetime | None] | None = None
+        while self._assinantes and not self._encerrado:
+            try:
+                atuais = await asyncio.to_thread(self._consultar_syncs)
+            except Exception:
+                logger.exception("Falha ao conferir syncs de outros workers")
+            else:
+                if vistos is not None:
+                    for codigo, ultima_sync in atuais.items():
+                        if ultima_sync != vistos.get(codigo) and ultima_sync != self._syncs_locais.get(codigo):
+                            self._registrar("sync_concluido", {"codigo": codigo, "externo": True})
+                vistos = atuais
+            await asyncio.sleep(self.intervalo_repasse)
+
+    @staticmethod
+    async def _notificar(condicao: asyncio.Condition) -> None:
+        async with condicao:
+            condicao.notify_all()
+
+
+def _syncs_no_banco() -> dict[int, datetime | None]:
+    with SessionLocal() as db:
+        return dict(db.execute(select(Serie.codigo, Serie.ultima_sync)).all())
+
+
+barramento = BarramentoEventos(
+    instancia=uuid.uuid4().hex[:8],
+    consultar_syncs=_syncs_no_banco,
+    intervalo_repasse=settings.EVENTOS_REPASSE_S,
+)
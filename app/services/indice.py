@@ -0,0 +1,142 @@
+"""Índice de consultas por intervalo sobre os valores de uma série.
+
+Mantém somas prefixadas (e de quadrados) para média/variância em O(1) e duas
+árvores de segmentos com o *índice* do mínimo/máximo de cada nó, para
+min/max com a respectiva data em O(log n). É construído quando a série entra
+no store, atualizado em O(log n) a cada ponto anexado e persistido junto com
+a série.
+"""
+
+from array import array
+from collections.abc import Sequence
+from itertools import accumulate
+
+_VAZIO = -1
+
+
+class IndiceIntervalos:
+    """Consultas de soma, média, variância e argmin/argmax em ``[inicio, fim)``."""
+
+    def __init__(
+        self,
+        valores: Sequence[float],
+        base: float | None = None,
+        somas: array | None = None,
+        somas2: array | None = None,
+        arvore_min: array | None = None,
+        arvore_max: array | None = None,
+    ) -> None:
+        self._valores = valores
+        if somas is not None:
+            # Restaurado de arquivo persistido
+            self.base = base
+            self.somas, self.somas2 = somas, somas2
+            self.arvore_min, self.arvore_max = arvore_min, arvore_max
+            self.capacidade = len(arvore_min) // 2
+            return
+
+        # Valores deslocados pelo primeiro ponto reduzem o cancelamento na variância
+        self.base = valores[0] if len(valores) else 0.0
+        self.somas = array("d", accumulate((x - self.base for x in valores), initial=0.0))
+        self.somas2 = array("d", accumulate(((x - self.base) ** 2 for x in valores), initial=0.0))
+        self._construir_arvores(max(1, len(valores)))
+
+    def __len__(self) -> int:
+        return len(self.somas) - 1
+
+    @property
+    def bytes_usados(self) -> int:
+        return 8 * (len(self.somas) + len(self.somas2)) + 4 * (len(self.arvore_min) + len(self.arvore_max))
+
+    def copiar(self, valores: Sequence[float]) -> "IndiceIntervalos":
+        """Cópia independente sobre ``valores`` (que pode ter pontos a mais, a anexar)."""
+        return IndiceIntervalos(
+            valores, self.base, self.somas[:], self.somas2[:], self.arvore_min[:], self.arvore_max[:]
+        )
+
+    # ── Atualização ──────────────────────────────────────────────────────────
+
+    def anexar(self, valor: float) -> None:
+        """Indexa um ponto já anexado ao fim do array de valores."""
+        i = len(self)
+        if i == 0:
+            self.base = valor
+        self.somas.append(self.somas[-1] + (valor - self.base))
+        self.somas2.append(self.somas2[-1] + (valor - self.base) ** 2)
+
+        if i >= self.capacidade:
+            self._construir_arvores(i + 1)
+            return
+        for arvore, menor in ((self.arvore_min, True), (self.arvore_max, False)):
+            no = i + self.capacidade
+            arvore[no] = i
+            no >>= 1
+            while no:
+                arvore[no] = self._escolher(arvore[2 * no], arvore[2 * no + 1], menor)
+                no >>= 1
+
+    # ── Consultas ────────────────────────────────────────────────────────────
+
+    def soma(self, inicio: int, fim: int) -> float:
+        return self.somas[fim] - self.somas[inicio] + self.base * (fim - inicio)
+
+    def media(self, inicio: int, fim: int) -> float:
+        return self.base + (self.somas[fim] - self.somas[inicio]) / (fim - inicio)
+
+    def variancia(self, inicio: int, fim: int) -> float | None:
+        """Variância amostral (n - 1) do intervalo."""
+        n = fim - inicio
+        if n < 2:
+            return None
+        s = self.somas[fim] - self.somas[inicio]
+        s2 = self.somas2[fim] - self.somas2[inicio]
+        return max(0.0, (s2 - s * s / n) / (n - 1))
+
+    def argmin(self, inicio: int, fim: int) -> int:
+        """Posição do menor valor (a primeira, em caso de empate)."""
+        return self._consultar(self.arvore_min, inicio, fim, menor=True)
+
+    def argmax(self, inicio: int, fim: int) -> int:
+        """Posição do maior valor (a primeira, em caso de empate)."""
+        return self._consultar(self.arvore_max, inicio, fim, menor=False)
+
+    # ── Internos ─────────────────────────────────────────────────────────────
+
+    def _escolher(self, a: int, b: int, menor: bool) -> int:
+        """Combina dois nós; ``a`` está à esquerda de ``b`` e vence empates."""
+        if a == _VAZIO:
+            return b
+        if b == _VAZIO:
+            return a
+        va, vb = self._valores[a], self._valores[b]
+        if menor:
+            return b if vb < va else a
+        return b if vb > va else a
+
+    def _construir_arvores(self, minimo: int) -> None:
+        capacidade = 1
+        while capacidade < minimo:
+            capacidade *= 2
+        self.capacidade = capacidade
+
+        n = len(self)
+        folhas = array("i", range(n)) + array("i", [_VAZIO]) * (capacidade - n)
+        self.arvore_min = array("i", [_VAZIO]) * capacidade + folhas
+        self.arvore_max = array("i", [_VAZIO]) * capacidade + folhas
+        for no in range(capacidade - 1, 0, -1):
+            self.arvore_min[no] = self._escolher(self.arvore_min[2 * no], self.arvore_min[2 * no + 1], True)
+            self.arvore_max[no] = self._escolher(self.arvore_max[2 * no], self.arvore_max[2 * no + 1], False)
+
+    def _consultar(self, arvore: array, inicio: int, fim: int, menor: bool) -> int:
+        esquerda = direita = _VAZIO
+        l, r = inicio + self.capacidade, fim + self.capacidade
+        while l < r:
+            if l & 1:
+                esquerda = self._escolher(esquerda, arvore[l], menor)
+                l += 1
+            if r & 1:
+                r -= 1
+                direita = self._escolher(arvore[r], direita, menor)
+            l >>= 1
+            r >>= 1
+        return self._escolher(esquerda, direita, menor)
@@ -0,0 +1,318 @@
+"""Ingestão de observações por um escritor único com transações em lote.
+
+Todas as escritas de ``sincronizar_serie`` passam por uma fila drenada por
+uma única thread escritora por processo. Ela agrupa os syncs pendentes (de
+várias séries) numa só transação. Entre processos (uvicorn com vários
+workers), as transações são serializadas por um lock de arquivo ao lado do
+banco SQLite. Assim os workers esperam a vez em ordem em vez de disputar o
+lock do SQLite até estourar ``database is locked``. Leituras não passam por
+aqui e seguem em paralelo (o engine usa WAL no SQLite).
+
+Dentro do job, cada sync é dividido em blocos anuais com digest gravado em
+``sync_digests``: anos cujo conteúdo não mudou desde o último sync não geram
+nenhuma leitura ou escrita em ``observacoes``.
+"""
+
+import contextvars
+import hashlib
+import os
+import queue
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from collections.abc import Iterator
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+from sqlalchemy import or_
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.models import DigestBloco, Observacao, Serie
+from app.db.upsert import upsert
+from app.services.bcb_client import nome_serie
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos
+    fcntl = None
+
+
+@dataclass
+class ResultadoGravacao:
+    """Resultado do upsert de um sync."""
+
+    nome: str
+    novos: int
+    atualizados: int
+    total: int
+    ultima_sync: datetime
+    blocos_ignorados: int = 0   # anos cujo digest bateu: nenhum trabalho no banco
+    blocos_reescritos: int = 0  # anos comparados e regravados no banco
+    alterados: list[dict] = field(default_factory=list)  # linhas novas/atualizadas (para o store)
+
+
+def digest_bloco(pontos: list[tuple[int, float]]) -> str:
+    """Hash de um bloco ``[(ordinal, valor), ...]`` já ordenado por data."""
+    ordinais = array("i", (ordinal for ordinal, _ in pontos))
+    valores = array("d", (valor for _, valor in pontos))
+    return hashlib.blake2b(ordinais.tobytes() + valores.tobytes(), digest_size=16).hexdigest()
+
+
+def _ano_coberto(ano: int, data_inicial: date | None, data_final: date | None) -> bool:
+    """O payload traz o ano inteiro? (sem limite = desde o início / até hoje)."""
+    return (data_inicial is None or data_inicial <= date(ano, 1, 1)) and (
+        data_final is None or data_final >= date(ano, 12, 31)
+    )
+
+
+def _faixas_de_anos(anos: list[int]) -> list[tuple[date, date]]:
+    """Agrupa anos consecutivos em intervalos de datas ``[1/1, 31/12]``."""
+    faixas: list[tuple[date, date]] = []
+    for ano in sorted(anos):
+        if faixas and faixas[-1][1].year == ano - 1:
+            faixas[-1] = (faixas[-1][0], date(ano, 12, 31))
+        else:
+            faixas.append((date(ano, 1, 1), date(ano, 12, 31)))
+    return faixas
+
+
+def gravar_observacoes(
+    db: Session,
+    codigo: int,
+    dados: list[dict],
+    data_inicial: date | None = None,
+    data_final: date | None = None,
+) -> ResultadoGravacao:
+    """Upsert das observações de um sync na sessão dada (sem commit).
+
+    Os dados são divididos em blocos anuais. Um ano coberto por inteiro pela
+    janela pedida cujo digest é igual ao do último sync é ignorado sem tocar
+    em ``observacoes``; só os demais são comparados linha a linha e
+    regravados. ``sync_digests`` guarda também a contagem por ano, de onde
+    sai o total sem ``COUNT``.
+    """
+    agora = datetime.utcnow()
+    blocos: dict[int, dict[date, float]] = defaultdict(dict)
+    for item in dados:
+        blocos[item["data"].year][item["data"]] = item["valor"]
+
+    # Série + digests numa query
+    registros = (
+        db.query(Serie, DigestBloco.ano, DigestBloco.linhas, DigestBloco.digest)
+        .outerjoin(DigestBloco, DigestBloco.serie_id == Serie.id)
+        .filter(Serie.codigo == codigo)
+        .all()
+    )
+    gravados = {r.ano: r for r in registros if r.ano is not None}
+    if registros:
+        serie = registros[0][0]
+        serie.ultima_sync = agora
+    else:
+        serie = Serie(codigo=codigo, nome=nome_serie(codigo), ultima_sync=agora)
+        db.add(serie)
+        db.flush()
+    # Série já existente sem digests (banco anterior a eles ou invalidados): recontagem completa
+    legado = bool(registros) and not gravados
+
+    digests: dict[int, str | None] = {}
+    processar: list[int] = []
+    ignorados = 0
+    for ano, pontos in blocos.items():
+        digest = None
+        if _ano_coberto(ano, data_inicial, data_final):
+            digest = digest_bloco(sorted((d.toordinal(), v) for d, v in pontos.items()))
+            if ano in gravados and gravados[ano].digest == digest:
+                ignorados += 1
+                continue
+        digests[ano] = digest
+        processar.append(ano)
+
+    # Existentes só dos anos a processar (ou de tudo, no caso legado)
+    consulta = db.query(Observacao.data, Observacao.valor).filter(Observacao.serie_id == serie.id)
+    if not registros or not (processar or legado):
+        existentes = {}
+    elif legado:
+        existentes = dict(consulta.all())
+    else:
+        faixas = _faixas_de_anos(processar)
+        existentes = dict(consulta.filter(or_(*(Observacao.data.between(de, ate) for de, ate in faixas))).all())
+
+    alterados: list[dict] = []
+    novos = atualizados = 0
+    linhas_por_ano: Counter[int] = Counter(d.year for d in existentes)
+    escritos: set[int] = set()
+    for ano in processar:
+        for data, valor in blocos[ano].items():
+            anterior = existentes.get(data)
+            if anterior is None:
+                novos += 1
+                linhas_por_ano[ano] += 1
+            elif anterior != valor:
+                atualizados += 1
+            else:
+                continue
+            alterados.append({"serie_id": serie.id, "data": data, "valor": valor})
+            escritos.add(ano)
+    if alterados:
+        # Um statement (executemany) para novas e atualizadas
+        db.execute(upsert(Observacao, ["serie_id", "data"], ["valor"], db.get_bind().dialect.name), alterados)
+
+    anos_resumo = set(processar) | (set(linhas_por_ano) if legado else set())
+    resumo = []
+    for ano in anos_resumo:
+        digest = digests.get(ano)
+        if digest is None and ano not in escritos and ano in gravados:
+            digest = gravados[ano].digest  # bloco parcial sem mudança: digest anterior segue válido
+        resumo.append({"serie_id": serie.id, "ano": ano, "linhas": linhas_por_ano[ano], "digest": digest})
+    if resumo:
+        db.execute(upsert(DigestBloco, ["serie_id", "ano"], ["linhas", "digest"], db.get_bind().dialect.name), resumo)
+
+    total = sum(r.linhas for ano, r in gravados.items() if ano not in anos_resumo)
+    total += sum(linha["linhas"] for linha in resumo)
+    return ResultadoGravacao(
+        nome=serie.nome,
+        novos=novos,
+        atualizados=atualizados,
+        total=total,
+        ultima_sync=agora,
+        blocos_ignorados=ignorados,
+        blocos_reescritos=len(processar),
+        alterados=alterados,
+    )
+
+
+@dataclass
+class _Tarefa:
+    engine: Engine
+    codigo: int
+    dados: list[dict]
+    data_inicial: date | None = None
+    data_final: date | None = None
+    futuro: Future = field(default_factory=Future)
+    # Contexto de quem pediu: mantém a contagem de queries da requisição
+    contexto: contextvars.Context = field(default_factory=contextvars.copy_context)
+
+
+class EscritorObservacoes:
+    """Thread escritora única que drena a fila em transações agrupadas."""
+
+    def __init__(self, max_linhas_lote: int = 50_000, espera_ms: int = 5) -> None:
+        self.max_linhas_lote = max_linhas_lote
+        self.espera_ms = espera_ms
+        self._fila: queue.Queue[_Tarefa | None] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock_inicio = threading.Lock()
+        self.transacoes = 0
+        self.tarefas = 0
+
+    def enviar(
+        self,
+        engine: Engine,
+        codigo: int,
+        dados: list[dict],
+        data_inicial: date | None = None,
+        data_final: date | None = None,
+    ) -> Future:
+        """Enfileira a gravação de um sync; o ``Future`` resolve com o resultado.
+
+        ``data_inicial``/``data_final`` são a janela pedida ao BCB: só anos
+        cobertos por inteiro têm o digest comparado e gravado.
+        """
+        self._iniciar()
+        tarefa = _Tarefa(engine=engine, codigo=codigo, dados=dados, data_inicial=data_inicial, data_final=data_final)
+        self._fila.put(tarefa)
+        return tarefa.futuro
+
+    def parar(self) -> None:
+        """Drena o que falta e encerra a thread (chamado no shutdown)."""
+        with self._lock_inicio:
+            if self._thread is None:
+                return
+            self._fila.put(None)
+            self._thread.join()
+            self._thread = None
+
+    # ── Internos ─────────────────────────────────────────────────────────────
+
+    def _iniciar(self) -> None:
+        with self._lock_inicio:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name="escritor-observacoes", daemon=True)
+                self._thread.start()
+
+    def _executar(self) -> None:
+        while True:
+            primeira = self._fila.get()
+            if primeira is None:
+                return
+            lote, parar = self._montar_lote(primeira)
+            por_engine: dict[Engine, list[_Tarefa]] = {}
+            for tarefa in lote:
+                por_engine.setdefault(tarefa.engine, []).append(tarefa)
+            for engine, tarefas in por_engine.items():
+                self._gravar_lote(engine, tarefas)
+            if parar:
+                return
+
+    def _montar_lote(self, primeira: _Tarefa) -> tuple[list[_Tarefa], bool]:
+        """Junta à primeira tarefa o que chegar até encher o lote ou a espera acabar."""
+        lote, linhas = [primeira], len(primeira.dados)
+        prazo = time.monotonic() + self.espera_ms / 1000
+        while linhas < self.max_linhas_lote:
+            try:
+                tarefa = self._fila.get(timeout=max(0.0, prazo - time.monotonic()))
+            except queue.Empty:
+                break
+            if tarefa is None:
+                return lote, True
+            lote.append(tarefa)
+            linhas += len(tarefa.dados)
+        return lote, False
+
+    def _gravar_lote(self, engine: Engine, tarefas: list[_Tarefa]) -> None:
+        try:
+            with lock_entre_processos(engine), Session(bind=engine) as db:
+                resultados = [
+                    t.contexto.run(gravar_observacoes, db, t.codigo, t.dados, t.data_inicial, t.data_final)
+                    for t in tarefas
+                ]
+                db.commit()
+            self.transacoes += 1
+            self.tarefas += len(tarefas)
+            for tarefa, resultado in zip(tarefas, resultados):
+                tarefa.futuro.set_result(resultado)
+        except Exception as exc:
+            if len(tarefas) == 1:
+                tarefas[0].futuro.set_exception(exc)
+                return
+            # Isola a tarefa problemática: regrava uma a uma
+            logger.warning("Lote de %d syncs falhou (%s); gravando individualmente", len(tarefas), exc)
+            for tarefa in tarefas:
+                self._gravar_lote(engine, [tarefa])
+
+
+@contextmanager
+def lock_entre_processos(engine: Engine) -> Iterator[None]:
+    """Serializa transações de escrita entre processos que usam o mesmo arquivo SQLite."""
+    caminho = engine.url.database if engine.dialect.name == "sqlite" else None
+    if fcntl is None or not caminho or caminho == ":memory:":
+        yield
+        return
+    with open(f"{os.path.abspath(caminho)}.escrita.lock", "a") as arquivo:
+        fcntl.flock(arquivo, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(arquivo, fcntl.LOCK_UN)
+
+
+escritor = EscritorObservacoes(
+    max_linhas_lote=settings.INGESTAO_MAX_LINHAS_LOTE,
+    espera_ms=settings.INGESTAO_ESPERA_MS,
+)
@@ -1,9 +1,27 @@
 """Cálculos de insights sobre séries temporais."""
 
+import math
+from collections import deque
+from collections.abc import Collection, Sequence
 from dataclasses import dataclass
 from datetime import date
+from enum import Enum
 
 from app.db.models import Observacao
+from app.services.indice import IndiceIntervalos
+
+# Quantis reportados por ``Metrica.QUANTIS``
+QUANTIS = {"p05": 0.05, "p25": 0.25, "p50": 0.50, "p75": 0.75, "p95": 0.95}
+
+
+class Metrica(str, Enum):
+    """Métricas opcionais; só as pedidas são calculadas."""
+    VOLATILIDADE = "volatilidade"  # desvio padrão dos valores e dos retornos (total e móvel)
+    EWMA = "ewma"                  # média móvel exponencial com meia-vida configurável
+    QUANTIS = "quantis"            # p05, p25, p50, p75, p95
+    DRAWDOWN = "drawdown"          # maior queda pico→vale
+    RETORNOS = "retornos"          # retorno por ano-calendário
+    TENDENCIA = "tendencia"        # regressão móvel, direção e pontos de virada (ver ``tendencias``)
 
 
 @dataclass
@@ -32,14 +50,54 @@ class InsightsResult:
     # Últimas observações
     ultimas_observacoes: list[dict]
 
+    # Métricas opcionais (``None`` quando não pedidas)
+    desvio_padrao: float | None = None
+    volatilidade: float | None = None
+    volatilidade_movel: list[dict] | None = None
+    ewma: list[dict] | None = None
+    quantis: dict[str, float] | None = None
+    drawdown_maximo: float | None = None
+    data_pico_drawdown: date | None = None
+    data_vale_drawdown: date | None = None
+    retornos_anuais: list[dict] | None = None
+    tendencia: dict | None = None
+
 
 def calcular_insights(
     observacoes: list[Observacao],
     ultimas_n: int = 10,
+    metricas: Collection[Metrica] = (),
+    janela_volatilidade: int = 21,
+    meia_vida: float = 10.0,
 ) -> InsightsResult:
     """Calcula métricas sobre uma lista de observações ordenadas por data."""
+    return calcular_insights_vetores(
+        [o.data.toordinal() for o in observacoes],
+        [o.valor for o in observacoes],
+        ultimas_n=ultimas_n,
+        metricas=metricas,
+        janela_volatilidade=janela_volatilidade,
+        meia_vida=meia_vida,
+    )
+
+
+def calcular_insights_vetores(
+    ordinais: Sequence[int],
+    valores: Sequence[float],
+    ultimas_n: int = 10,
+    metricas: Collection[Metrica] = (),
+    janela_volatilidade: int = 21,
+    meia_vida: float = 10.0,
+) -> InsightsResult:
+    """Calcula métricas sobre arrays paralelos de datas (ordinais) e valores.
+
+    É o caminho usado pelo store em memória: as datas só viram ``date`` nos
+    poucos pontos que vão para a resposta. Métricas básicas usam os builtins
+    (``min``/``max``/``sum`` rodam em C); as opcionais em ``metricas`` saem de
+    uma única passada fundida em :func:`_metricas_opcionais`.
+    """
 
-    if not observacoes:
+    if not valores:
         return InsightsResult(
             total_observacoes=0,
             data_inicio=None,
@@ -56,9 +114,6 @@ def calcular_insights(
             ultimas_observacoes=[],
         )
 
-    valores = [o.valor for o in observacoes]
-    datas = [o.data for o in observacoes]
-
     # Extremos
     idx_min = valores.index(min(valores))
     idx_max = valores.index(max(valores))
@@ -73,54 +128,257 @@ def calcular_insights(
     media = sum(valores) / len(valores)
 
     # Médias móveis
-    mm7 = _media_movel(observacoes, janela=7)
-    mm30 = _media_movel(observacoes, janela=30)
+    mm7 = _media_movel(ordinais, valores, janela=7)
+    mm30 = _media_movel(ordinais, valores, janela=30)
 
     # Últimas N
+    n = len(valores)
     ultimas = [
-        {"data": o.data.isoformat(), "valor": o.valor}
-        for o in observacoes[-ultimas_n:]
+        {"data": date.fromordinal(ordinais[i]), "valor": valores[i]}
+        for i in range(max(0, n - ultimas_n), n)
     ]
 
     return InsightsResult(
-        total_observacoes=len(observacoes),
-        data_inicio=datas[0],
-        data_fim=datas[-1],
+        total_observacoes=n,
+        data_inicio=date.fromordinal(ordinais[0]),
+        data_fim=date.fromordinal(ordinais[-1]),
         valor_minimo=valores[idx_min],
         valor_maximo=valores[idx_max],
-        data_minimo=datas[idx_min],
-        data_maximo=datas[idx_max],
+        data_minimo=date.fromordinal(ordinais[idx_min]),
+        data_maximo=date.fromordinal(ordinais[idx_max]),
         variacao_absoluta=round(variacao_abs, 6),
         variacao_percentual=round(variacao_pct, 4) if variacao_pct is not None else None,
         media=round(media, 6),
         media_movel_7=mm7,
         media_movel_30=mm30,
         ultimas_observacoes=ultimas,
+        **_metricas_opcionais(ordinais, valores, set(metricas), janela_volatilidade, meia_vida),
     )
 
 
+def calcular_insights_intervalo(
+    ordinais: Sequence[int],
+    valores: Sequence[float],
+    indice: IndiceIntervalos,
+    inicio: int,
+    fim: int,
+    ultimas_n: int = 10,
+    metricas: Collection[Metrica] = (),
+    janela_volatilidade: int = 21,
+    meia_vida: float = 10.0,
+) -> InsightsResult:
+    """Calcula métricas da janela ``[inicio, fim)`` usando o índice da série.
+
+    Extremos, média, desvio padrão e variação saem do índice em O(log n);
+    médias móveis e últimas observações só olham a cauda da janela. Apenas as
+    métricas opcionais baseadas em retornos ou trajetória varrem a janela.
+    """
+    if inicio >= fim:
+        return calcular_insights_vetores([], [])
+
+    idx_min = indice.argmin(inicio, fim)
+    idx_max = indice.argmax(inicio, fim)
+
+    primeiro = valores[inicio]
+    ultimo = valores[fim - 1]
+    variacao_abs = ultimo - primeiro
+    variacao_pct = (variacao_abs / primeiro * 100) if primeiro != 0 else None
+
+    # Últimas 30 médias móveis de 30 pontos precisam de no máximo 59 pontos
+    cauda = max(inicio, fim - 59)
+    ordinais_cauda = ordinais[cauda:fim]
+    valores_cauda = valores[cauda:fim]
+    n = fim - inicio
+
+    # Tendência é calculada à parte (``tendencias``); sozinha não justifica copiar a janela
+    opcionais = set(metricas) - {Metrica.TENDENCIA}
+    extras = {}
+    if opcionais:
+        extras = _metricas_opcionais(
+            ordinais[inicio:fim],
+            valores[inicio:fim],
+            opcionais,
+            janela_volatilidade,
+            meia_vida,
+            desvio_padrao=False,
+        )
+    if Metrica.VOLATILIDADE in opcionais:
+        variancia = indice.variancia(inicio, fim)
+        extras["desvio_padrao"] = round(math.sqrt(variancia), 6) if variancia is not None else None
+
+    return InsightsResult(
+        total_observacoes=n,
+        data_inicio=date.fromordinal(ordinais[inicio]),
+        data_fim=date.fromordinal(ordinais[fim - 1]),
+        valor_minimo=valores[idx_min],
+        valor_maximo=valores[idx_max],
+        data_minimo=date.fromordinal(ordinais[idx_min]),
+        data_maximo=date.fromordinal(ordinais[idx_max]),
+        variacao_absoluta=round(variacao_abs, 6),
+        variacao_percentual=round(variacao_pct, 4) if variacao_pct is not None else None,
+        media=round(indice.media(inicio, fim), 6),
+        media_movel_7=_media_movel(ordinais_cauda, valores_cauda, janela=7),
+        media_movel_30=_media_movel(ordinais_cauda, valores_cauda, janela=30),
+        ultimas_observacoes=[
+            {"data": date.fromordinal(ordinais[i]), "valor": valores[i]}
+            for i in range(max(inicio, fim - ultimas_n), fim)
+        ],
+        **extras,
+    )
+
+
+def _metricas_opcionais(
+    ordinais: Sequence[int],
+    valores: Sequence[float],
+    metricas: set[Metrica],
+    janela_volatilidade: int,
+    meia_vida: float,
+    pontos: int = 30,
+    desvio_padrao: bool = True,
+) -> dict:
+    """Calcula as métricas opcionais pedidas numa única passada pelos dados.
+
+    Cada métrica mantém só o próprio estado (Welford para desvios, somas em
+    janela para a volatilidade móvel, pico corrente para drawdown etc.), então
+    métricas não pedidas não custam nada. Séries temporais (volatilidade
+    móvel, EWMA) guardam apenas os últimos ``pontos`` valores. Com
+    ``desvio_padrao=False`` o desvio dos valores fica a cargo de quem chama
+    (o caminho por janela usa o índice).
+    """
+    extras: dict = {}
+    n = len(valores)
+    com_volatilidade = Metrica.VOLATILIDADE in metricas
+    com_ewma = Metrica.EWMA in metricas
+    com_drawdown = Metrica.DRAWDOWN in metricas
+    com_retornos = Metrica.RETORNOS in metricas
+
+    if com_volatilidade or com_ewma or com_drawdown or com_retornos:
+        corte = n - pontos
+        anterior = valores[0]
+
+        # Welford sobre valores e sobre retornos simples
+        k = kr = 0
+        media = m2 = media_r = m2_r = 0.0
+        # Janela móvel de retornos
+        w = janela_volatilidade
+        janela: deque[float] = deque()
+        soma_j = soma2_j = 0.0
+        vol_movel: list[dict] = []
+        # EWMA
+        alfa = 1 - 0.5 ** (1 / meia_vida)
+        ewma_atual = valores[0]
+        ewma: list[dict] = []
+        # Drawdown
+        pico, i_pico = valores[0], 0
+        dd_max, i_pico_dd, i_vale_dd = 0.0, 0, 0
+        # Retornos por ano
+        ano = date.fromordinal(ordinais[0]).year
+        fim_ano = date(ano + 1, 1, 1).toordinal()
+        base_ano = valores[0]
+        anuais: list[dict] = []
+
+        for i in range(n):
+            x = valores[i]
+
+            if com_volatilidade:
+                if desvio_padrao:
+                    k += 1
+                    d = x - media
+                    media += d / k
+                    m2 += d * (x - media)
+                if i and anterior:
+                    r = x / anterior - 1
+                    kr += 1
+                    d = r - media_r
+                    media_r += d / kr
+                    m2_r += d * (r - media_r)
+                    janela.append(r)
+                    soma_j += r
+                    soma2_j += r * r
+                    if len(janela) > w:
+                        velho = janela.popleft()
+                        soma_j -= velho
+                        soma2_j -= velho * velho
+                    if i >= corte and len(janela) == w:
+                        var = max(0.0, (soma2_j - soma_j * soma_j / w) / (w - 1))
+                        vol_movel.append({
+                            "data": date.fromordinal(ordinais[i]),
+                            "valor": round(math.sqrt(var) * 100, 6),
+                        })
+
+            if com_ewma:
+                ewma_atual += alfa * (x - ewma_atual)
+                if i >= corte:
+                    ewma.append({"data": date.fromordinal(ordinais[i]), "valor": round(ewma_atual, 6)})
+
+            if com_drawdown:
+                if x > pico:
+                    pico, i_pico = x, i
+                elif pico > 0 and x / pico - 1 < dd_max:
+                    dd_max, i_pico_dd, i_vale_dd = x / pico - 1, i_pico, i
+
+            if com_retornos and ordinais[i] >= fim_ano:
+                anuais.append(_retorno_anual(ano, base_ano, anterior))
+                ano = date.fromordinal(ordinais[i]).year
+                fim_ano = date(ano + 1, 1, 1).toordinal()
+                base_ano = anterior  # ano novo parte do fechamento do anterior
+
+            anterior = x
+
+        if com_volatilidade:
+            if desvio_padrao:
+                extras["desvio_padrao"] = round(math.sqrt(m2 / (k - 1)), 6) if k > 1 else None
+            extras["volatilidade"] = round(math.sqrt(m2_r / (kr - 1)) * 100, 6) if kr > 1 else None
+            extras["volatilidade_movel"] = vol_movel
+        if com_ewma:
+            extras["ewma"] = ewma
+        if com_drawdown:
+            extras["drawdown_maximo"] = round(dd_max * 100, 4)
+            extras["data_pico_drawdown"] = date.fromordinal(ordinais[i_pico_dd])
+            extras["data_vale_drawdown"] = date.fromordinal(ordinais[i_vale_dd])
+        if com_retornos:
+            anuais.append(_retorno_anual(ano, base_ano, valores[-1]))
+            extras["retornos_anuais"] = anuais
+
+    if Metrica.QUANTIS in metricas:
+        ordenados = sorted(valores)  # timsort em C; só quando pedido
+        extras["quantis"] = {nome: round(_quantil(ordenados, p), 6) for nome, p in QUANTIS.items()}
+
+    return extras
+
+
+def _retorno_anual(ano: int, base: float, fim: float) -> dict:
+    retorno = (fim / base - 1) * 100 if base else None
+    return {"ano": ano, "retorno_percentual": round(retorno, 4) if retorno is not None else None}
+
+
+def _quantil(ordenados: Sequence[float], p: float) -> float:
+    """Quantil com interpolação linear (mesmo critério do ``numpy.quantile``)."""
+    pos = (len(ordenados) - 1) * p
+    baixo = int(pos)
+    alto = min(baixo + 1, len(ordenados) - 1)
+    return ordenados[baixo] + (ordenados[alto] - ordenados[baixo]) * (pos - baixo)
+
+
 def _media_movel(
-    observacoes: list[Observacao],
+    ordinais: Sequence[int],
+    valores: Sequence[float],
     janela: int,
+    pontos: int = 30,
 ) -> list[dict]:
     """Calcula média móvel simples com a janela especificada.
 
-    Retorna apenas os últimos 30 pontos para manter a resposta leve.
+    Retorna apenas os últimos ``pontos`` pontos para manter a resposta leve,
+    e por isso só calcula essas janelas.
     """
-    if len(observacoes) < janela:
+    n = len(valores)
+    if n < janela:
         return []
 
-    resultado: list[dict] = []
-    valores = [o.valor for o in observacoes]
-    datas = [o.data for o in observacoes]
-
-    for i in range(janela - 1, len(valores)):
-        janela_valores = valores[i - janela + 1 : i + 1]
-        media = sum(janela_valores) / janela
-        resultado.append({
-            "data": datas[i].isoformat(),
-            "valor": round(media, 6),
-        })
-
-    # Retorna apenas os últimos 30 pontos
-    return resultado[-30:]
+    return [
+        {
+            "data": date.fromordinal(ordinais[i]),
+            "valor": round(sum(valores[i - janela + 1 : i + 1]) / janela, 6),
+        }
+        for i in range(max(janela - 1, n - pontos), n)
+    ]
@@ -0,0 +1,60 @@
+"""Snapshot das últimas observações de todas as séries numa única query.
+
+Para cada série, uma subquery correlacionada acha a data de corte (a k-ésima
+mais recente) descendo o índice ``(serie_id, data)`` por k entradas. O
+join externo lê só as linhas a partir dessa data. O custo é
+O(séries × (log n + k)) e não cresce com o histórico. Um ``ROW_NUMBER()
+OVER (PARTITION BY serie_id ORDER BY data DESC)`` daria o mesmo resultado,
+mas numera todas as linhas de ``observacoes`` antes de filtrar ``<= k``
+(varredura completa, O(total de linhas)).
+"""
+
+from datetime import date
+from itertools import groupby
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.orm import Session, aliased
+
+from app.db.models import Observacao, Serie
+
+
+def consultar_snapshot(db: Session, k: int = 2) -> list[dict]:
+    """Últimas ``k`` observações (em ordem de data) de cada série com dados."""
+    anterior = aliased(Observacao)
+    corte = (
+        select(anterior.data)
+        .where(anterior.serie_id == Serie.id)
+        .order_by(anterior.data.desc())
+        .limit(1)
+        .offset(k - 1)
+        .correlate(Serie)
+        .scalar_subquery()
+    )
+    linhas = db.execute(
+        select(Serie.codigo, Serie.nome, Serie.ultima_sync, Observacao.data, Observacao.valor)
+        .join(Observacao, Observacao.serie_id == Serie.id)
+        # Séries com menos de k pontos não têm k-ésima data: entram inteiras
+        .where(Observacao.data >= func.coalesce(corte, literal(date.min, Observacao.data.type)))
+        .order_by(Serie.codigo, Observacao.data)
+    ).all()
+
+    snapshot = []
+    for codigo, grupo in groupby(linhas, key=lambda linha: linha.codigo):
+        grupo = list(grupo)
+        pontos = [{"data": linha.data, "valor": linha.valor} for linha in grupo]
+        ultimo = pontos[-1]["valor"]
+        anterior_valor = pontos[-2]["valor"] if len(pontos) > 1 else None
+        variacao = ultimo - anterior_valor if anterior_valor is not None else None
+        snapshot.append({
+            "codigo": codigo,
+            "nome": grupo[0].nome,
+            "ultima_sync": grupo[0].ultima_sync,
+            "ultimo_valor": ultimo,
+            "valor_anterior": anterior_valor,
+            "variacao_absoluta": round(variacao, 6) if variacao is not None else None,
+            "variacao_percentual": (
+                round(variacao / anterior_valor * 100, 4) if anterior_valor else None
+            ),
+            "ultimas_observacoes": pontos,
+        })
+    return snapshot
@@ -0,0 +1,419 @@
+"""Store em memória das séries quentes (arrays contíguos + busca binária).
+
+Cada série fica em dois arrays compactos: ``array('i')`` com as datas como
+ordinais (int32) e ``array('d')`` com os valores. Leituras por intervalo de
+datas viram duas buscas binárias e uma fatia, sem round trip ao banco.
+
+As séries do catálogo ficam fixas; as demais entram num LRU limitado pelo
+teto de memória. Cada série carrega também um :class:`IndiceIntervalos`
+(somas prefixadas + árvores de min/max) para insights por janela sem varrer
+os dados. Opcionalmente a série e o índice são persistidos num arquivo
+binário lido via ``mmap`` no boot, evitando recarregar tudo do banco.
+"""
+
+import mmap
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from itertools import groupby
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.models import Observacao, Serie
+from app.services.bcb_client import SERIES_CONHECIDAS
+from app.services.indice import IndiceIntervalos
+
+# magic, pontos, capacidade do índice, carimbo (ultima_sync em µs), base do índice
+_CABECALHO = struct.Struct("<4sIIqd4x")
+_MAGIC = b"MIS2"
+
+
+def _carimbo(ultima_sync: datetime | None) -> int:
+    """Converte ``ultima_sync`` num inteiro estável para validar arquivos persistidos."""
+    if ultima_sync is None:
+        return 0
+    return int(ultima_sync.replace(tzinfo=timezone.utc).timestamp() * 1_000_000)
+
+
+@dataclass
+class SerieEmMemoria:
+    """Série mantida em arrays compactos, ordenada por data."""
+
+    codigo: int
+    nome: str
+    ordinais: array = field(default_factory=lambda: array("i"))
+    valores: array = field(default_factory=lambda: array("d"))
+    carimbo: int = 0
+    versao: int = 0  # incrementada a cada alteração (chave para caches derivados)
+    indice: IndiceIntervalos | None = None
+
+    def __post_init__(self) -> None:
+        if self.indice is None:
+            self.indice = IndiceIntervalos(self.valores)
+
+    def __len__(self) -> int:
+        return len(self.valores)
+
+    @property
+    def bytes_usados(self) -> int:
+        return (
+            self.ordinais.itemsize * len(self.ordinais)
+            + self.valores.itemsize * len(self.valores)
+            + self.indice.bytes_usados
+        )
+
+    def data(self, i: int) -> date:
+        return date.fromordinal(self.ordinais[i])
+
+    def intervalo(self, data_inicial: date | None, data_final: date | None) -> tuple[int, int]:
+        """Retorna ``(inicio, fim)`` (fim exclusivo) das posições dentro do filtro."""
+        inicio = bisect_left(self.ordinais, data_inicial.toordinal()) if data_inicial else 0
+        fim = bisect_right(self.ordinais, data_final.toordinal()) if data_final else len(self)
+        return inicio, max(inicio, fim)
+
+    def mesclar(self, dados: Iterable[dict]) -> "SerieEmMemoria":
+        """Nova série com as linhas ``{"data", "valor"}`` recém-sincronizadas (upsert por data).
+
+        A série atual não é alterada: leituras em andamento seguem sobre ela
+        enquanto o store troca a referência pela nova (``self`` se não há dados).
+        """
+        novos = sorted((item["data"].toordinal(), item["valor"]) for item in dados)
+        if not novos:
+            return self
+        if not self.ordinais or novos[0][0] > self.ordinais[-1]:
+            # Caminho comum: só datas novas no fim (cópia dos arrays + índice em O(log n) por ponto)
+            ordinais = self.ordinais + array("i", (o for o, _ in novos))
+            valores = self.valores + array("d", (v for _, v in novos))
+            indice = self.indice.copiar(valores)
+            for valor in valores[len(self.valores):]:
+                indice.anexar(valor)
+        else:
+            pontos = dict(zip(self.ordinais, self.valores))
+            pontos.update(novos)
+            ordenados = sorted(pontos.items())
+            ordinais = array("i", (o for o, _ in ordenados))
+            valores = array("d", (v for _, v in ordenados))
+            indice = None
+        return SerieEmMemoria(
+            codigo=self.codigo,
+            nome=self.nome,
+            ordinais=ordinais,
+            valores=valores,
+            carimbo=self.carimbo,
+            versao=self.versao + 1,
+            indice=indice,
+        )
+
+
+class StoreSeries:
+    """Cache de séries em memória com séries fixas, LRU e teto de memória."""
+
+    def __init__(
+        self,
+        limite_bytes: int,
+        fixas: Iterable[int] = (),
+        diretorio: Path | None = None,
+        validade_s: float = 1.0,
+    ) -> None:
+        self.limite_bytes = limite_bytes
+        self.fixas = set(fixas)
+        self.diretorio = diretorio
+        self.validade_s = validade_s
+        # Quando cada série foi conferida contra ``Serie.ultima_sync`` (monotonic)
+        self._conferidas: dict[int, float] = {}
+        self._series: dict[int, SerieEmMemoria] = {}
+        self._lru: OrderedDict[int, SerieEmMemoria] = OrderedDict()
+        self._lock = threading.RLock()
+        # Syncs de séries fora da memória durante o aquecimento (o banco já tem dados mais novos)
+        self._aquecendo = False
+        self._sincronizadas_no_aquecimento: set[int] = set()
+        self.hits = 0
+        self.misses = 0
+
+    # ── Consulta ─────────────────────────────────────────────────────────────
+
+    def obter(self, codigo: int) -> SerieEmMemoria | None:
+        with self._lock:
+            serie = self._series.get(codigo) or self._lru.get(codigo)
+            if serie is None:
+                self.misses += 1
+                return None
+            if codigo in self._lru:
+                self._lru.move_to_end(codigo)
+            self.hits += 1
+            return serie
+
+    def obter_ou_carregar(self, db: Session, codigo: int) -> SerieEmMemoria | None:
+        """Retorna a série da memória ou carrega do banco (``None`` se não existe).
+
+        Com vários workers, um sync só atualiza a memória do worker que o fez.
+        Por isso, passados ``validade_s`` segundos da última conferência, o
+        ``carimbo`` da série é comparado com ``Serie.ultima_sync`` (uma query
+        por chave primária). Se outro processo sincronizou, a série é
+        recarregada do banco.
+        """
+        serie = self.obter(codigo)
+        if serie is not None and not self._conferencia_vencida(codigo):
+            return serie
+
+        registro = db.query(Serie.id, Serie.nome, Serie.ultima_sync).filter(Serie.codigo == codigo).first()
+        if registro is None:
+            self.remover(codigo)
+            return None
+        carimbo = _carimbo(registro.ultima_sync)
+        if serie is not None and serie.carimbo == carimbo:
+            self._conferidas[codigo] = time.monotonic()
+            return serie
+        linhas = (
+            db.query(Observacao.data, Observacao.valor)
+            .filter(Observacao.serie_id == registro.id)
+            .order_by(Observacao.data)
+            .all()
+        )
+        serie = self._montar(codigo, registro.nome, carimbo, linhas)
+        self.colocar(serie)
+        return serie
+
+    @property
+    def bytes_usados(self) -> int:
+        with self._lock:
+            return sum(s.bytes_usados for s in self._todas())
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "series_fixas": len(self._series),
+                "series_lru": len(self._lru),
+                "bytes_usados": sum(s.bytes_usados for s in self._todas()),
+                "limite_bytes": self.limite_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    # ── Escrita ──────────────────────────────────────────────────────────────
+
+    def colocar(self, serie: SerieEmMemoria) -> None:
+        with self._lock:
+            self._conferidas[serie.codigo] = time.monotonic()
+            if serie.codigo in self.fixas:
+                self._series[serie.codigo] = serie
+            else:
+                self._lru[serie.codigo] = serie
+                self._lru.move_to_end(serie.codigo)
+            self._respeitar_limite()
+
+    def aplicar_sync(self, codigo: int, dados: list[dict], ultima_sync: datetime | None) -> None:
+        """Mantém a série coerente com o banco após um sync.
+
+        Séries que não estão em memória são ignoradas: serão carregadas por
+        inteiro do banco na próxima leitura.
+        """
+        with self._lock:
+            serie = self._series.get(codigo) or self._lru.get(codigo)
+            if serie is None:
+                if self._aquecendo:
+                    self._sincronizadas_no_aquecimento.add(codigo)
+                return
+            serie = serie.mesclar(dados)
+            serie.carimbo = _carimbo(ultima_sync)
+            # Troca atômica: quem já leu a série antiga termina sobre ela
+            self.colocar(serie)
+        self._persistir(serie)
+
+    def remover(self, codigo: int) -> None:
+        with self._lock:
+            self._series.pop(codigo, None)
+            self._lru.pop(codigo, None)
+            self._conferidas.pop(codigo, None)
+
+    def invalidar(self, codigo: int) -> None:
+        """Descarta a série da memória e do disco (após cargas feitas fora da API)."""
+        self.remover(codigo)
+        arquivo = self._arquivo(codigo)
+        if arquivo is not None:
+            arquivo.unlink(missing_ok=True)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self._lru.clear()
+            self._conferidas.clear()
+            self.hits = self.misses = 0
+
+    def aquecer(self, db: Session) -> int:
+        """Carrega as séries fixas já sincronizadas (chamado no ``lifespan``)."""
+        with self._lock:
+            self._aquecendo = True
+            self._sincronizadas_no_aquecimento.clear()
+        try:
+            registros = (
+                db.query(Serie.id, Serie.codigo, Serie.nome, Serie.ultima_sync)
+                .filter(Serie.codigo.in_(self.fixas))
+                .all()
+            )
+            pendentes = {}
+            for reg in registros:
+                serie = self._ler_persistida(reg.codigo, reg.nome, _carimbo(reg.ultima_sync))
+                if serie is not None:
+                    self._colocar_aquecida(serie)
+                else:
+                    pendentes[reg.id] = reg
+
+            if pendentes:
+                linhas = (
+                    db.query(Observacao.serie_id, Observacao.data, Observacao.valor)
+                    .filter(Observacao.serie_id.in_(pendentes))
+                    .order_by(Observacao.serie_id, Observacao.data)
+                    .all()
+                )
+                for serie_id, grupo in groupby(linhas, key=lambda linha: linha.serie_id):
+                    reg = pendentes[serie_id]
+                    serie = self._montar(reg.codigo, reg.nome, _carimbo(reg.ultima_sync), grupo)
+                    if self._colocar_aquecida(serie):
+                        self._persistir(serie)
+        finally:
+            with self._lock:
+                self._aquecendo = False
+                self._sincronizadas_no_aquecimento.clear()
+
+        logger.info("Store aquecido: %d séries, %d bytes", len(registros), self.bytes_usados)
+        return len(registros)
+
+    def aquecer_em_segundo_plano(self, fabrica_sessao: Callable[[], Session]) -> threading.Thread:
+        """Aquece numa thread, sem atrasar o boot; leituras até lá vão ao banco."""
+
+        def _executar() -> None:
+            try:
+                with fabrica_sessao() as db:
+                    self.aquecer(db)
+            except Exception:
+                logger.exception("Falha ao aquecer o store em segundo plano")
+
+        thread = threading.Thread(target=_executar, name="aquecimento-store", daemon=True)
+        thread.start()
+        return thread
+
+    # ── Internos ─────────────────────────────────────────────────────────────
+
+    def _conferencia_vencida(self, codigo: int) -> bool:
+        return time.monotonic() - self._conferidas.get(codigo, float("-inf")) >= self.validade_s
+
+    def _colocar_aquecida(self, serie: SerieEmMemoria) -> bool:
+        """Coloca uma série do aquecimento, salvo se uma leitura ou sync já a tornou obsoleta."""
+        with self._lock:
+            codigo = serie.codigo
+            if codigo in self._sincronizadas_no_aquecimento or codigo in self._series or codigo in self._lru:
+                return False
+            self.colocar(serie)
+            return True
+
+    def _todas(self) -> Iterable[SerieEmMemoria]:
+        yield from self._series.values()
+        yield from self._lru.values()
+
+    @staticmethod
+    def _montar(codigo: int, nome: str, carimbo: int, linhas: Iterable) -> SerieEmMemoria:
+        ordinais, valores = array("i"), array("d")
+        for linha in linhas:
+            ordinais.append(linha.data.toordinal())
+            valores.append(linha.valor)
+        return SerieEmMemoria(codigo=codigo, nome=nome, ordinais=ordinais, valores=valores, carimbo=carimbo)
+
+    def _respeitar_limite(self) -> None:
+        total = sum(s.bytes_usados for s in self._todas())
+        while total > self.limite_bytes and self._lru:
+            codigo, removida = self._lru.popitem(last=False)
+            self._conferidas.pop(codigo, None)
+            total -= removida.bytes_usados
+        if total > self.limite_bytes:
+            logger.warning(
+                "Séries fixas usam %d bytes, acima do limite do store (%d)", total, self.limite_bytes
+            )
+
+    def _arquivo(self, codigo: int) -> Path | None:
+        return self.diretorio / f"{codigo}.bin" if self.diretorio else None
+
+    def _persistir(self, serie: SerieEmMemoria) -> None:
+        """Grava a série num arquivo temporário próprio e o troca atomicamente.
+
+        O arquivo é só um cache: falhas são registradas no log e nunca
+        derrubam um sync já gravado no banco nem o boot.
+        """
+        arquivo = self._arquivo(serie.codigo)
+        if arquivo is None:
+            return
+        temporario = None
+        try:
+            arquivo.parent.mkdir(parents=True, exist_ok=True)
+            indice = serie.indice
+            # Nome único: vários workers podem persistir a mesma série no mesmo diretório
+            with tempfile.NamedTemporaryFile(
+                dir=arquivo.parent, prefix=f"{serie.codigo}.", suffix=".tmp", delete=False
+            ) as f:
+                temporario = Path(f.name)
+                f.write(_CABECALHO.pack(_MAGIC, len(serie), indice.capacidade, serie.carimbo, indice.base))
+                for parte in (serie.valores, indice.somas, indice.somas2, serie.ordinais, indice.arvore_min, indice.arvore_max):
+                    parte.tofile(f)
+            temporario.replace(arquivo)
+        except Exception:
+            logger.exception("Falha ao persistir a série %d em %s", serie.codigo, arquivo)
+            if temporario is not None:
+                temporario.unlink(missing_ok=True)
+
+    @staticmethod
+    def _tamanho_esperado(n: int, capacidade: int) -> int:
+        """Bytes de um arquivo com ``n`` pontos: valores, somas, somas², ordinais e as duas árvores."""
+        return _CABECALHO.size + 8 * n + 16 * (n + 1) + 4 * n + 16 * capacidade
+
+    def _ler_persistida(self, codigo: int, nome: str, carimbo: int) -> SerieEmMemoria | None:
+        """Lê a série (e o índice) do arquivo via mmap se corresponde ao último sync.
+
+        Arquivos truncados ou com tamanho que não bate com o cabeçalho são
+        descartados (a série volta a ser lida do banco).
+        """
+        arquivo = self._arquivo(codigo)
+        if arquivo is None or not arquivo.exists():
+            return None
+        try:
+            with open(arquivo, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if len(mm) < _CABECALHO.size:
+                    raise ValueError("arquivo menor que o cabeçalho")
+                magic, n, capacidade, carimbo_arquivo, base = _CABECALHO.unpack_from(mm)
+                if magic != _MAGIC or len(mm) != self._tamanho_esperado(n, capacidade):
+                    raise ValueError("cabeçalho não corresponde ao tamanho do arquivo")
+                if carimbo_arquivo != carimbo:
+                    return None
+                partes = []
+                posicao = _CABECALHO.size
+                for tipo, tamanho in (("d", n), ("d", n + 1), ("d", n + 1), ("i", n), ("i", 2 * capacidade), ("i", 2 * capacidade)):
+                    parte = array(tipo)
+                    fim = posicao + parte.itemsize * tamanho
+                    parte.frombytes(mm[posicao:fim])
+                    partes.append(parte)
+                    posicao = fim
+        except (OSError, ValueError) as exc:
+            logger.warning("Arquivo do store %s descartado: %s", arquivo, exc)
+            arquivo.unlink(missing_ok=True)
+            return None
+        valores, somas, somas2, ordinais, arvore_min, arvore_max = partes
+        indice = IndiceIntervalos(valores, base, somas, somas2, arvore_min, arvore_max)
+        return SerieEmMemoria(
+            codigo=codigo, nome=nome, ordinais=ordinais, valores=valores, carimbo=carimbo, indice=indice
+        )
+
+store = StoreSeries(
+    limite_bytes=settings.STORE_LIMITE_MB * 1024 * 1024,
+    fixas=SERIES_CONHECIDAS,
+    diretorio=Path(settings.STORE_DIRETORIO) if settings.STORE_DIRETORIO else None,
+    validade_s=settings.STORE_VALIDADE_S,
+)
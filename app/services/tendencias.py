@@ -0,0 +1,185 @@
+"""Tendências: regressão linear móvel, direção e pontos de virada.
+
+Para cada posição ``i`` a reta de mínimos quadrados é ajustada às últimas
+``janela`` observações (x = data em dias, então espaçamentos irregulares
+entram certos). As somas Σx, Σx², Σy, Σy² e Σxy andam com a janela, e cada
+passo custa O(1): a série inteira sai em O(n). Os arrays ficam em cache por
+série e ``versao``; uma consulta por período só fatia o cache e varre a
+janela pedida atrás das viradas.
+"""
+
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+
+from app.core.config import settings
+from app.services.store import SerieEmMemoria
+
+DIAS_POR_ANO = 365.25
+DIRECOES = {1: "alta", -1: "baixa", 0: "estavel"}
+
+
+@dataclass
+class RegressaoMovel:
+    """Inclinação (por ano), R² e direção da reta terminada em cada posição.
+
+    As posições ``< janela - 1`` não têm janela completa e ficam com ``0``.
+    """
+
+    janela: int
+    inclinacoes: array
+    r2: array
+    direcoes: array  # 1 alta, -1 baixa, 0 estável
+
+    @property
+    def bytes_usados(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.inclinacoes, self.r2, self.direcoes))
+
+
+def regressao_movel(ordinais: array, valores: array, janela: int, tolerancia: float = 1e-9) -> RegressaoMovel:
+    """OLS em janela móvel com somas incrementais.
+
+    x e y são centrados no primeiro ponto para reduzir o cancelamento nas
+    somas; as somas de x são inteiras (exatas). A direção é estável quando a
+    variação ajustada na janela é menor que ``tolerancia`` vezes a escala da série.
+    """
+    n = len(valores)
+    inclinacoes = array("d", bytes(8 * n))
+    r2 = array("d", bytes(8 * n))
+    direcoes = array("b", bytes(n))
+    if n < janela:
+        return RegressaoMovel(janela, inclinacoes, r2, direcoes)
+
+    x0, y0 = ordinais[0], valores[0]
+    escala = tolerancia * max(1.0, max(abs(v) for v in valores))
+    sx = sxx = 0
+    sy = syy = sxy = 0.0
+    for i in range(n):
+        x, y = ordinais[i] - x0, valores[i] - y0
+        sx += x
+        sxx += x * x
+        sy += y
+        syy += y * y
+        sxy += x * y
+        if i >= janela:
+            xv, yv = ordinais[i - janela] - x0, valores[i - janela] - y0
+            sx -= xv
+            sxx -= xv * xv
+            sy -= yv
+            syy -= yv * yv
+            sxy -= xv * yv
+        if i < janela - 1:
+            continue
+
+        vxx = sxx - sx * sx / janela
+        vxy = sxy - sx * sy / janela
+        vyy = syy - sy * sy / janela
+        if vxx <= 0:
+            continue
+        b = vxy / vxx
+        inclinacoes[i] = b * DIAS_POR_ANO
+        r2[i] = min(1.0, vxy * vxy / (vxx * vyy)) if vyy > 0 else 0.0
+        if abs(b) * (ordinais[i] - ordinais[i - janela + 1]) > escala:
+            direcoes[i] = 1 if b > 0 else -1
+    return RegressaoMovel(janela, inclinacoes, r2, direcoes)
+
+
+def resumir_tendencia(
+    ordinais: array,
+    regressao: RegressaoMovel,
+    inicio: int,
+    fim: int,
+    pontos: int = 30,
+) -> dict | None:
+    """Direção atual, viradas e últimos ``pontos`` ajustes das janelas dentro de ``[inicio, fim)``.
+
+    Uma virada é a troca alta↔baixa, mesmo com trechos estáveis no meio (ex.:
+    ciclo da SELIC que sobe, pausa e passa a cair); ela é datada no fim da
+    primeira janela com o novo sinal.
+    """
+    primeiro = inicio + regressao.janela - 1
+    if primeiro >= fim:
+        return None
+
+    direcoes = regressao.direcoes
+    viradas: list[dict] = []
+    anterior, desde = 0, primeiro
+    for i in range(primeiro, fim):
+        d = direcoes[i]
+        if d != direcoes[i - 1] or i == primeiro:
+            desde = i
+        if d and d != anterior:
+            if anterior:
+                viradas.append({
+                    "data": date.fromordinal(ordinais[i]),
+                    "de": DIRECOES[anterior],
+                    "para": DIRECOES[d],
+                })
+            anterior = d
+
+    ultimo = fim - 1
+    return {
+        "janela": regressao.janela,
+        "direcao": DIRECOES[direcoes[ultimo]],
+        "desde": date.fromordinal(ordinais[desde]),
+        "inclinacao": round(regressao.inclinacoes[ultimo], 6),
+        "r2": round(regressao.r2[ultimo], 4),
+        "pontos_virada": viradas,
+        "serie": [
+            {
+                "data": date.fromordinal(ordinais[i]),
+                "inclinacao": round(regressao.inclinacoes[i], 6),
+                "r2": round(regressao.r2[i], 4),
+            }
+            for i in range(max(primeiro, fim - pontos), fim)
+        ],
+    }
+
+
+class CacheTendencias:
+    """Regressões móveis por ``(codigo, janela)``, válidas enquanto a série não mudar.
+
+    LRU limitado a ``capacidade`` itens e a ``limite_bytes`` (fora do teto do store).
+    """
+
+    def __init__(self, capacidade: int = 64, limite_bytes: int = 32 * 1024 * 1024) -> None:
+        self.capacidade = capacidade
+        self.limite_bytes = limite_bytes
+        self._itens: OrderedDict[tuple[int, int], tuple[SerieEmMemoria, int, RegressaoMovel]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.calculos = 0
+
+    def obter(self, serie: SerieEmMemoria, janela: int) -> RegressaoMovel:
+        chave = (serie.codigo, janela)
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None and item[0] is serie and item[1] == serie.versao:
+                self._itens.move_to_end(chave)
+                return item[2]
+
+        versao = serie.versao
+        regressao = regressao_movel(serie.ordinais, serie.valores, janela)
+        with self._lock:
+            self._itens[chave] = (serie, versao, regressao)
+            self._itens.move_to_end(chave)
+            total = sum(r.bytes_usados for _, _, r in self._itens.values())
+            while len(self._itens) > 1 and (len(self._itens) > self.capacidade or total > self.limite_bytes):
+                _, (_, _, removida) = self._itens.popitem(last=False)
+                total -= removida.bytes_usados
+            self.calculos += 1
+        return regressao
+
+    @property
+    def bytes_usados(self) -> int:
+        with self._lock:
+            return sum(r.bytes_usados for _, _, r in self._itens.values())
+
+
+cache_tendencias = CacheTendencias(limite_bytes=settings.TENDENCIAS_LIMITE_MB * 1024 * 1024)
+
+
+def calcular_tendencia(serie: SerieEmMemoria, inicio: int, fim: int, janela: int) -> dict | None:
+    """Tendência da série no intervalo de posições ``[inicio, fim)``."""
+    return resumir_tendencia(serie.ordinais, cache_tendencias.obter(serie, janela), inicio, fim)
@@ -0,0 +1,87 @@
+"""Benchmark: cold start até o primeiro ``GET /`` saudável.
+
+Sobe ``uvicorn app.main:app`` num subprocesso (como um container novo do
+autoscaler) sobre um banco já existente e mede o tempo do ``Popen`` até o
+primeiro 200 em ``/``. Também mostra a quebra por etapa registrada no log
+de inicialização.
+
+Uso: ``python -m benchmarks.bench_cold_start``
+"""
+
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+REPETICOES = 5
+TIMEOUT_S = 30
+
+MODOS = {
+    "create_all a cada boot": {"DB_INICIALIZACAO": "criar", "STORE_AQUECIMENTO": "boot"},
+    "verificar schema": {"DB_INICIALIZACAO": "verificar", "STORE_AQUECIMENTO": "boot"},
+    "verificar + store em 2º plano": {"DB_INICIALIZACAO": "verificar", "STORE_AQUECIMENTO": "segundo_plano"},
+}
+
+_LOG_INICIALIZACAO = re.compile(r"Inicialização em .*")
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _subir(ambiente: dict[str, str]) -> tuple[float, str]:
+    """Retorna (segundos até o primeiro 200, linha de log com as etapas)."""
+    porta = _porta_livre()
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(porta), "--log-level", "warning"],
+        env=ambiente,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    try:
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{porta}/", timeout=1) as resp:
+                    if resp.status == 200:
+                        break
+            except OSError:
+                if time.perf_counter() - inicio > TIMEOUT_S or processo.poll() is not None:
+                    raise RuntimeError("servidor não ficou saudável")
+                time.sleep(0.005)
+        duracao = time.perf_counter() - inicio
+    finally:
+        processo.terminate()
+        saida, _ = processo.communicate()
+    etapas = _LOG_INICIALIZACAO.search(saida)
+    return duracao, etapas.group(0) if etapas else ""
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        base = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{Path(tmp) / 'bench.db'}",
+            "DEBUG": "false",
+            "PYTHONPATH": str(Path(__file__).resolve().parent.parent),
+        }
+        _subir(base)  # primeiro boot cria o banco; os medidos encontram o schema pronto
+        for nome, variaveis in MODOS.items():
+            tempos, etapas = [], ""
+            for _ in range(REPETICOES):
+                duracao, etapas = _subir({**base, **variaveis})
+                tempos.append(duracao * 1000)
+            print(f"{nome:<32} mediana {statistics.median(tempos):7.1f} ms  ({etapas})")
+
+
+if __name__ == "__main__":
+    main()
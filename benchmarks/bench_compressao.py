@@ -0,0 +1,56 @@
+"""Benchmark: tamanho e custo de CPU dos formatos e codecs de uma série inteira.
+
+Simula uma leitura completa de uma série diária longa (~30 anos) em cada
+formato de ``GET /series/{codigo}`` e em cada codec disponível.
+
+Uso: ``python -m benchmarks.bench_compressao``
+"""
+
+import random
+import timeit
+from array import array
+from datetime import date, timedelta
+
+import orjson
+
+from app.api.compressao import _codecs_disponiveis
+from app.api.respostas import RespostaBinaria, deltas_dias
+
+N_PONTOS = 7_500  # ~30 anos de dias úteis
+REPETICOES = 20
+
+
+def main() -> None:
+    rnd = random.Random(1)
+    datas, atual = [], date(1995, 1, 2)
+    for _ in range(N_PONTOS):
+        datas.append(atual)
+        atual += timedelta(days=3 if atual.weekday() == 4 else 1)
+    ordinais = array("i", (d.toordinal() for d in datas))
+    valores = array("d", (round(3 + rnd.gauss(0, 0.01) * i ** 0.5, 4) for i in range(N_PONTOS)))
+
+    formatos = {
+        "linhas": lambda: orjson.dumps(
+            {"observacoes": [{"data": d, "valor": v} for d, v in zip(datas, valores)]}
+        ),
+        "colunar": lambda: orjson.dumps({"datas": datas, "valores": valores.tolist()}),
+        "delta": lambda: orjson.dumps({
+            "data_inicial": datas[0],
+            "deltas": deltas_dias(ordinais).tolist(),
+            "valores": valores.tolist(),
+        }),
+        "binario": lambda: RespostaBinaria(ordinais, valores).body,
+    }
+    codecs = {"identity": lambda corpo: corpo, **_codecs_disponiveis(6)}
+
+    print(f"{'formato':<9} {'codec':<9} {'bytes':>9} {'encode µs':>11} {'comprime µs':>12}")
+    for nome, codificar in formatos.items():
+        corpo = codificar()
+        t_encode = timeit.timeit(codificar, number=REPETICOES) / REPETICOES
+        for codec, comprimir in codecs.items():
+            t_comp = timeit.timeit(lambda: comprimir(corpo), number=REPETICOES) / REPETICOES
+            print(f"{nome:<9} {codec:<9} {len(comprimir(corpo)):>9} {t_encode * 1e6:>11.0f} {t_comp * 1e6:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
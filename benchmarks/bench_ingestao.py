@@ -0,0 +1,93 @@
+"""Benchmark: escrita concorrente de vários processos num mesmo SQLite.
+
+Compara gravação direta (uma transação por sync, cada processo por conta
+própria) com o escritor único (lotes + lock de arquivo + WAL), medindo
+linhas/s e syncs que falharam com ``database is locked``.
+
+Uso: ``python -m benchmarks.bench_ingestao``
+"""
+
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from concurrent.futures import wait
+from datetime import date, timedelta
+from pathlib import Path
+
+SYNCS_POR_WORKER = 40
+LINHAS_POR_SYNC = 500
+
+
+def _worker(url: str, modo: str, worker: int, saida) -> None:
+    os.environ["DATABASE_URL"] = url
+    os.environ["DEBUG"] = "false"
+    os.environ["SQLITE_BUSY_TIMEOUT_MS"] = "1000"
+    from sqlalchemy.orm import Session
+
+    from app.db.session import engine
+    from app.services.ingestao import EscritorObservacoes, gravar_observacoes
+
+    base = date(2000, 1, 1)
+    syncs = [
+        (worker * 1000 + i, [{"data": base + timedelta(days=d), "valor": float(d)} for d in range(LINHAS_POR_SYNC)])
+        for i in range(SYNCS_POR_WORKER)
+    ]
+    falhas = 0
+    if modo == "direto":
+        for codigo, dados in syncs:
+            try:
+                with Session(engine) as db:
+                    gravar_observacoes(db, codigo, dados)
+                    db.commit()
+            except Exception:
+                falhas += 1
+    else:
+        escritor = EscritorObservacoes()
+        futuros = [escritor.enviar(engine, codigo, dados) for codigo, dados in syncs]
+        wait(futuros)
+        escritor.parar()
+        falhas = sum(1 for f in futuros if f.exception() is not None)
+    saida.put(falhas)
+
+
+def _criar_tabelas(url: str) -> None:
+    os.environ["DATABASE_URL"] = url
+    os.environ["DEBUG"] = "false"
+    import app.db.models  # noqa: F401  (registra as tabelas)
+    from app.db.session import init_db
+
+    init_db()
+
+
+def _rodar(modo: str, workers: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        # spawn: cada worker lê as settings do zero (sem herdar o engine do pai)
+        ctx = mp.get_context("spawn")
+        criar = ctx.Process(target=_criar_tabelas, args=(url,))
+        criar.start()
+        criar.join()
+
+        saida = ctx.Queue()
+        processos = [ctx.Process(target=_worker, args=(url, modo, w, saida)) for w in range(workers)]
+        inicio = time.perf_counter()
+        for p in processos:
+            p.start()
+        for p in processos:
+            p.join()
+        duracao = time.perf_counter() - inicio
+        falhas = sum(saida.get() for _ in processos)
+
+    linhas = (workers * SYNCS_POR_WORKER - falhas) * LINHAS_POR_SYNC
+    print(f"{modo:<9} {workers} workers  {linhas / duracao:12,.0f} linhas/s  {falhas:4d} syncs falharam")
+
+
+def main() -> None:
+    for workers in (4, 8):
+        for modo in ("direto", "escritor"):
+            _rodar(modo, workers)
+
+
+if __name__ == "__main__":
+    main()
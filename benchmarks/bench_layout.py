@@ -0,0 +1,84 @@
+"""Benchmark: layout padrão vs compacto da tabela de observações (SQLite).
+
+Cada layout roda num subprocesso (o layout é lido das settings no import),
+medindo inserção em massa, range scans por ``(serie_id, data)`` e tamanho do
+arquivo.
+
+Uso: ``python -m benchmarks.bench_layout``
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+N_SERIES = 20
+N_POR_SERIE = 25_000
+N_SCANS = 200
+
+LAYOUTS = {
+    "padrão": {"DB_LAYOUT_COMPACTO": "false", "DB_DATAS_ORDINAIS": "false"},
+    "compacto": {"DB_LAYOUT_COMPACTO": "true", "DB_DATAS_ORDINAIS": "false"},
+    "compacto + ordinais": {"DB_LAYOUT_COMPACTO": "true", "DB_DATAS_ORDINAIS": "true"},
+}
+
+
+def _executar_layout() -> None:
+    """Roda dentro do subprocesso, com o layout já definido no ambiente."""
+    from sqlalchemy import insert, select
+
+    from app.db.models import Observacao, Serie
+    from app.db.session import SessionLocal, engine, init_db
+
+    init_db()
+    base = date(1990, 1, 1)
+    with SessionLocal() as db:
+        db.execute(insert(Serie), [{"codigo": c, "nome": f"S{c}"} for c in range(N_SERIES)])
+        ids = [i for (i,) in db.execute(select(Serie.id))]
+
+        inicio = time.perf_counter()
+        for serie_id in ids:
+            db.execute(insert(Observacao), [
+                {"serie_id": serie_id, "data": base + timedelta(days=d), "valor": d * 0.5}
+                for d in range(N_POR_SERIE)
+            ])
+        db.commit()
+        t_insert = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for i in range(N_SCANS):
+            de = base + timedelta(days=(i * 97) % (N_POR_SERIE - 400))
+            db.execute(
+                select(Observacao.data, Observacao.valor)
+                .where(Observacao.serie_id == ids[i % N_SERIES])
+                .where(Observacao.data.between(de, de + timedelta(days=365)))
+                .order_by(Observacao.data)
+            ).all()
+        t_scan = time.perf_counter() - inicio
+
+    total = N_SERIES * N_POR_SERIE
+    tamanho = Path(engine.url.database).stat().st_size / 1e6
+    print(f"{total / t_insert:12,.0f} linhas/s   {t_scan / N_SCANS * 1e3:8.2f} ms/scan   {tamanho:7.1f} MB")
+
+
+def main() -> None:
+    raiz = Path(__file__).resolve().parents[1]
+    with tempfile.TemporaryDirectory() as tmp:
+        for nome, flags in LAYOUTS.items():
+            url = f"sqlite:///{Path(tmp) / (nome.replace(' ', '_') + '.db')}"
+            env = {**os.environ, "DATABASE_URL": url, "DEBUG": "false", **flags}
+            saida = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_layout", "--filho"],
+                env=env, cwd=raiz, check=True, capture_output=True, text=True,
+            ).stdout.strip().splitlines()[-1]
+            print(f"{nome:<22} {saida}")
+
+
+if __name__ == "__main__":
+    if "--filho" in sys.argv:
+        _executar_layout()
+    else:
+        main()
@@ -0,0 +1,74 @@
+"""Benchmark: serialização de uma página de 500 linhas e de insights.
+
+Compara o caminho antigo (objetos por linha + validação Pydantic) com o
+caminho rápido (orjson direto dos arrays).
+
+Uso: ``python -m benchmarks.bench_serializacao``
+"""
+
+import timeit
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import orjson
+
+from app.schemas.series import InsightsResponse, ObservacaoOut, SerieDetalhe
+from app.services.insights import calcular_insights
+
+N_LINHAS = 500
+REPETICOES = 200
+
+
+@dataclass
+class _Obs:
+    data: date
+    valor: float
+
+
+def main() -> None:
+    base = date(2000, 1, 1)
+    linhas = [(base + timedelta(days=i), 5.0 + i * 0.001) for i in range(N_LINHAS)]
+    objetos = [_Obs(d, v) for d, v in linhas]
+
+    def pagina_pydantic() -> bytes:
+        return SerieDetalhe(
+            codigo=1, nome="x", pagina=1, total_paginas=1, total_observacoes=N_LINHAS,
+            observacoes=[ObservacaoOut.model_validate(o, from_attributes=True) for o in objetos],
+        ).model_dump_json().encode()
+
+    def pagina_orjson() -> bytes:
+        return orjson.dumps({
+            "codigo": 1, "nome": "x", "pagina": 1, "total_paginas": 1,
+            "total_observacoes": N_LINHAS,
+            "observacoes": [{"data": d, "valor": v} for d, v in linhas],
+        })
+
+    def pagina_colunar() -> bytes:
+        return orjson.dumps({
+            "codigo": 1, "nome": "x", "pagina": 1, "total_paginas": 1,
+            "total_observacoes": N_LINHAS,
+            "datas": [d for d, _ in linhas],
+            "valores": [v for _, v in linhas],
+        })
+
+    resultado = calcular_insights(objetos, ultimas_n=100)
+
+    def insights_pydantic() -> bytes:
+        return InsightsResponse(codigo=1, nome="x", **vars(resultado)).model_dump_json().encode()
+
+    def insights_orjson() -> bytes:
+        return orjson.dumps({"codigo": 1, "nome": "x", **vars(resultado)})
+
+    for nome, fn in [
+        ("página 500 linhas – pydantic", pagina_pydantic),
+        ("página 500 linhas – orjson", pagina_orjson),
+        ("página 500 linhas – colunar", pagina_colunar),
+        ("insights – pydantic", insights_pydantic),
+        ("insights – orjson", insights_orjson),
+    ]:
+        seg = timeit.timeit(fn, number=REPETICOES) / REPETICOES
+        print(f"{nome:<32} {seg * 1e6:10.1f} µs  {len(fn()):>8} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,26 @@
 """Fixtures compartilhadas para os testes."""
 
+from contextlib import contextmanager
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.db.base import Base
+from app.db.instrumentacao import contar_queries, instrumentar_engine
+from app.core.config import settings
 from app.db.session import get_db
 from app.main import app
+from app.services.store import store
+
+# Sem aquecimento no lifespan: a thread leria o banco real e disputaria o store com os testes
+settings.STORE_AQUECIMENTO = "desligado"
 
 # Banco SQLite em memória para testes
 SQLITE_TEST_URL = "sqlite:///./test.db"
 engine_test = create_engine(SQLITE_TEST_URL, connect_args={"check_same_thread": False})
+instrumentar_engine(engine_test)
 TestSession = sessionmaker(bind=engine_test, autocommit=False, autoflush=False)
 
 
@@ -27,6 +36,7 @@ def override_get_db():
 def setup_db():
     """Cria e destrói as tabelas a cada teste."""
     Base.metadata.create_all(bind=engine_test)
+    store.limpar()
     yield
     Base.metadata.drop_all(bind=engine_test)
 
@@ -48,3 +58,19 @@ def db():
         yield session
     finally:
         session.close()
+
+
+@pytest.fixture()
+def max_queries():
+    """Trava um orçamento de queries: ``with max_queries(3): client.get(...)``."""
+
+    @contextmanager
+    def _verificar(limite: int):
+        with contar_queries() as contador:
+            yield contador
+        assert contador.total <= limite, (
+            f"{contador.total} queries emitidas (limite {limite}):\n"
+            + "\n".join(contador.statements)
+        )
+
+    return _verificar
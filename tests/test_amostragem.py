@@ -0,0 +1,52 @@
+"""Testes para a redução de séries (LTTB e min/max por balde)."""
+
+import math
+from array import array
+
+from app.services.amostragem import lttb, minmax
+from app.services.indice import IndiceIntervalos
+
+
+def _serie(n: int, pico: int | None = None) -> tuple[array, array]:
+    valores = array("d", (math.sin(i / 50) for i in range(n)))
+    if pico is not None:
+        valores[pico] = 10.0
+    return array("i", range(700_000, 700_000 + n)), valores
+
+
+class TestLTTB:
+    """Testa seleção de pontos pelo maior triângulo."""
+
+    def test_mantem_extremidades_e_o_pico(self):
+        ordinais, valores = _serie(5000, pico=2345)
+        posicoes = lttb(ordinais, valores, 0, 5000, 100)
+        assert len(posicoes) == 100
+        assert posicoes[0] == 0 and posicoes[-1] == 4999
+        assert 2345 in posicoes
+        assert list(posicoes) == sorted(set(posicoes))
+
+    def test_respeita_o_intervalo(self):
+        ordinais, valores = _serie(1000)
+        posicoes = lttb(ordinais, valores, 200, 600, 50)
+        assert posicoes[0] == 200 and posicoes[-1] == 599
+        assert all(200 <= p < 600 for p in posicoes)
+
+    def test_alvo_maior_que_o_periodo(self):
+        ordinais, valores = _serie(10)
+        assert list(lttb(ordinais, valores, 2, 8, 100)) == list(range(2, 8))
+
+
+class TestMinMax:
+    """Testa mínimo e máximo por balde via índice da série."""
+
+    def test_mantem_pico_e_vale(self):
+        _, valores = _serie(5000, pico=777)
+        valores[4000] = -10.0
+        posicoes = minmax(IndiceIntervalos(valores), 0, 5000, 100)
+        assert len(posicoes) <= 100
+        assert 777 in posicoes and 4000 in posicoes
+        assert list(posicoes) == sorted(posicoes)
+
+    def test_alvo_maior_que_o_periodo(self):
+        _, valores = _serie(10)
+        assert list(minmax(IndiceIntervalos(valores), 0, 10, 20)) == list(range(10))
@@ -1,7 +1,12 @@
 """Testes de integração para os endpoints da API."""
 
+import subprocess
+import sys
+from pathlib import Path
 from unittest.mock import AsyncMock, patch
 
+import pytest
+
 
 class TestHealthCheck:
     """Testa o endpoint root."""
@@ -13,6 +18,26 @@ class TestHealthCheck:
         assert data["status"] == "ok"
         assert "versao" in data
 
+    def test_root_expoe_tempos_de_inicializacao_em_debug(self, client):
+        tempos = client.get("/").json()["inicializacao_ms"]
+        assert {"importacao", "schema", "store", "total"} <= set(tempos)
+        assert tempos["total"] >= tempos["schema"]
+
+    def test_importar_app_nao_carrega_servicos_opcionais(self):
+        adiados = ["store", "ingestao", "derivadas", "tendencias", "eventos", "snapshot", "amostragem"]
+        codigo = (
+            "import sys, app.main; "
+            f"print([m for m in {adiados!r} if 'app.services.' + m in sys.modules])"
+        )
+        saida = subprocess.run(
+            [sys.executable, "-c", codigo],
+            cwd=Path(__file__).resolve().parents[1],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        assert saida.stdout.strip() == "[]"
+
 
 class TestListarSeries:
     """Testa GET /series."""
@@ -137,3 +162,398 @@ class TestSyncSerie:
         assert len(data["observacoes"]) == 3
         assert data["total_paginas"] == 4
         assert data["total_observacoes"] == 10
+
+
+class TestOrcamentoQueries:
+    """Trava a quantidade de queries por endpoint, independente do volume de dados."""
+
+    @staticmethod
+    def _dados(n: int) -> list[dict]:
+        from datetime import date, timedelta
+
+        base = date(2024, 1, 1)
+        return [{"data": base + timedelta(days=i), "valor": float(i)} for i in range(n)]
+
+    @patch("app.api.routes_series.buscar_serie", new_callable=AsyncMock)
+    def test_sync_nao_cresce_com_linhas(self, mock_buscar, client, max_queries):
+        mock_buscar.return_value = self._dados(5)
+        with max_queries(5):
+            client.post("/series/432/sync", json={})
+
+        # Re-sync com mais linhas (novas + atualizadas) mantém o orçamento
+        mock_buscar.return_value = [
+            {"data": d["data"], "valor": d["valor"] + 1} for d in self._dados(200)
+        ]
+        with max_queries(5):
+            resp = client.post("/series/432/sync", json={})
+        assert resp.json()["registros_novos"] == 195
+        assert resp.json()["registros_atualizados"] == 5
+
+    @patch("app.api.routes_series.buscar_serie", new_callable=AsyncMock)
+    def test_sync_sem_mudanca_nao_toca_observacoes(self, mock_buscar, client, max_queries):
+        mock_buscar.return_value = self._dados(400)  # 2024 e 2025
+        client.post("/series/433/sync", json={})
+
+        with max_queries(2) as contador:
+            resp = client.post("/series/433/sync", json={})
+        assert not any("observacoes" in sql for sql in contador.statements)
+        data = resp.json()
+        assert (data["blocos_ignorados"], data["blocos_reescritos"]) == (2, 0)
+        assert data["total_registros"] == 400
+
+    @patch("app.api.routes_series.buscar_serie", new_callable=AsyncMock)
+    def test_listar_nao_cresce_com_series(self, mock_buscar, client, max_queries):
+        mock_buscar.return_value = self._dados(3)
+        for codigo in (1, 11, 432, 433, 4389):
+            client.post(f"/series/{codigo}/sync", json={})
+
+        with max_queries(1):
+            resp = client.get("/series")
+        assert [s["total_observacoes"] for s in resp.json()] == [3] * 5
+
+    @patch("app.api.routes_series.buscar_serie", new_callable=AsyncMock)
+    def test_leituras_com_orcamento_fixo(self, mock_buscar, client, max_queries):
+        mock_buscar.return_value = self._dados(300)
+        client.post("/series/432/sync", json={})
+
+        with max_queries(3):
+            client.get("/series/432?tamanho=500")
+        with max_queries(2):
+            client.get("/series/432/insights")
+
+    def test_headers_debug(self, client):
+        resp = client.get("/series")
+        assert resp.headers["X-DB-Queries"] == "1"
+        assert float(resp.headers["X-DB-Tempo-Ms"]) >= 0
+
+
+class TestFormatosResposta:
+    """Testa o caminho rápido de serialização (orjson + formato colunar)."""
+
+    @patch("app.api.routes_series.buscar_serie", new_callable=AsyncMock)
+    def test_formato_colunar(self, mock_buscar, client):
+        from datetime import date
+
+        mock_buscar.return_value = [
+            {"data": date(2024, 1, 2), "valor": 11.75},
+            {"data": date(2024, 1, 3), "valor": 11.65},
+        ]
+        client.post("/series/432/sync", json={})
+
+        linhas = client.get("/series/432").json()
+        assert linhas["observacoes"] == [
+            {"data": "2024-01-02", "valor": 11.75},
+            {"data": "2024-01-03", "valor": 11.65},
+        ]
+
+        colunar = client.get("/series/432?formato=colunar").json()
+        assert colunar["datas"] == ["2024-01-02", "2024-01-03"]
+        assert colunar["valores"] == [11.75, 11.65]
+        assert "observacoes" not in colunar
+        assert colunar["total_observacoes"] == 2
+
+    @patch("app.api.routes_series.buscar_serie", new_callable=AsyncMock)
+    def test_max_pontos_reduz_o_periodo_mantendo_o_pico(self, mock_buscar, client):
+        from datetime import date, timedelta
+
+        base = date(2020, 1, 1)
+        mock_buscar.return_value = [
+            {"data": base + timedelta(days=i), "valor": 9.0 if i == 1234 else 5.0 + (i % 5) * 0.01}
+            for i in range(3000)
+        ]
+        client.post("/series/1/sync", json={})
+
+        for amostragem in ("lttb", "minmax"):
+            data = client.get(f"/series/1?formato=colunar&max_pontos=200&amostragem={amostragem}").json()
+            assert len(data["valores"]) <= 200
+            assert 9.0 in data["valores"]
+            assert data["total_observacoes"] == 3000
+            assert data["total_paginas"] == 1
+            assert data["datas"] == sorted(data["datas"])
+
+        filtrado = client.get("/series/1?formato=colunar&max_pontos=50&data_inicial=2027-01-01").json()
+        assert filtrado["datas"][0] == "2027-01-01"
+        assert len(filtrado["valores"]) == 50
+
+        assert client.get("/series/1?max_pontos=1000").status_code == 422  # linhas: até 500
+
+    @patch("app.api.routes_series.buscar_serie", new_callable=AsyncMock)
+    def test_insights_serializa_pontos(self, mock_buscar, client):
+        from datetime import date, timedelta
+
+        base = date(2024, 1, 1)
+        mock_buscar.return_value = [
+            {"data": base + timedelta(days=i), "valor": float(i)} for i in range(10)
+        ]
+        client.post("/series/432/sync", json={})
+
+        resp = client.get("/series/432/insights?ultimas_n=2")
+        assert resp.headers["content-type"] == "application/json"
+        data = resp.json()
+        assert data["codigo"] == 432
+        assert data["data_minimo"] == "2024-01-01"
+        assert data["ultimas_observacoes"] == [
+            {"data": "2024-01-09", "valor": 8.0},
+            {"data": "2024-01-10", "valor": 9.0},
+        ]
+        assert data["media_movel_7"][-1] == {"data": "2024-01-10", "valor": 6.0}
+
+
+class TestStoreEmMemoria:
+    """Leituras servidas pelo store em memória, coerente com o sync."""
+
+    @patch("app.api.routes_series.buscar_serie", new_callable=AsyncMock)
+    def test_leitura_sem_round_trip_e_coerente(self, mock_buscar, client, max_queries):
+        from datetime import date
+
+        mock_buscar.return_value = [
+            {"data": date(2024, 1, 2), "valor": 1.0},
+            {"data": date(2024, 1, 3), "valor": 2.0},
+        ]
+        client.post("/series/432/sync", json={})
+        client.get("/series/432")  # carrega no store
+
+        with max_queries(0):
+            resp = client.get("/series/432/insights?data_inicial=2024-01-03")
+        assert resp.json()["total_observacoes"] == 1
+
+        mock_buscar.return_value = [{"data": date(2024, 1, 4), "valor": 3.0}]
+        client.post("/series/432/sync", json={})
+
+        with max_queries(0):
+            data = client.get("/series/432?formato=colunar").json()
+        assert data["valores"] == [1.0, 2.0, 3.0]
+
+        status = client.get("/series/store").json()
+        assert status["series_fixas"] == 1
+        assert status["bytes_usados"] > 3 * (8 + 4)  # dados + índice
+
+
+class TestMetricasInsights:
+    """Testa o parâmetro ``metricas`` de GET /series/{codigo}/insights."""
+
+    @patch("app.api.routes_series.buscar_serie", new_callable=AsyncMock)
+    def test_metricas_por_requisicao(self, mock_buscar, client):
+        from datetime import date, timedelta
+
+        base = date(2024, 1, 1)
+        mock_buscar.return_value = [
+            {"data": base + timedelta(days=i), "valor": 5.0 + (i % 3)} for i in range(40)
+        ]
+        client.post("/series/10813/sync", json={})
+
+        data = client.get("/series/10813/insights?metricas=volatilidade&metricas=drawdown").json()
+        assert data["volatilidade"] > 0
+        assert data["drawdown_maximo"] < 0
+        assert data["ewma"] is None
+
+        resp = client.get("/series/10813/insights?metricas=inexistente")
+        assert resp.status_code == 422
+
+    @patch("app.api.routes_series.buscar_serie", new_callable=AsyncMock)
+    def test_tendencia_opcional(self, mock_buscar, client):
+        from datetime import date, timedelta
+
+        base = date(2024, 1, 1)
+        valores = [10 + 0.5 * i for i in range(30)] + [25 - 0.5 * i for i in range(30)]
+        mock_buscar.return_value = [{"data": base + timedelta(days=i), "valor": v} for i, v in enumerate(valores)]
+        client.post("/series/432/sync", json={})
+
+        assert client.get("/series/432/insights").json()["tendencia"] is None
+        tendencia = client.get("/series/432/insights?metricas=tendencia&janela_tendencia=5").json()["tendencia"]
+        assert tendencia["direcao"] == "baixa"
+        assert tendencia["pontos_virada"] == [{"data": "2024-02-03", "de": "alta", "para": "baixa"}]
+        assert tendencia["inclinacao"] == pytest.approx(-0.5 * 365.25)
+
+        # Período filtrado: só janelas inteiras dentro dele
+        tendencia = client.get(
+            "/series/432/insights?metricas=tendencia&janela_tendencia=5&data_final=2024-01-20"
+        ).json()["tendencia"]
+        assert tendencia["direcao"] == "alta"
+        assert tendencia["pontos_virada"] == []
+
+
+class TestCompressaoEFormatosCompactos:
+    """Testa compressão negociada e os formatos delta/binário."""
+
+    @staticmethod
+    def _sync(mock_buscar, client, n: int = 300):
+        from datetime import date, timedelta
+
+        base = date(2024, 1, 1)
+        mock_buscar.return_value = [
+            {"data": base + timedelta(days=i + i // 5 * 2), "valor": 5.0 + i / 100} for i in range(n)
+        ]
+        client.post("/series/1/sync", json={})
+
+    @patch("app.api.routes_series.buscar_serie", new_callable=AsyncMock)
+    def test_gzip_acima_do_limite(self, mock_buscar, client):
+        self._sync(mock_buscar, client)
+
+        resp = client.get("/series/1?tamanho=300", headers={"Accept-Encoding": "gzip"})
+        assert resp.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in resp.headers["vary"]
+        assert len(resp.json()["observacoes"]) == 300  # httpx descomprime
+
+        pequena = client.get("/", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in pequena.headers
+
+        recusada = client.get("/series/1?tamanho=300", headers={"Accept-Encoding": "gzip;q=0"})
+        assert "content-encoding" not in recusada.headers
+
+    @patch("app.api.routes_series.buscar_serie", new_callable=AsyncMock)
+    def test_formato_delta(self, mock_buscar, client):
+        from datetime import date, timedelta
+
+        self._sync(mock_buscar, client, n=7)
+        data = client.get("/series/1?formato=delta").json()
+        assert data["data_inicial"] == "2024-01-01"
+        assert data["deltas"] == [0, 1, 1, 1, 1, 3, 1]
+
+        datas, atual = [], date.fromisoformat(data["data_inicial"])
+        for delta in data["deltas"]:
+            atual += timedelta(days=delta)
+            datas.append(atual.isoformat())
+        linhas = client.get("/series/1").json()["observacoes"]
+        assert datas == [o["data"] for o in linhas]
+        assert data["valores"] == [o["valor"] for o in linhas]
+
+    @patch("app.api.routes_series.buscar_serie", new_callable=AsyncMock)
+    def test_formato_binario(self, mock_buscar, client):
+        import struct
+        from datetime import date, timedelta
+
+        self._sync(mock_buscar, client, n=1000)
+        resp = client.get("/series/1?formato=binario&tamanho=5000")
+        assert resp.headers["content-type"] == "application/octet-stream"
+        assert resp.headers["X-Total-Observacoes"] == "1000"
+
+        corpo = resp.content
+        magic, n, primeiro = struct.unpack_from("<4sIi", corpo)
+        assert (magic, n) == (b"MIB1", 1000)
+        assert date(1970, 1, 1) + timedelta(days=primeiro) == date(2024, 1, 1)
+        valores = struct.unpack_from(f"<{n}d", corpo, 16)
+        deltas = struct.unpack_from(f"<{n}i", corpo, 16 + 8 * n)
+        assert valores[-1] == 5.0 + 999 / 100
+        assert sum(deltas) == 999 + 199 * 2
+
+    @patch("app.api.routes_series.buscar_serie", new_callable=AsyncMock)
+    def test_linhas_limita_pagina(self, mock_buscar, client):
+        self._sync(mock_buscar, client, n=3)
+        assert client.get("/series/1?tamanho=1000").status_code == 422
+        assert client.get("/series/1?tamanho=1000&formato=colunar").status_code == 200
+
+    def test_negociacao_respeita_preferencia_e_q(self):
+        from app.api.compressao import negociar
+
+        disponiveis = ["zstd", "br", "gzip"]
+        assert negociar("gzip, br", disponiveis) == "br"
+        assert negociar("zstd;q=0, gzip;q=0.5", disponiveis) == "gzip"
+        assert negociar("*", disponiveis) == "zstd"
+        assert negociar("identity", disponiveis) is None
+
+
+class TestEventosSync:
+    """O sync publica o ciclo de vida no barramento do stream SSE."""
+
+    @patch("app.api.routes_series.buscar_serie", new_callable=AsyncMock)
+    def test_sync_publica_eventos(self, mock_buscar, client):
+        from datetime import date
+
+        from app.services.eventos import barramento
+
+        cursor = barramento.ultimo_id
+        mock_buscar.return_value = [{"data": date(2024, 1, 2), "valor": 11.75}]
+        client.post("/series/432/sync", json={})
+        mock_buscar.return_value = []
+        client.post("/series/432/sync", json={})
+
+        eventos = barramento.eventos_desde(cursor)
+        assert [e.tipo for e in eventos] == [
+            "sync_iniciado",
+            "sync_dados_recebidos",
+            "sync_gravado",
+            "novos_dados",
+            "sync_concluido",
+            "sync_iniciado",
+            "sync_falhou",
+        ]
+        assert eventos[3].dados["novos"] == 1
+
+
+class TestSnapshot:
+    """Testa GET /series/snapshot (últimos valores de todas as séries)."""
+
+    @patch("app.api.routes_series.buscar_serie", new_callable=AsyncMock)
+    def test_ultimos_valores_de_todas_as_series(self, mock_buscar, client, max_queries):
+        from datetime import date, timedelta
+
+        base = date(2024, 1, 1)
+        mock_buscar.return_value = [{"data": base + timedelta(days=i), "valor": 100.0 + i} for i in range(50)]
+        client.post("/series/1/sync", json={})
+        mock_buscar.return_value = [{"data": base, "valor": 10.5}]
+        client.post("/series/432/sync", json={})
+
+        with max_queries(1):
+            resp = client.get("/series/snapshot?k=3")
+        assert resp.status_code == 200
+        dolar, selic = resp.json()
+
+        assert dolar["codigo"] == 1
+        assert [p["valor"] for p in dolar["ultimas_observacoes"]] == [147.0, 148.0, 149.0]
+        assert dolar["ultimo_valor"] == 149.0
+        assert dolar["valor_anterior"] == 148.0
+        assert dolar["variacao_absoluta"] == 1.0
+        assert dolar["variacao_percentual"] == round(1 / 148 * 100, 4)
+
+        # Série com menos de k pontos entra inteira, sem variação
+        assert selic["ultimas_observacoes"] == [{"data": "2024-01-01", "valor": 10.5}]
+        assert selic["valor_anterior"] is None
+        assert selic["variacao_absoluta"] is None
+
+    def test_snapshot_sem_series(self, client):
+        resp = client.get("/series/snapshot")
+        assert resp.status_code == 200
+        assert resp.json() == []
+
+
+class TestSeriesDerivadas:
+    """Testa códigos virtuais servidos pelos endpoints de série e insights."""
+
+    @patch("app.api.routes_series.buscar_serie", new_callable=AsyncMock)
+    def test_ipca_12_meses_por_codigo_virtual(self, mock_buscar, client):
+        from datetime import date
+
+        mock_buscar.return_value = [{"data": date(2023 + m // 12, m % 12 + 1, 1), "valor": 0.5} for m in range(14)]
+        client.post("/series/433/sync", json={})
+
+        resp = client.get("/series/900433?formato=colunar")
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["total_observacoes"] == 3
+        assert data["datas"][0] == "2023-12-01"
+        assert data["valores"][0] == pytest.approx((1.005**12 - 1) * 100)
+
+        resp = client.get("/series/900433/insights")
+        assert resp.status_code == 200
+        assert resp.json()["total_observacoes"] == 3
+
+        # Sync da origem recalcula a derivada
+        mock_buscar.return_value = [{"data": date(2024, 3, 1), "valor": 1.0}]
+        client.post("/series/433/sync", json={"data_inicial": "2024-03-01"})
+        assert client.get("/series/900433?formato=colunar").json()["total_observacoes"] == 4
+
+    def test_origem_nao_sincronizada(self, client):
+        resp = client.get("/series/900433")
+        assert resp.status_code == 404
+        assert "433" in resp.json()["detail"]
+
+    def test_sync_de_codigo_virtual_rejeitado(self, client):
+        resp = client.post("/series/900433/sync", json={})
+        assert resp.status_code == 400
+
+    def test_lista_derivadas(self, client):
+        resp = client.get("/series/derivadas")
+        assert resp.status_code == 200
+        por_codigo = {d["codigo"]: d for d in resp.json()}
+        assert por_codigo[920432]["fontes"] == [432, 900433]
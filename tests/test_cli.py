@@ -0,0 +1,124 @@
+"""Testes para a CLI de importação/exportação em massa."""
+
+import os
+import subprocess
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+import orjson
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app.cli import codigo_do_arquivo, exportar, importar, ler_arquivo
+from app.db.base import Base
+from app.db.models import DigestBloco, Observacao, Serie
+from app.services.ingestao import gravar_observacoes
+
+RAIZ = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture()
+def engine_arquivo(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'carga.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def _dump_json(caminho: Path, pontos: list[tuple[str, str]]) -> Path:
+    caminho.write_bytes(orjson.dumps([{"data": d, "valor": v} for d, v in pontos]))
+    return caminho
+
+
+class TestLeituraDumps:
+    """Parse dos formatos do BCB e do código da série pelo nome do arquivo."""
+
+    def test_codigo_do_nome(self):
+        assert codigo_do_arquivo(Path("432.json")) == 432
+        assert codigo_do_arquivo(Path("dumps/bcdata.sgs.4389.csv")) == 4389
+        with pytest.raises(ValueError):
+            codigo_do_arquivo(Path("selic.json"))
+        with pytest.raises(ValueError, match="derivada"):
+            codigo_do_arquivo(Path("900433.json"))
+
+    def test_json_descarta_valores_nao_numericos(self, tmp_path):
+        arquivo = _dump_json(
+            tmp_path / "433.json", [("01/01/2024", "0.42"), ("01/02/2024", ""), ("01/03/2024", "0.83")]
+        )
+        codigo, ordinais, valores = ler_arquivo(arquivo)
+        assert codigo == 433
+        assert list(ordinais) == [date(2024, 1, 1).toordinal(), date(2024, 3, 1).toordinal()]
+        assert list(valores) == [0.42, 0.83]
+
+    def test_csv_do_bcb(self, tmp_path):
+        arquivo = tmp_path / "bcdata.sgs.1.csv"
+        arquivo.write_text('"data";"valor"\n"02/01/2024";"4,8526"\n"03/01/2024";"4,9185"\n', encoding="utf-8")
+        codigo, ordinais, valores = ler_arquivo(arquivo)
+        assert codigo == 1
+        assert list(valores) == [4.8526, 4.9185]
+        assert date.fromordinal(ordinais[-1]) == date(2024, 1, 3)
+
+
+class TestImportacaoExportacao:
+    """Carga em massa com upsert, invalidação de digests e ida e volta por arquivo."""
+
+    def test_importa_em_varios_processos(self, tmp_path, engine_arquivo):
+        _dump_json(tmp_path / "432.json", [(f"{d:02d}/01/2024", str(d)) for d in range(1, 31)])
+        _dump_json(tmp_path / "433.json", [("01/01/2024", "0.42"), ("01/02/2024", "0.83")])
+
+        resumo = importar([tmp_path], engine=engine_arquivo, processos=2)
+        assert (resumo.series, resumo.linhas) == (2, 32)
+        assert resumo.linhas_por_segundo > 0
+        with Session(engine_arquivo) as db:
+            series = {s.codigo: s for s in db.query(Serie)}
+            assert set(series) == {432, 433}
+            assert all(isinstance(s.ultima_sync, datetime) for s in series.values())
+            total = db.query(func.count()).select_from(Observacao).scalar()
+        assert total == 32
+
+    def test_reimportacao_atualiza_e_invalida_digests(self, tmp_path, engine_arquivo):
+        with Session(engine_arquivo) as db:
+            gravar_observacoes(db, 433, [{"data": date(2024, 1, 1), "valor": 0.1}])
+            db.commit()
+        _dump_json(tmp_path / "433.json", [("01/01/2024", "0.42"), ("01/02/2024", "0.83")])
+
+        importar([tmp_path / "433.json"], engine=engine_arquivo, processos=1)
+        with Session(engine_arquivo) as db:
+            valores = [v for (v,) in db.execute(select(Observacao.valor).order_by(Observacao.data))]
+            assert valores == [0.42, 0.83]
+            assert db.query(DigestBloco).count() == 0
+            # O próximo sync reconta a série inteira a partir do banco
+            resultado = gravar_observacoes(db, 433, [{"data": date(2024, 1, 1), "valor": 0.42}])
+        assert resultado.total == 2
+
+    def test_codigo_virtual_recusado_antes_da_carga(self, tmp_path, engine_arquivo):
+        _dump_json(tmp_path / "433.json", [("01/01/2024", "0.42")])
+        _dump_json(tmp_path / "900433.json", [("01/01/2024", "4.5")])
+        with pytest.raises(ValueError, match="900433"):
+            importar([tmp_path], engine=engine_arquivo, processos=1)
+        with Session(engine_arquivo) as db:
+            assert db.query(Serie).count() == 0
+
+    @pytest.mark.parametrize("formato", ["json", "csv"])
+    def test_exportar_e_reimportar(self, tmp_path, engine_arquivo, formato):
+        _dump_json(tmp_path / "4389.json", [("02/01/2024", "0.043739"), ("03/01/2024", "1e-05")])
+        importar([tmp_path / "4389.json"], engine=engine_arquivo, processos=1)
+
+        saida = tmp_path / "saida"
+        resumo = exportar(saida, formato=formato, engine=engine_arquivo)
+        assert (resumo.series, resumo.linhas) == (1, 2)
+        _, ordinais, valores = ler_arquivo(saida / f"4389.{formato}")
+        assert list(valores) == [0.043739, 1e-05]
+        assert date.fromordinal(ordinais[0]) == date(2024, 1, 2)
+
+    def test_linha_de_comando_reporta_linhas_por_segundo(self, tmp_path):
+        _dump_json(tmp_path / "432.json", [("02/01/2024", "11.75")])
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'cli.db'}", "DEBUG": "false"}
+        saida = subprocess.run(
+            [sys.executable, "-m", "app.cli", "importar", str(tmp_path / "432.json"), "--processos", "1"],
+            env=env, cwd=RAIZ, check=True, capture_output=True, text=True,
+        ).stdout
+        assert "Importadas: 1 linhas de 1 séries" in saida
+        assert "linhas/s" in saida
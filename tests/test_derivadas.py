@@ -0,0 +1,124 @@
+"""Testes para as séries derivadas (transformações e cache do motor)."""
+
+import math
+from array import array
+from datetime import date
+
+import pytest
+
+from app.services.derivadas import (
+    DEFINICOES,
+    FonteAusente,
+    MotorDerivadas,
+    acumulado_composto,
+    anualizar,
+    diferenca_defasada,
+    diferenca_entre,
+    variacao_anual,
+)
+from app.services.store import SerieEmMemoria, StoreSeries
+
+
+def _ordinais(*datas: date) -> array:
+    return array("i", (d.toordinal() for d in datas))
+
+
+def _mensal(n: int, inicio: int = 2023) -> array:
+    return _ordinais(*(date(inicio + m // 12, m % 12 + 1, 1) for m in range(n)))
+
+
+class TestTransformacoes:
+    """Testa cada transformação contra o cálculo direto."""
+
+    def test_acumulado_composto_igual_ao_produto(self):
+        valores = array("d", [0.5, 0.8, -0.2, 1.1, 0.3, 0.4])
+        ordinais, acumulado = acumulado_composto(_mensal(6), valores, janela=3)
+        assert ordinais == _mensal(6)[2:]
+        for i, resultado in enumerate(acumulado):
+            esperado = (math.prod(1 + v / 100 for v in valores[i:i + 3]) - 1) * 100
+            assert resultado == pytest.approx(esperado, abs=1e-12)
+
+    def test_acumulado_composto_com_fator_nao_positivo(self):
+        _, acumulado = acumulado_composto(_mensal(3), array("d", [10.0, -100.0, 5.0]), janela=2)
+        assert list(acumulado) == pytest.approx([-100.0, -100.0])
+
+    def test_anualizar_252_dias_uteis(self):
+        _, anual = anualizar(_mensal(1), array("d", [0.05]), periodos=252)
+        assert anual[0] == pytest.approx((1.0005**252 - 1) * 100)
+
+    def test_variacao_anual_usa_ultimo_valor_ate_um_ano_antes(self):
+        ordinais = _ordinais(date(2023, 2, 27), date(2023, 3, 1), date(2024, 2, 29), date(2024, 3, 1))
+        ordinais_saida, variacao = variacao_anual(ordinais, array("d", [100.0, 110.0, 120.0, 132.0]))
+        # 29/02/2024 → 28/02/2023 (vale 27/02); 01/03/2024 → 01/03/2023
+        assert ordinais_saida == ordinais[2:]
+        assert list(variacao) == pytest.approx([20.0, 20.0])
+
+    def test_diferenca_defasada(self):
+        ordinais, diferencas = diferenca_defasada(_mensal(4), array("d", [1.0, 4.0, 9.0, 16.0]), defasagem=2)
+        assert ordinais == _mensal(4)[2:]
+        assert list(diferencas) == [8.0, 12.0]
+
+    def test_diferenca_entre_alinha_por_data(self):
+        diaria = _ordinais(date(2024, 1, 15), date(2024, 2, 10), date(2024, 3, 5))
+        mensal = _ordinais(date(2024, 2, 1), date(2024, 3, 1))
+        ordinais, spread = diferenca_entre((diaria, array("d", [10.0, 11.0, 12.0])), (mensal, array("d", [4.0, 5.0])))
+        assert ordinais == diaria[1:]  # antes do primeiro ponto da direita não há par
+        assert list(spread) == [7.0, 7.0]
+
+
+class TestMotorDerivadas:
+    """Testa resolução de códigos virtuais e invalidação do cache."""
+
+    @staticmethod
+    def _motor(*series: SerieEmMemoria, limite_bytes: int = 10_000_000) -> MotorDerivadas:
+        store = StoreSeries(limite_bytes=10_000_000)
+        for serie in series:
+            store.colocar(serie)
+        return MotorDerivadas(DEFINICOES, store, limite_bytes=limite_bytes)
+
+    def test_reaproveita_ate_a_origem_mudar(self):
+        ipca = SerieEmMemoria(codigo=433, nome="IPCA", ordinais=_mensal(13), valores=array("d", [0.5] * 13))
+        motor = self._motor(ipca)
+
+        primeira = motor.obter(None, 900433)
+        assert len(primeira) == 2
+        assert primeira.valores[0] == pytest.approx((1.005**12 - 1) * 100)
+        assert motor.obter(None, 900433) is primeira
+        assert motor.calculos == 1
+
+        motor.store.aplicar_sync(433, [{"data": date(2024, 2, 1), "valor": 1.0}], None)
+        segunda = motor.obter(None, 900433)
+        assert segunda is not primeira
+        assert len(segunda) == 3
+        assert segunda.versao > primeira.versao
+
+    def test_derivada_de_derivada_e_spread(self):
+        ipca = SerieEmMemoria(codigo=433, nome="IPCA", ordinais=_mensal(13), valores=array("d", [0.5] * 13))
+        selic = SerieEmMemoria(
+            codigo=432, nome="SELIC", ordinais=_ordinais(date(2024, 1, 10)), valores=array("d", [11.75])
+        )
+        motor = self._motor(ipca, selic)
+
+        real = motor.obter(None, 920432)
+        assert list(real.valores) == pytest.approx([11.75 - (1.005**12 - 1) * 100])
+        assert motor.obter(None, 910433).valores[0] == pytest.approx(0.0)
+        assert motor.calculos == 3  # 900433 calculada uma vez e reaproveitada
+
+    def test_origem_ausente(self):
+        motor = self._motor()
+        with pytest.raises(FonteAusente) as exc:
+            motor.obter(None, 920432)
+        assert exc.value.codigo == 432
+        assert motor.obter(None, 123) is None
+
+    def test_cache_respeita_limite_de_memoria(self):
+        ipca = SerieEmMemoria(codigo=433, nome="IPCA", ordinais=_mensal(24), valores=array("d", [0.5] * 24))
+        cdi = SerieEmMemoria(codigo=4389, nome="CDI", ordinais=_mensal(24), valores=array("d", [0.04] * 24))
+        motor = self._motor(ipca, cdi, limite_bytes=1)  # cabe só a última calculada
+
+        ipca_12m = motor.obter(None, 900433)
+        assert motor.obter(None, 900433) is ipca_12m
+        cdi_anual = motor.obter(None, 904389)
+        assert motor.bytes_usados == cdi_anual.bytes_usados
+        assert motor.obter(None, 900433) is not ipca_12m
+        assert motor.calculos == 3
@@ -0,0 +1,115 @@
+"""Testes para o barramento de eventos do stream SSE."""
+
+import asyncio
+import threading
+from datetime import datetime
+
+from app.main import app
+from app.services.eventos import BarramentoEventos, barramento
+
+
+async def _coletar(barramento: BarramentoEventos, quantidade: int, **kwargs) -> list:
+    recebidos = []
+    async for evento in barramento.assinar(**kwargs):
+        if evento is not None:
+            recebidos.append(evento)
+        if len(recebidos) == quantidade:
+            return recebidos
+
+
+class TestBarramentoEventos:
+    """Testa fan-out, retomada por Last-Event-ID, publicação entre threads, repasse e encerramento."""
+
+    async def test_fan_out_para_varios_assinantes(self):
+        barramento = BarramentoEventos()
+        tarefas = [asyncio.create_task(_coletar(barramento, 2)) for _ in range(100)]
+        await asyncio.sleep(0)
+
+        barramento.publicar("sync_iniciado", codigo=432)
+        barramento.publicar("sync_concluido", codigo=432, total=3)
+
+        resultados = await asyncio.wait_for(asyncio.gather(*tarefas), 2)
+        assert all([e.tipo for e in r] == ["sync_iniciado", "sync_concluido"] for r in resultados)
+
+    async def test_retoma_do_ultimo_id(self):
+        barramento = BarramentoEventos()
+        for i in range(5):
+            barramento.publicar("novos_dados", codigo=1, novos=i)
+
+        eventos = await asyncio.wait_for(_coletar(barramento, 3, ultimo_id=2), 1)
+        assert [e.id for e in eventos] == [3, 4, 5]
+
+    async def test_ultimo_id_a_frente_do_barramento(self):
+        # Cliente reconectando após restart (ou em outro worker) com id antigo maior
+        barramento = BarramentoEventos()
+        tarefa = asyncio.create_task(_coletar(barramento, 3, ultimo_id=500))
+        await asyncio.sleep(0)
+        for i in range(3):
+            barramento.publicar("novos_dados", codigo=1, novos=i)
+
+        eventos = await asyncio.wait_for(tarefa, 1)
+        assert [e.id for e in eventos] == [1, 2, 3]
+
+    async def test_last_event_id_de_outra_instancia(self):
+        barramento = BarramentoEventos(instancia="a1")
+        for i in range(3):
+            barramento.publicar("novos_dados", codigo=1, novos=i)
+        assert barramento.eventos_desde(0)[0].formatar_sse().startswith(b"id: a1-1\n")
+        assert barramento.cursor_de("a1-2") == 2
+        # Id de outro worker (ou de antes de um restart) não é posição deste buffer
+        assert barramento.cursor_de("b2-2") is None
+        assert barramento.cursor_de("2") is None
+        assert barramento.cursor_de(None) is None
+
+    async def test_encerrar_termina_streams_abertos(self):
+        barramento = BarramentoEventos()
+        tarefa = asyncio.create_task(_coletar(barramento, 1))
+        await asyncio.sleep(0)
+
+        barramento.encerrar()
+        assert await asyncio.wait_for(tarefa, 1) is None
+
+    async def test_shutdown_da_aplicacao_encerra_streams(self):
+        async with app.router.lifespan_context(app):
+            tarefa = asyncio.create_task(_coletar(barramento, 1))
+            await asyncio.sleep(0)
+        assert await asyncio.wait_for(tarefa, 1) is None
+
+    async def test_repassa_syncs_de_outros_workers(self):
+        banco = {432: datetime(2024, 1, 1), 433: None}
+        barramento = BarramentoEventos(consultar_syncs=lambda: dict(banco), intervalo_repasse=0.01)
+        tarefa = asyncio.create_task(_coletar(barramento, 1))
+        await asyncio.sleep(0.05)
+
+        # Sync feito neste worker já foi anunciado pela rota; o de outro worker é repassado
+        barramento.anotar_sync_local(432, datetime(2024, 1, 2))
+        banco[432] = datetime(2024, 1, 2)
+        banco[433] = datetime(2024, 1, 2)
+
+        (evento,) = await asyncio.wait_for(tarefa, 1)
+        assert (evento.tipo, evento.dados) == ("sync_concluido", {"codigo": 433, "externo": True})
+        barramento.encerrar()
+
+    async def test_publicacao_de_outra_thread(self):
+        barramento = BarramentoEventos()
+        tarefa = asyncio.create_task(_coletar(barramento, 1))
+        await asyncio.sleep(0)
+
+        threading.Thread(target=barramento.publicar, args=("sync_gravado",), kwargs={"codigo": 1}).start()
+        (evento,) = await asyncio.wait_for(tarefa, 1)
+        assert evento.dados == {"codigo": 1}
+
+    async def test_keepalive_quando_ocioso(self):
+        barramento = BarramentoEventos()
+        primeiro = await anext(barramento.assinar(keepalive=0.01))
+        assert primeiro is None
+
+    def test_buffer_circular_e_formato_sse(self):
+        barramento = BarramentoEventos(capacidade=3)
+        for i in range(5):
+            barramento.publicar("novos_dados", codigo=i)
+        assert [e.id for e in barramento.eventos_desde(0)] == [3, 4, 5]
+        assert barramento.eventos_desde(5) == []
+        assert barramento.eventos_desde(4)[0].formatar_sse() == (
+            b'id: 5\nevent: novos_dados\ndata: {"codigo":4}\n\n'
+        )
@@ -0,0 +1,93 @@
+"""Testes para o índice de consultas por intervalo."""
+
+import random
+import statistics
+from array import array
+
+from app.services import insights
+from app.services.indice import IndiceIntervalos
+from app.services.insights import Metrica, calcular_insights_intervalo, calcular_insights_vetores
+
+
+def _janelas(n: int, quantidade: int = 200):
+    rnd = random.Random(42)
+    for _ in range(quantidade):
+        inicio = rnd.randrange(n)
+        yield inicio, rnd.randrange(inicio + 1, n + 1)
+
+
+class TestIndiceIntervalos:
+    """Compara as consultas do índice com o cálculo direto."""
+
+    def test_consultas_batem_com_forca_bruta(self):
+        rnd = random.Random(7)
+        valores = array("d", (round(rnd.uniform(-5, 5), 1) for _ in range(300)))  # muitos empates
+        indice = IndiceIntervalos(valores)
+
+        for inicio, fim in _janelas(len(valores)):
+            janela = list(valores[inicio:fim])
+            assert indice.argmin(inicio, fim) == inicio + janela.index(min(janela))
+            assert indice.argmax(inicio, fim) == inicio + janela.index(max(janela))
+            assert abs(indice.soma(inicio, fim) - sum(janela)) < 1e-9
+            assert abs(indice.media(inicio, fim) - statistics.fmean(janela)) < 1e-9
+            if len(janela) > 1:
+                assert abs(indice.variancia(inicio, fim) - statistics.variance(janela)) < 1e-9
+
+    def test_anexar_mantem_indice(self):
+        valores = array("d")
+        indice = IndiceIntervalos(valores)
+        rnd = random.Random(3)
+        for _ in range(70):  # cruza várias capacidades (1, 2, 4, ..., 128)
+            valores.append(rnd.uniform(0, 100))
+            indice.anexar(valores[-1])
+
+        reconstruido = IndiceIntervalos(valores)
+        for inicio, fim in _janelas(len(valores)):
+            assert indice.argmin(inicio, fim) == reconstruido.argmin(inicio, fim)
+            assert indice.argmax(inicio, fim) == reconstruido.argmax(inicio, fim)
+            assert abs(indice.media(inicio, fim) - reconstruido.media(inicio, fim)) < 1e-9
+
+
+class TestInsightsIntervalo:
+    """Insights via índice devem bater com o cálculo sobre a fatia."""
+
+    def test_janelas_arbitrarias(self):
+        rnd = random.Random(11)
+        n = 120
+        ordinais = array("i", range(738000, 738000 + n))
+        valores = array("d", (rnd.uniform(1, 10) for _ in range(n)))
+        indice = IndiceIntervalos(valores)
+
+        for inicio, fim in _janelas(n, 50):
+            rapido = calcular_insights_intervalo(ordinais, valores, indice, inicio, fim, ultimas_n=5)
+            direto = calcular_insights_vetores(ordinais[inicio:fim], valores[inicio:fim], ultimas_n=5)
+            assert rapido == direto
+
+    def test_desvio_padrao_da_janela_vem_do_indice(self):
+        rnd = random.Random(5)
+        n = 200
+        ordinais = array("i", range(738000, 738000 + n))
+        valores = array("d", (rnd.uniform(1000, 1010) for _ in range(n)))
+        indice = IndiceIntervalos(valores)
+
+        for inicio, fim in _janelas(n, 50):
+            resultado = calcular_insights_intervalo(
+                ordinais, valores, indice, inicio, fim, metricas=[Metrica.VOLATILIDADE]
+            )
+            esperado = statistics.stdev(valores[inicio:fim]) if fim - inicio > 1 else None
+            if esperado is None:
+                assert resultado.desvio_padrao is None
+            else:
+                assert abs(resultado.desvio_padrao - esperado) < 1e-5
+
+    def test_so_tendencia_nao_varre_a_janela(self, monkeypatch):
+        def falhar(*args, **kwargs):
+            raise AssertionError("métricas opcionais não pedidas")
+
+        monkeypatch.setattr(insights, "_metricas_opcionais", falhar)
+        valores = array("d", range(1, 51))
+        ordinais = array("i", range(738000, 738050))
+        resultado = calcular_insights_intervalo(
+            ordinais, valores, IndiceIntervalos(valores), 10, 40, metricas=[Metrica.TENDENCIA]
+        )
+        assert resultado.total_observacoes == 30
@@ -0,0 +1,129 @@
+"""Testes para o escritor único de observações."""
+
+from concurrent.futures import wait
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine, delete, func, select
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.db.instrumentacao import contar_queries, instrumentar_engine
+from app.db.models import DigestBloco, Observacao
+from app.services.ingestao import EscritorObservacoes, gravar_observacoes
+
+
+def _dados(n: int, valor: float = 1.0) -> list[dict]:
+    base = date(2024, 1, 1)
+    return [{"data": base + timedelta(days=i), "valor": valor + i} for i in range(n)]
+
+
+@pytest.fixture()
+def engine_arquivo(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ingestao.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+class TestEscritorObservacoes:
+    """Agrupamento em lotes, isolamento de falhas e concorrência entre escritores."""
+
+    def test_agrupa_syncs_concorrentes(self, engine_arquivo):
+        escritor = EscritorObservacoes(espera_ms=100)
+        futuros = [escritor.enviar(engine_arquivo, codigo, _dados(50)) for codigo in range(10)]
+        wait(futuros, timeout=5)
+        escritor.parar()
+
+        assert [f.result().novos for f in futuros] == [50] * 10
+        assert escritor.transacoes < 10  # vários syncs por transação
+        with engine_arquivo.connect() as conn:
+            assert conn.execute(select(func.count()).select_from(Observacao)).scalar() == 500
+
+    def test_falha_isolada_no_lote(self, engine_arquivo):
+        escritor = EscritorObservacoes(espera_ms=100)
+        bom = escritor.enviar(engine_arquivo, 1, _dados(3))
+        ruim = escritor.enviar(engine_arquivo, 2, [{"data": date(2024, 1, 1), "valor": None}])
+        outro = escritor.enviar(engine_arquivo, 3, _dados(2))
+        wait([bom, ruim, outro], timeout=5)
+        escritor.parar()
+
+        assert bom.result().novos == 3
+        assert outro.result().novos == 2
+        with pytest.raises(Exception):
+            ruim.result()
+
+    def test_escritores_concorrentes_no_mesmo_arquivo(self, engine_arquivo):
+        # Dois escritores simulam dois workers: o lock de arquivo serializa as transações
+        escritores = [EscritorObservacoes(espera_ms=0) for _ in range(2)]
+        futuros = [
+            escritores[i % 2].enviar(engine_arquivo, 432, _dados(200, valor=float(i)))
+            for i in range(20)
+        ]
+        wait(futuros, timeout=10)
+        for escritor in escritores:
+            escritor.parar()
+
+        assert all(f.exception() is None for f in futuros)
+        assert sum(f.result().novos for f in futuros) == 200
+
+
+def _anos(inicio: date, n: int, delta: float = 0.0) -> list[dict]:
+    return [{"data": inicio + timedelta(days=i), "valor": i + delta} for i in range(n)]
+
+
+class TestDigestsBlocos:
+    """Detecção de mudança por digest anual: anos iguais não tocam ``observacoes``."""
+
+    @staticmethod
+    def _sync(engine, dados, data_inicial=None, data_final=None):
+        with Session(engine) as db:
+            resultado = gravar_observacoes(db, 433, dados, data_inicial, data_final)
+            db.commit()
+        return resultado
+
+    def test_sync_identico_ignora_todos_os_blocos(self, engine_arquivo):
+        instrumentar_engine(engine_arquivo)
+        dados = _anos(date(2023, 6, 1), 500)  # 2023 e 2024
+        assert self._sync(engine_arquivo, dados).blocos_reescritos == 2
+
+        with contar_queries() as contador:
+            resultado = self._sync(engine_arquivo, dados)
+        assert (resultado.blocos_ignorados, resultado.blocos_reescritos) == (2, 0)
+        assert resultado.total == 500
+        assert resultado.alterados == []
+        assert not any("observacoes" in sql for sql in contador.statements)
+
+    def test_so_o_ano_alterado_e_reescrito(self, engine_arquivo):
+        dados = _anos(date(2023, 6, 1), 500)
+        self._sync(engine_arquivo, dados)
+        dados[-1] = {**dados[-1], "valor": -1.0}
+
+        resultado = self._sync(engine_arquivo, dados)
+        assert (resultado.blocos_ignorados, resultado.blocos_reescritos) == (1, 1)
+        assert resultado.atualizados == 1
+        assert resultado.alterados == [{"serie_id": 1, "data": dados[-1]["data"], "valor": -1.0}]
+        assert resultado.total == 500
+
+    def test_janela_parcial_nao_grava_digest(self, engine_arquivo):
+        dados = _anos(date(2024, 3, 1), 30)
+        self._sync(engine_arquivo, dados, data_inicial=date(2024, 3, 1))
+        with engine_arquivo.connect() as conn:
+            bloco = conn.execute(select(DigestBloco.linhas, DigestBloco.digest)).one()
+        assert bloco == (30, None)
+
+        # Sem digest, o mesmo payload parcial é comparado de novo (sem escrever nada)
+        resultado = self._sync(engine_arquivo, dados, data_inicial=date(2024, 3, 1))
+        assert (resultado.blocos_ignorados, resultado.blocos_reescritos) == (0, 1)
+        assert resultado.alterados == []
+
+    def test_digests_invalidados_recontam_a_serie(self, engine_arquivo):
+        self._sync(engine_arquivo, _anos(date(2023, 6, 1), 500))
+        with engine_arquivo.begin() as conn:
+            conn.execute(delete(DigestBloco))
+
+        resultado = self._sync(engine_arquivo, _anos(date(2024, 1, 1), 10), data_inicial=date(2024, 1, 1))
+        assert resultado.total == 500  # 2023 fora do payload entra na contagem
+        with engine_arquivo.connect() as conn:
+            linhas = dict(conn.execute(select(DigestBloco.ano, DigestBloco.linhas)).all())
+        assert linhas == {2023: 214, 2024: 286}
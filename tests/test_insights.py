@@ -3,7 +3,7 @@
 from dataclasses import dataclass
 from datetime import date
 
-from app.services.insights import calcular_insights
+from app.services.insights import Metrica, calcular_insights
 
 
 @dataclass
@@ -102,3 +102,68 @@ class TestCalcularInsights:
         assert resultado.data_minimo == date(2024, 1, 2)
         assert resultado.valor_maximo == 10.0
         assert resultado.data_maximo == date(2024, 1, 3)
+
+
+class TestMetricasOpcionais:
+    """Testa volatilidade, EWMA, quantis, drawdown e retornos anuais."""
+
+    def test_nao_pedidas_ficam_vazias(self):
+        obs = _criar_observacoes([("2024-01-01", 1.0), ("2024-01-02", 2.0)])
+        resultado = calcular_insights(obs)
+        assert resultado.desvio_padrao is None
+        assert resultado.quantis is None
+        assert resultado.retornos_anuais is None
+
+    def test_volatilidade_welford(self):
+        import statistics
+
+        valores = [10.0, 10.5, 10.2, 10.8, 11.0, 10.7, 11.3]
+        obs = _criar_observacoes([(f"2024-01-{i+1:02d}", v) for i, v in enumerate(valores)])
+        resultado = calcular_insights(obs, metricas={Metrica.VOLATILIDADE}, janela_volatilidade=3)
+
+        retornos = [b / a - 1 for a, b in zip(valores, valores[1:])]
+        assert resultado.desvio_padrao == round(statistics.stdev(valores), 6)
+        assert resultado.volatilidade == round(statistics.stdev(retornos) * 100, 6)
+        assert len(resultado.volatilidade_movel) == len(retornos) - 2
+        assert resultado.volatilidade_movel[-1]["valor"] == round(statistics.stdev(retornos[-3:]) * 100, 6)
+
+    def test_ewma_meia_vida(self):
+        obs = _criar_observacoes([("2024-01-01", 0.0), ("2024-01-02", 10.0)])
+        resultado = calcular_insights(obs, metricas={Metrica.EWMA}, meia_vida=1)
+        # Meia-vida de 1 observação: peso 0.5 para o novo valor
+        assert resultado.ewma[-1]["valor"] == 5.0
+
+    def test_quantis(self):
+        obs = _criar_observacoes([(f"2024-01-{i+1:02d}", float(v)) for i, v in enumerate([5, 1, 4, 2, 3])])
+        resultado = calcular_insights(obs, metricas={Metrica.QUANTIS})
+        assert resultado.quantis["p50"] == 3.0
+        assert resultado.quantis["p25"] == 2.0
+        assert resultado.quantis["p05"] == 1.2
+
+    def test_drawdown(self):
+        obs = _criar_observacoes([
+            ("2024-01-01", 100.0),
+            ("2024-01-02", 120.0),  # pico
+            ("2024-01-03", 90.0),   # vale: -25%
+            ("2024-01-04", 130.0),
+            ("2024-01-05", 110.0),
+        ])
+        resultado = calcular_insights(obs, metricas={Metrica.DRAWDOWN})
+        assert resultado.drawdown_maximo == -25.0
+        assert resultado.data_pico_drawdown == date(2024, 1, 2)
+        assert resultado.data_vale_drawdown == date(2024, 1, 3)
+
+    def test_retornos_anuais(self):
+        obs = _criar_observacoes([
+            ("2022-06-01", 100.0),
+            ("2022-12-30", 110.0),
+            ("2023-06-01", 99.0),
+            ("2023-12-29", 121.0),
+            ("2024-02-01", 133.1),
+        ])
+        resultado = calcular_insights(obs, metricas={Metrica.RETORNOS})
+        assert resultado.retornos_anuais == [
+            {"ano": 2022, "retorno_percentual": 10.0},
+            {"ano": 2023, "retorno_percentual": 10.0},
+            {"ano": 2024, "retorno_percentual": 10.0},
+        ]
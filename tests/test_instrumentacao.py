@@ -0,0 +1,28 @@
+"""Testes para a instrumentação de queries."""
+
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.db.instrumentacao import contar_queries, instrumentar_engine
+
+
+class TestInstrumentacao:
+    """Contagem e tempo das queries, inclusive após statements que falham."""
+
+    def test_falha_nao_contamina_o_tempo_da_proxima_query(self):
+        engine = create_engine("sqlite://")
+        instrumentar_engine(engine)
+        with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM tabela_inexistente"))
+            time.sleep(0.2)
+
+            with contar_queries() as contador:
+                conn.execute(text("SELECT 1"))
+            assert contador.total == 1
+            assert contador.tempo_ms < 100
+            assert not conn.info.get("inicio_queries")
+        engine.dispose()
@@ -0,0 +1,77 @@
+"""Testes para a migração do layout da tabela de observações."""
+
+import os
+import subprocess
+import sys
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.db.migracoes import layout_atual
+from app.db.models import Observacao, Serie
+
+RAIZ = Path(__file__).resolve().parents[1]
+
+
+def _rodar(url: str, argumentos: list[str], **flags: str) -> str:
+    """Roda em outro processo (o layout é lido das settings no import)."""
+    env = {**os.environ, "DATABASE_URL": url, "DEBUG": "false", **flags}
+    return subprocess.run(
+        [sys.executable, *argumentos], env=env, cwd=RAIZ, check=True, capture_output=True, text=True
+    ).stdout
+
+
+def _migrar(url: str, **flags: str) -> None:
+    _rodar(url, ["-m", "app.db.migracoes"], **flags)
+
+
+def _boot(url: str, **flags: str) -> str:
+    """Verificação de schema do boot; ``recusado`` se o layout não confere."""
+    codigo = (
+        "from app.db.schema import SchemaDesatualizado, garantir_schema\n"
+        "from app.db.session import engine\n"
+        "try:\n    print(garantir_schema(engine))\n"
+        "except SchemaDesatualizado:\n    print('recusado')\n"
+    )
+    return _rodar(url, ["-c", codigo], **flags).strip()
+
+
+class TestMigracaoLayout:
+    """Converte um banco no layout padrão para o compacto e de volta."""
+
+    def test_ida_e_volta_preserva_dados(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'migracao.db'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(engine)
+        with Session(engine) as db:
+            serie = Serie(codigo=432, nome="SELIC")
+            db.add(serie)
+            db.flush()
+            db.add_all([
+                Observacao(serie_id=serie.id, data=date(2024, 1, i), valor=float(i)) for i in range(1, 6)
+            ])
+            db.commit()
+
+        assert layout_atual(engine) == (False, False)
+        compacto = {"DB_LAYOUT_COMPACTO": "true", "DB_DATAS_ORDINAIS": "true"}
+        assert _boot(url, **compacto) == "recusado"  # antes da migração
+
+        _migrar(url, **compacto)
+        assert layout_atual(engine) == (True, True)
+        assert _boot(url, **compacto) == "verificado"  # a migração gravou a assinatura
+        with engine.connect() as conn:
+            ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'observacoes'")).scalar()
+            linhas = conn.execute(text("SELECT serie_id, data, valor FROM observacoes")).all()
+        assert "WITHOUT ROWID" in ddl
+        assert linhas[0] == (1, date(2024, 1, 1).toordinal(), 1.0)
+        assert len(linhas) == 5
+
+        _migrar(url, DB_LAYOUT_COMPACTO="false", DB_DATAS_ORDINAIS="false")
+        assert layout_atual(engine) == (False, False)
+        with Session(engine) as db:
+            datas = [o.data for o in db.query(Observacao).order_by(Observacao.data)]
+        assert datas == [date(2024, 1, i) for i in range(1, 6)]
+        engine.dispose()
@@ -0,0 +1,57 @@
+"""Testes para a verificação do schema no boot."""
+
+import pytest
+from sqlalchemy import create_engine, inspect, update
+
+from app.db.instrumentacao import contar_queries, instrumentar_engine
+from app.db.models import VersaoSchema
+from app.db.schema import SchemaDesatualizado, assinatura_schema, garantir_schema, preparar_banco
+
+
+def _engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'boot.db'}")
+    instrumentar_engine(engine)
+    return engine
+
+
+class TestVerificacaoSchema:
+    """Testa criação, verificação com uma query e detecção de mudança."""
+
+    def test_banco_novo_e_criado(self, tmp_path):
+        engine = _engine(tmp_path)
+        assert garantir_schema(engine) == "criado"
+        assert {"series", "observacoes", "schema_versao"} <= set(inspect(engine).get_table_names())
+
+    def test_boot_seguinte_usa_uma_query(self, tmp_path):
+        engine = _engine(tmp_path)
+        garantir_schema(engine)
+        with contar_queries() as contador:
+            assert garantir_schema(engine) == "verificado"
+        assert contador.total == 1
+
+    def test_assinatura_divergente_atualiza(self, tmp_path):
+        engine = _engine(tmp_path)
+        garantir_schema(engine)
+        with engine.begin() as conn:
+            conn.execute(update(VersaoSchema).values(assinatura="antiga"))
+        assert garantir_schema(engine) == "atualizado"
+        with engine.connect() as conn:
+            assert conn.execute(VersaoSchema.__table__.select()).one().assinatura == assinatura_schema()
+
+    def test_modo_nenhuma_nao_toca_no_banco(self, tmp_path):
+        engine = _engine(tmp_path)
+        assert preparar_banco(engine, "nenhuma") == "ignorado"
+        assert inspect(engine).get_table_names() == []
+
+    def test_layout_divergente_recusa_o_boot(self, tmp_path, monkeypatch):
+        engine = _engine(tmp_path)
+        garantir_schema(engine)
+        with engine.begin() as conn:
+            conn.execute(update(VersaoSchema).values(assinatura="antiga"))
+        # Configuração pede outro layout (ex.: DB_DATAS_ORDINAIS ligado) sem migrar a tabela
+        monkeypatch.setattr("app.db.migracoes.layout_configurado", lambda: (True, True))
+
+        with pytest.raises(SchemaDesatualizado, match="app.db.migracoes"):
+            garantir_schema(engine)
+        with engine.connect() as conn:
+            assert conn.execute(VersaoSchema.__table__.select()).one().assinatura == "antiga"
@@ -0,0 +1,217 @@
+"""Testes para o store em memória das séries."""
+
+import sys
+import threading
+from array import array
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+
+from app.services.store import SerieEmMemoria, StoreSeries, _carimbo
+
+
+def _serie(codigo: int, n: int, inicio: date = date(2024, 1, 1)) -> SerieEmMemoria:
+    return SerieEmMemoria(
+        codigo=codigo,
+        nome=f"Série {codigo}",
+        ordinais=array("i", ((inicio + timedelta(days=i)).toordinal() for i in range(n))),
+        valores=array("d", (float(i) for i in range(n))),
+    )
+
+
+class TestSerieEmMemoria:
+    """Testa busca por intervalo e mescla de dados sincronizados."""
+
+    def test_intervalo_busca_binaria(self):
+        serie = _serie(1, 10)
+        assert serie.intervalo(None, None) == (0, 10)
+        assert serie.intervalo(date(2024, 1, 3), date(2024, 1, 5)) == (2, 5)
+        assert serie.intervalo(date(2025, 1, 1), None) == (10, 10)
+
+    def test_mesclar_no_fim(self):
+        original = _serie(1, 3)
+        serie = original.mesclar([{"data": date(2024, 1, 4), "valor": 9.0}])
+        assert len(original) == 3  # a série em uso não muda
+        assert len(serie) == 4
+        assert serie.valores[-1] == 9.0
+        assert serie.versao == 1
+
+    def test_mesclar_atualiza_e_intercala(self):
+        serie = _serie(1, 3).mesclar([
+            {"data": date(2024, 1, 2), "valor": 7.0},
+            {"data": date(2023, 12, 31), "valor": -1.0},
+        ])
+        assert list(serie.valores) == [-1.0, 0.0, 7.0, 2.0]
+        assert serie.data(0) == date(2023, 12, 31)
+
+
+class TestStoreSeries:
+    """Testa LRU, séries fixas, limite de memória e persistência."""
+
+    def test_lru_respeita_limite(self):
+        uma = _serie(100, 10).bytes_usados
+        store = StoreSeries(limite_bytes=uma * 2, fixas={1})
+        store.colocar(_serie(1, 10))
+        store.colocar(_serie(100, 10))
+        store.colocar(_serie(200, 10))  # estoura: sai a menos usada do LRU
+
+        assert store.obter(1) is not None
+        assert store.obter(100) is None
+        assert store.obter(200) is not None
+        assert store.status()["bytes_usados"] == uma * 2
+
+    def test_persistencia_mmap(self, tmp_path):
+        ultima_sync = datetime(2024, 5, 1, 12, 0)
+        store = StoreSeries(limite_bytes=1 << 20, fixas={1}, diretorio=tmp_path)
+        store.colocar(_serie(1, 5))
+        store.aplicar_sync(1, [{"data": date(2024, 1, 6), "valor": 5.0}], ultima_sync)
+
+        outro = StoreSeries(limite_bytes=1 << 20, fixas={1}, diretorio=tmp_path)
+        lida = outro._ler_persistida(1, "Série 1", _carimbo(ultima_sync))
+        assert lida is not None
+        assert list(lida.valores) == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+        assert lida.data(5) == date(2024, 1, 6)
+        assert lida.indice.argmax(0, 6) == 5  # índice persistido junto
+        assert lida.indice.media(0, 6) == 2.5
+        # Carimbo divergente (houve sync depois) invalida o arquivo
+        assert outro._ler_persistida(1, "Série 1", 0) is None
+
+    def test_persistencia_concorrente_no_mesmo_diretorio(self, tmp_path):
+        # Vários workers persistindo a mesma série: cada um usa o próprio temporário
+        ultima_sync = datetime(2024, 5, 1, 12, 0)
+        stores = [StoreSeries(limite_bytes=1 << 20, fixas={1}, diretorio=tmp_path) for _ in range(4)]
+        serie = _serie(1, 5000)
+        serie.carimbo = _carimbo(ultima_sync)
+        erros = []
+
+        def persistir(store):
+            try:
+                for _ in range(20):
+                    store._persistir(serie)
+            except Exception as exc:  # pragma: no cover - só em caso de regressão
+                erros.append(exc)
+
+        with patch("app.services.store.logger") as logger:
+            threads = [threading.Thread(target=persistir, args=(s,)) for s in stores]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        assert erros == [] and not logger.exception.called
+        assert list(tmp_path.iterdir()) == [tmp_path / "1.bin"]
+        assert len(stores[0]._ler_persistida(1, "Série 1", serie.carimbo)) == 5000
+
+    def test_falha_ao_persistir_nao_propaga(self, tmp_path):
+        bloqueio = tmp_path / "arquivo"
+        bloqueio.write_text("não é diretório")
+        store = StoreSeries(limite_bytes=1 << 20, fixas={1}, diretorio=bloqueio / "store")
+        store.colocar(_serie(1, 3))
+        store.aplicar_sync(1, [{"data": date(2024, 1, 4), "valor": 3.0}], datetime(2024, 5, 1))
+        assert len(store.obter(1)) == 4
+
+    def test_arquivo_truncado_e_descartado(self, tmp_path):
+        ultima_sync = datetime(2024, 5, 1, 12, 0)
+        store = StoreSeries(limite_bytes=1 << 20, fixas={1}, diretorio=tmp_path)
+        store.colocar(_serie(1, 50))
+        store.aplicar_sync(1, [{"data": date(2024, 3, 1), "valor": 1.0}], ultima_sync)
+        arquivo = tmp_path / "1.bin"
+        arquivo.write_bytes(arquivo.read_bytes()[:-100])
+
+        assert store._ler_persistida(1, "Série 1", _carimbo(ultima_sync)) is None
+        assert not arquivo.exists()
+
+    def test_aquecer_carrega_do_banco(self, db):
+        from app.db.models import Observacao, Serie
+
+        serie = Serie(codigo=432, nome="SELIC")
+        db.add(serie)
+        db.flush()
+        db.add_all([
+            Observacao(serie_id=serie.id, data=date(2024, 1, i), valor=float(i)) for i in (1, 2, 3)
+        ])
+        db.commit()
+
+        store = StoreSeries(limite_bytes=1 << 20, fixas={432})
+        assert store.aquecer(db) == 1
+        assert list(store.obter(432).valores) == [1.0, 2.0, 3.0]
+
+    def test_aquecer_em_segundo_plano(self, db):
+        from sqlalchemy.orm import Session
+
+        from app.db.models import Observacao, Serie
+
+        serie = Serie(codigo=432, nome="SELIC")
+        db.add(serie)
+        db.flush()
+        db.add(Observacao(serie_id=serie.id, data=date(2024, 1, 1), valor=1.0))
+        db.commit()
+
+        store = StoreSeries(limite_bytes=1 << 20, fixas={432})
+        store.aquecer_em_segundo_plano(lambda: Session(db.get_bind())).join(timeout=5)
+        assert list(store.obter(432).valores) == [1.0]
+
+    def test_aquecimento_nao_sobrescreve_sync_concorrente(self):
+        store = StoreSeries(limite_bytes=1 << 20, fixas={1})
+        store._aquecendo = True
+        # Sync de série ainda fora da memória enquanto o aquecimento lê o banco
+        store.aplicar_sync(1, [{"data": date(2024, 2, 1), "valor": 5.0}], datetime(2024, 2, 1))
+        assert store._colocar_aquecida(_serie(1, 3)) is False
+        assert store.obter(1) is None  # será lida do banco, já com o sync
+
+    def test_sync_concorrente_nao_quebra_leituras(self):
+        from app.services.insights import Metrica, calcular_insights_intervalo
+
+        store = StoreSeries(limite_bytes=1 << 24, fixas={1})
+        store.colocar(_serie(1, 2000))
+        intervalo_original = sys.getswitchinterval()
+        sys.setswitchinterval(1e-5)  # troca de thread frequente: expõe estados intermediários
+        erros: list[Exception] = []
+        parar = threading.Event()
+
+        def ler():
+            while not parar.is_set():
+                serie = store.obter(1)  # uma requisição segura a série enquanto calcula
+                for _ in range(10):
+                    try:
+                        inicio, fim = serie.intervalo(date(2024, 1, 10), None)
+                        calcular_insights_intervalo(
+                            serie.ordinais, serie.valores, serie.indice, inicio, fim, metricas=[Metrica.VOLATILIDADE]
+                        )
+                    except Exception as exc:
+                        erros.append(exc)
+
+        leitores = [threading.Thread(target=ler) for _ in range(2)]
+        for leitor in leitores:
+            leitor.start()
+        for i in range(100):
+            # Alterna anexos no fim e inserções no início (reescrita da série)
+            data = date(2030, 1, 1) + timedelta(days=i) if i % 2 else date(2023, 12, 31) - timedelta(days=i)
+            store.aplicar_sync(1, [{"data": data, "valor": float(-i)}], None)
+        parar.set()
+        for leitor in leitores:
+            leitor.join()
+        sys.setswitchinterval(intervalo_original)
+
+        assert erros == []
+        assert store.obter(1).versao == 100
+
+    def test_sync_de_outro_worker_e_percebido(self, db):
+        from app.services.ingestao import gravar_observacoes
+
+        gravar_observacoes(db, 432, [{"data": date(2024, 1, 1), "valor": 1.0}])
+        db.commit()
+        # Dois workers com a série em memória; o sync acontece só no primeiro
+        worker_a = StoreSeries(limite_bytes=1 << 20, fixas={432})
+        worker_b = StoreSeries(limite_bytes=1 << 20, fixas={432}, validade_s=60)
+        worker_a.obter_ou_carregar(db, 432)
+        worker_b.obter_ou_carregar(db, 432)
+
+        resultado = gravar_observacoes(db, 432, [{"data": date(2024, 1, 2), "valor": 2.0}])
+        db.commit()
+        worker_a.aplicar_sync(432, resultado.alterados, resultado.ultima_sync)
+
+        assert len(worker_b.obter_ou_carregar(db, 432)) == 1  # dentro da validade: memória
+        worker_b.validade_s = 0
+        assert list(worker_b.obter_ou_carregar(db, 432).valores) == [1.0, 2.0]
+        # Quem fez o sync já está em dia: confere e mantém a mesma série
+        worker_a.validade_s = 0
+        assert worker_a.obter_ou_carregar(db, 432) is worker_a.obter(432)
@@ -0,0 +1,96 @@
+"""Testes para a regressão móvel e os pontos de virada."""
+
+from array import array
+from datetime import date, timedelta
+
+import pytest
+
+from app.services.store import SerieEmMemoria
+from app.services.tendencias import (
+    DIAS_POR_ANO,
+    CacheTendencias,
+    regressao_movel,
+    resumir_tendencia,
+)
+
+
+def _diaria(valores: list[float], inicio: date = date(2024, 1, 1)) -> tuple[array, array]:
+    return (
+        array("i", ((inicio + timedelta(days=i)).toordinal() for i in range(len(valores)))),
+        array("d", valores),
+    )
+
+
+def _ols(xs: list[int], ys: list[float]) -> tuple[float, float]:
+    """Ajuste direto (referência)."""
+    n = len(xs)
+    mx, my = sum(xs) / n, sum(ys) / n
+    sxx = sum((x - mx) ** 2 for x in xs)
+    sxy = sum((x - mx) * (y - my) for x, y in zip(xs, ys))
+    syy = sum((y - my) ** 2 for y in ys)
+    return sxy / sxx, sxy * sxy / (sxx * syy)
+
+
+class TestRegressaoMovel:
+    """Testa as somas incrementais contra o ajuste refeito por janela."""
+
+    def test_igual_ao_ajuste_direto(self):
+        valores = [10 + (i % 7) * 0.3 + i * 0.05 for i in range(40)]
+        ordinais, serie = _diaria(valores)
+        ordinais = array("i", (o + (i >= 20) for i, o in enumerate(ordinais)))  # pula um dia no meio
+        regressao = regressao_movel(ordinais, serie, janela=10)
+
+        for i in (9, 19, 25, 39):
+            b, r2 = _ols(list(ordinais[i - 9:i + 1]), valores[i - 9:i + 1])
+            assert regressao.inclinacoes[i] == pytest.approx(b * DIAS_POR_ANO, rel=1e-9)
+            assert regressao.r2[i] == pytest.approx(r2, rel=1e-9)
+
+    def test_serie_constante_e_estavel(self):
+        ordinais, valores = _diaria([13.75] * 20)
+        regressao = regressao_movel(ordinais, valores, janela=5)
+        assert set(regressao.direcoes) == {0}
+        assert set(regressao.inclinacoes) == {0.0}
+
+    def test_ciclo_com_pausa_vira_uma_vez(self):
+        # Sobe, pausa e cai (ciclo de juros)
+        valores = [10 + 0.25 * i for i in range(20)] + [15.0] * 10 + [15 - 0.25 * i for i in range(1, 21)]
+        ordinais, serie = _diaria(valores)
+        regressao = regressao_movel(ordinais, serie, janela=5)
+        resumo = resumir_tendencia(ordinais, regressao, 0, len(serie))
+
+        assert resumo["direcao"] == "baixa"
+        assert [(v["de"], v["para"]) for v in resumo["pontos_virada"]] == [("alta", "baixa")]
+        # Primeira janela só de queda começa no primeiro corte (posição 30)
+        assert resumo["desde"] == date.fromordinal(ordinais[30])
+        assert resumo["r2"] == pytest.approx(1.0)
+
+    def test_periodo_menor_que_a_janela(self):
+        ordinais, valores = _diaria([1.0, 2.0, 3.0, 4.0])
+        regressao = regressao_movel(ordinais, valores, janela=3)
+        assert resumir_tendencia(ordinais, regressao, 2, 4) is None
+
+
+class TestCacheTendencias:
+    """Testa o cache por série e versão."""
+
+    def test_recalcula_so_quando_a_serie_muda(self):
+        ordinais, valores = _diaria([float(i) for i in range(30)])
+        serie = SerieEmMemoria(codigo=1, nome="X", ordinais=ordinais, valores=valores)
+        cache = CacheTendencias()
+
+        primeira = cache.obter(serie, 5)
+        assert cache.obter(serie, 5) is primeira
+        serie = serie.mesclar([{"data": date(2024, 2, 1), "valor": 0.0}])
+        assert cache.obter(serie, 5) is not primeira
+        assert cache.calculos == 2
+
+    def test_respeita_limite_de_memoria(self):
+        ordinais, valores = _diaria([float(i) for i in range(30)])
+        serie = SerieEmMemoria(codigo=1, nome="X", ordinais=ordinais, valores=valores)
+        cache = CacheTendencias(limite_bytes=1)  # cabe só a última calculada
+
+        janela_5 = cache.obter(serie, 5)
+        janela_10 = cache.obter(serie, 10)
+        assert cache.bytes_usados == janela_10.bytes_usados
+        assert cache.obter(serie, 5) is not janela_5
+        assert cache.calculos == 3